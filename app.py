@@ -1,18 +1,31 @@
-from flask import Flask, render_template, jsonify
-import yfinance as yf
+from flask import Flask, Response, g, render_template, jsonify, request, stream_with_context
 import numpy as np
-from textblob import TextBlob
-import requests
 import os
 from dotenv import load_dotenv
-import ta
 from datetime import datetime, timedelta
 import time
 import pandas as pd
-import warnings
-
-# Suppress RuntimeWarnings from technical analysis library
-warnings.filterwarnings('ignore', category=RuntimeWarning, module='ta')
+from concurrency import fan_out
+import metrics
+from metrics import span
+from cache import CACHE_BACKEND, TTLCache, history_cache, make_cache, market_ttl, stock_data_cache
+from snapshot import PredictionSnapshot
+from streaming import IndicatorStates
+from live import QuoteBroadcaster
+from indicators import FIELDS, MIN_POINTS, compute_indicators, panel_from_frames
+from price_store import PRICE_STORE_DIR, PriceStore
+from intraday import INTRADAY_INTERVALS, IntradayStore
+from metadata import MetadataStore
+from news import NewsClient
+from providers import MARKET_DATA_PROVIDER, NEWS_PROVIDER, make_provider
+from quotes import QuoteTable, dumps
+from responses import cache_control, choose_encoding, compress_stream, etag, http_date, negotiate
+from sentiment import SentimentScorer
+from scoring import load_scoring_config
+from screener import (
+    SCREENER_MAX_SYMBOLS, format_ndjson, format_sse, load_universe, needs_metadata,
+    normalize_symbols, parse_filters, screen
+)
 
 app = Flask(__name__)
 load_dotenv()
@@ -25,6 +38,57 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+# Per-request stage timings, aggregated for /metrics
+@app.before_request
+def start_request_trace():
+    g.trace_token = metrics.start_trace()
+
+@app.after_request
+def finish_request_trace(response):
+    trace = metrics.current_trace()
+    # Streamed responses are still being generated at this point
+    if trace is not None and not response.is_streamed:
+        metrics.request_seconds.observe(trace.elapsed(), request.endpoint or 'not_found')
+        if metrics.SERVER_TIMING:
+            response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def end_request_trace(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        metrics.end_trace(token)
+
+# Where history, metadata and news come from; 'replay' providers serve
+# recorded fixtures without network
+market_data = make_provider(MARKET_DATA_PROVIDER, 'yfinance')
+
+# Local OHLCV store read before downloading; set PRICE_STORE_DIR to '' to
+# disable. Replayed fixtures are never written to it.
+price_store = PriceStore(PRICE_STORE_DIR) if PRICE_STORE_DIR and MARKET_DATA_PROVIDER != 'replay' else None
+
+# Rolling intraday bars downloaded once at the finest interval; coarser
+# intraday timeframes are resampled from them
+intraday_bars = IntradayStore(market_data)
+INTERVALS = ['1d'] + INTRADAY_INTERVALS
+
+# Ticker metadata cached for a day; single-symbol lookups wait briefly for a
+# first fetch so searches show the company name
+metadata_store = MetadataStore(provider=market_data)
+METADATA_WAIT = float(os.getenv('METADATA_WAIT', 2))
+
+# Pooled news client shared by all requests
+news_client = NewsClient(provider=make_provider(NEWS_PROVIDER, 'newsapi'))
+
+# Polarity of each article text, memoized by content hash
+sentiment_scorer = SentimentScorer()
+
+# Weights and signal thresholds, optionally overridden from SCORING_CONFIG_PATH
+scoring_config = load_scoring_config()
+
+# Maximum symbols per /search_stocks request
+SEARCH_MAX_SYMBOLS = int(os.getenv('SEARCH_MAX_SYMBOLS', 500))
+
 # List of stocks to analyze
 STOCKS = [
     {'symbol': 'AAPL', 'name': 'Apple Inc.'},
@@ -43,249 +107,331 @@ def get_technical_indicators(data):
     """Calculate technical indicators for the stock"""
     try:
         # Check if we have enough data points
-        if len(data) < 20:  # Need at least 20 data points for reliable indicators
+        if len(data) < MIN_POINTS:
             print(f"Not enough data points ({len(data)}) for technical indicators")
             return None
         
         # Clean the data by removing any NaN values
-        data_clean = data.dropna()
-        if len(data_clean) < 20:
+        data_clean = data[FIELDS].dropna()
+        if len(data_clean) < MIN_POINTS:
             print(f"Not enough clean data points ({len(data_clean)}) for technical indicators")
             return None
         
-        # Calculate RSI
-        try:
-            rsi = ta.momentum.RSIIndicator(data_clean['Close']).rsi().iloc[-1]
-            if pd.isna(rsi):
-                rsi = 50  # Default neutral value
-        except Exception:
-            rsi = 50
-        
-        # Calculate MACD
-        try:
-            macd = ta.trend.MACD(data_clean['Close'])
-            macd_line = macd.macd().iloc[-1]
-            if pd.isna(macd_line):
-                macd_line = 0
-        except Exception:
-            macd_line = 0
-        
-        # Calculate Bollinger Bands
-        try:
-            bollinger = ta.volatility.BollingerBands(data_clean['Close'])
-            upper_band = bollinger.bollinger_hband().iloc[-1]
-            lower_band = bollinger.bollinger_lband().iloc[-1]
-            if pd.isna(upper_band) or pd.isna(lower_band):
-                upper_band = data_clean['Close'].iloc[-1] * 1.02
-                lower_band = data_clean['Close'].iloc[-1] * 0.98
-        except Exception:
-            upper_band = data_clean['Close'].iloc[-1] * 1.02
-            lower_band = data_clean['Close'].iloc[-1] * 0.98
-        
-        # Calculate ADX (requires more data points)
-        try:
-            # Ensure we have enough data for ADX calculation (typically needs 14+ periods)
-            if len(data_clean) >= 14:
-                adx_indicator = ta.trend.ADXIndicator(data_clean['High'], data_clean['Low'], data_clean['Close'])
-                adx_series = adx_indicator.adx()
-                # Get the last valid ADX value
-                adx = adx_series.dropna().iloc[-1] if not adx_series.dropna().empty else 50
-                if pd.isna(adx) or adx <= 0:
-                    adx = 50  # Default neutral value if calculation fails
-            else:
-                adx = 50  # Not enough data for ADX
-        except (IndexError, ValueError, Exception) as e:
-            print(f"ADX calculation error: {e}")
-            adx = 50  # Default neutral value if calculation fails
-        
-        # Calculate OBV
-        try:
-            obv = ta.volume.OnBalanceVolumeIndicator(data_clean['Close'], data_clean['Volume']).on_balance_volume().iloc[-1]
-            if pd.isna(obv):
-                obv = 0  # Default value if calculation fails
-        except (IndexError, ValueError, Exception):
-            obv = 0  # Default value if calculation fails
-        
-        return {
-            'rsi': float(rsi),
-            'macd': float(macd_line),
-            'upper_band': float(upper_band),
-            'lower_band': float(lower_band),
-            'adx': float(adx),
-            'obv': float(obv)
-        }
+        # Single-symbol run of the vectorized panel engine
+        table = compute_indicators(panel_from_frames({'symbol': data_clean}))
+        if table.empty:
+            return None
+        return {name: float(value) for name, value in table.iloc[0].items()}
     except Exception as e:
         print(f"Error calculating technical indicators: {str(e)}")
         return None
 
+def get_news_sentiments(articles_by_symbol):
+    """Get news sentiment for many stocks from their articles
+    
+    All article descriptions are scored as one batch, so headlines
+    syndicated across tickers are scored once.
+    """
+    texts = []
+    owners = []
+    for symbol, articles in articles_by_symbol.items():
+        for article in articles or []:
+            if article.get('description'):
+                texts.append(article['description'])
+                owners.append(symbol)
+    
+    polarities = {}
+    for symbol, polarity in zip(owners, sentiment_scorer.score_texts(texts)):
+        polarities.setdefault(symbol, []).append(polarity)
+    
+    # Neutral sentiment if no API key or no news
+    return {
+        symbol: float(np.mean(polarities[symbol])) if symbol in polarities else 0.5
+        for symbol in articles_by_symbol
+    }
+
 def get_news_sentiment(symbol):
     """Get news sentiment for the stock"""
     try:
-        news_api_key = os.getenv('NEWS_API_KEY')
-        if not news_api_key:
-            return 0.5  # Neutral sentiment if no API key
-        
-        url = f'https://newsapi.org/v2/everything'
-        params = {
-            'q': f'{symbol} stock',
-            'apiKey': news_api_key,
-            'language': 'en',
-            'sortBy': 'publishedAt',
-            'pageSize': 10
-        }
-        
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
-            return 0.5
-        
-        articles = response.json().get('articles', [])
-        if not articles:
-            return 0.5
-        
-        sentiments = []
-        for article in articles:
-            if article.get('description'):
-                blob = TextBlob(article['description'])
-                sentiments.append(blob.sentiment.polarity)
-        
-        return np.mean(sentiments) if sentiments else 0.5
+        articles = news_client.get_articles(symbol)
+        return get_news_sentiments({symbol: articles})[symbol]
     except Exception as e:
         print(f"Error getting news sentiment: {str(e)}")
         return 0.5
 
-def get_indicator_explanations(rsi, macd, adx):
-    """Get explanations for technical indicators"""
-    explanations = {}
-    
-    # RSI explanation
-    if rsi < 30:
-        explanations['rsi'] = f"RSI: {rsi:.1f} - Oversold (Bullish signal, stock may be undervalued)"
-    elif rsi > 70:
-        explanations['rsi'] = f"RSI: {rsi:.1f} - Overbought (Bearish signal, stock may be overvalued)"
-    else:
-        explanations['rsi'] = f"RSI: {rsi:.1f} - Neutral (Stock is neither overbought nor oversold)"
-    
-    # MACD explanation
-    if macd > 0:
-        explanations['macd'] = f"MACD: {macd:.2f} - Bullish (Moving average convergence indicates upward momentum)"
-    else:
-        explanations['macd'] = f"MACD: {macd:.2f} - Bearish (Moving average convergence indicates downward momentum)"
-    
-    # ADX explanation
-    if adx > 25:
-        explanations['adx'] = f"ADX: {adx:.1f} - Strong trend (Price movement is directional)"
-    else:
-        explanations['adx'] = f"ADX: {adx:.1f} - Weak trend (Price movement is sideways/choppy)"
-    
-    return explanations
-
-def get_stock_data(symbol):
-    """Get comprehensive stock data"""
+def fetch_histories(symbols, interval='1d'):
+    """Get the 60-day OHLCV history for many symbols
+    
+    Fresh histories come from the history cache. Symbols another thread or
+    worker is already downloading are not requested twice: their results
+    are picked up from the cache once that download finishes. Intraday
+    intervals come from the rolling intraday buffers instead. Returns a
+    dict of frames and a dict of per-symbol error messages.
+    """
+    if interval in INTRADAY_INTERVALS:
+        with span('history'):
+            return intraday_bars.histories(symbols, interval)
+    
+    histories = {}
+    missing = []
+    for symbol in symbols:
+        hist = history_cache.get((symbol, interval))
+        if hist is not None:
+            histories[symbol] = hist
+        else:
+            missing.append(symbol)
+    
+    owned = [symbol for symbol in missing if history_cache.acquire((symbol, interval))]
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        
-        # Get historical data
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=60)
-        hist = stock.history(start=start_date, end=end_date)
-        
+        with span('history'):
+            frames, errors = load_histories(owned, interval)
+    finally:
+        for symbol in owned:
+            history_cache.release((symbol, interval))
+    histories.update(frames)
+    
+    late = []
+    for symbol in missing:
+        if symbol in owned:
+            continue
+        hist = history_cache.wait((symbol, interval))
+        if hist is not None:
+            histories[symbol] = hist
+        else:
+            late.append(symbol)
+    if late:
+        with span('history'):
+            frames, late_errors = load_histories(late, interval)
+        histories.update(frames)
+        errors.update(late_errors)
+    
+    return histories, errors
+
+def load_histories(symbols, interval='1d'):
+    """Download or read the 60-day history for symbols and cache it
+    
+    With the local price store enabled, only the bars after each symbol's
+    newest stored bar are downloaded and appended, and the window is read
+    back from disk; if the download fails, stored bars are served as they
+    are.
+    """
+    histories = {}
+    if not symbols:
+        return histories, {}
+    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=60)
+    
+    if price_store is None:
+        frames, errors = market_data.get_history(symbols, start_date, end_date, interval)
+        for symbol, frame in frames.items():
+            history_cache.set((symbol, interval), frame)
+            histories[symbol] = frame
+        return histories, errors
+    
+    # Group symbols by the date their missing tail starts so each group is
+    # still one batched download
+    tails = {}
+    for symbol in symbols:
+        last = price_store.last_timestamp(symbol, interval)
+        tail_start = start_date.date()
+        if last is not None:
+            tail_start = max(tail_start, last.date())
+        tails.setdefault(tail_start, []).append(symbol)
+    
+    errors = {}
+    for tail_start, group in tails.items():
+        frames, group_errors = market_data.get_history(group, tail_start, end_date, interval)
+        for symbol, frame in frames.items():
+            price_store.append(symbol, frame, interval)
+        for symbol, error in group_errors.items():
+            if price_store.last_timestamp(symbol, interval) is None:
+                errors[symbol] = error
+            else:
+                print(f"Serving stored history for {symbol} after download error: {error}")
+    
+    for symbol in symbols:
+        if symbol in errors:
+            continue
+        hist = price_store.read(symbol, interval, start=start_date)
         if hist.empty:
-            return None
-        
-        # Calculate technical indicators
-        indicators = get_technical_indicators(hist)
-        if not indicators:
-            return None
-        
-        # Get news sentiment
-        sentiment = get_news_sentiment(symbol)
-        
-        # Calculate price change
-        current_price = hist['Close'].iloc[-1]
-        prev_price = hist['Close'].iloc[-2]
-        price_change = ((current_price - prev_price) / prev_price) * 100
-        
-        # Get indicator explanations
-        explanations = get_indicator_explanations(
-            indicators['rsi'], 
-            indicators['macd'], 
-            indicators['adx']
-        )
-        
-        return {
-            'symbol': symbol,
-            'name': info.get('longName', symbol),
-            'price': float(current_price),
-            'change': float(price_change),
-            'volume': int(hist['Volume'].iloc[-1]),
-            'sector': info.get('sector', 'Unknown'),
-            'industry': info.get('industry', 'Unknown'),
-            'market_cap': int(info.get('marketCap', 0)),
-            'pe_ratio': float(info.get('trailingPE', 0)),
-            'rsi': float(indicators['rsi']),
-            'macd': float(indicators['macd']),
-            'sentiment': float(sentiment),
-            'explanations': explanations
-        }
+            errors[symbol] = 'No price data found'
+            continue
+        history_cache.set((symbol, interval), hist)
+        histories[symbol] = hist
+    
+    return histories, errors
+
+def get_stocks_data(symbols, interval='1d', metadata_wait=0, indicator_source=None):
+    """Get comprehensive stock data for many symbols
+    
+    History is downloaded in batches and indicators are computed for all
+    symbols in one pass; news is then fetched concurrently per symbol.
+    Metadata comes from the metadata store and is merged in on every call,
+    waiting up to metadata_wait seconds in total for symbols not fetched yet.
+    indicator_source(histories) replaces indicator_table() if given.
+    Returns a dict of results and a dict of per-symbol errors.
+    """
+    if metadata_wait:
+        metadata_store.prefetch(symbols)
+    
+    results, missing = cached_stocks_data(symbols, interval)
+    errors = fetch_stocks_data(missing, interval, results, indicator_source) if missing else {}
+    merge_metadata(results, metadata_wait)
+    return results, errors
+
+def cached_stocks_data(symbols, interval):
+    """Split symbols into cached stock data and the symbols still missing"""
+    results = {}
+    missing = []
+    for symbol in symbols:
+        cached = stock_data_cache.get((symbol, interval))
+        if cached is not None:
+            # merge_metadata() updates the dict, so hand out a copy
+            results[symbol] = dict(cached)
+        else:
+            missing.append(symbol)
+    return results, missing
+
+def merge_metadata(results, metadata_wait=0):
+    deadline = time.monotonic() + metadata_wait
+    for symbol, data in results.items():
+        with span('info', symbol):
+            data.update(metadata_store.lookup(symbol, wait=max(0, deadline - time.monotonic())))
+
+def indicator_table(histories):
+    """Technical indicators for all fetched histories in one pass"""
+    if not histories:
+        return pd.DataFrame()
+    try:
+        with span('indicators'):
+            return compute_indicators(panel_from_frames(
+                {symbol: hist[FIELDS] for symbol, hist in histories.items()}
+            ))
+    except Exception as e:
+        print(f"Error calculating technical indicators: {str(e)}")
+        return pd.DataFrame()
+
+def ready_symbols(histories, indicators, errors):
+    """Symbols with enough history for indicators; the rest go to errors"""
+    ready = []
+    for symbol in histories:
+        if symbol in indicators.index and len(histories[symbol]) >= 2:
+            ready.append(symbol)
+        else:
+            errors[symbol] = 'Not enough data for technical indicators'
+    return ready
+
+def bar_time(hist, now):
+    """Unix time the newest bar covers up to: its end, or now while it is still forming"""
+    index = hist.index
+    # The shortest recent gap between bars is the bar length; longer gaps are
+    # nights and weekends
+    length = pd.Series(index[-10:]).diff().min()
+    return min((index[-1] + length).timestamp(), now)
+
+def build_stock_data(symbol, hist, row):
+    """Stock data dict for one symbol; sentiment is filled in by store_stock_data()
+    
+    Explanations are not stored; QuoteTable formats them when rendering.
+    """
+    # Metadata is served from its own long-lived cache and never blocks
+    info = metadata_store.lookup(symbol)
+    
+    # Calculate price change
+    current_price = hist['Close'].iloc[-1]
+    prev_price = hist['Close'].iloc[-2]
+    price_change = ((current_price - prev_price) / prev_price) * 100
+    now = time.time()
+    
+    return {
+        'symbol': symbol,
+        'name': info['name'],
+        'price': float(current_price),
+        'change': float(price_change),
+        'volume': int(hist['Volume'].iloc[-1]),
+        'sector': info['sector'],
+        'industry': info['industry'],
+        'market_cap': info['market_cap'],
+        'pe_ratio': info['pe_ratio'],
+        'rsi': float(row['rsi']),
+        'macd': float(row['macd']),
+        'adx': float(row['adx']),
+        'sentiment': 0.5,
+        'as_of': bar_time(hist, now),
+        # Not rendered; when the data was fetched, for caching headers
+        'fetched_at': now
+    }
+
+def build_ready(ready, histories, indicators, errors):
+    """Stock data for every ready symbol; symbols that fail to build go to errors"""
+    built = {}
+    for symbol in ready:
+        try:
+            built[symbol] = build_stock_data(symbol, histories[symbol], indicators.loc[symbol])
+        except Exception as e:
+            print(f"Error building stock data for {symbol}: {str(e)}")
+            errors[symbol] = 'Failed to build stock data'
+    return built
+
+def store_stock_data(built, articles, interval, results):
+    """Score news for all built symbols together, then cache and collect them
+    
+    Symbols without articles, including those whose news fetch failed,
+    get neutral sentiment.
+    """
+    try:
+        with span('sentiment'):
+            sentiments = get_news_sentiments({symbol: articles.get(symbol) for symbol in built})
+    except Exception as e:
+        print(f"Error getting news sentiment: {str(e)}")
+        sentiments = {}
+    for symbol, data in built.items():
+        data['sentiment'] = sentiments.get(symbol, 0.5)
+        stock_data_cache.set((symbol, interval), data)
+        results[symbol] = dict(data)
+
+def fetch_stocks_data(symbols, interval, results, indicator_source=None):
+    """Build stock data for symbols missing from the cache into results; returns errors"""
+    # Get historical data and technical indicators for the whole batch
+    histories, errors = fetch_histories(symbols, interval)
+    indicators = (indicator_source or indicator_table)(histories)
+    ready = ready_symbols(histories, indicators, errors)
+    built = build_ready(ready, histories, indicators, errors)
+    
+    def news(symbol):
+        with span('news', symbol):
+            return news_client.get_articles(symbol)
+    
+    # Articles are scored for all symbols together once fetched; a news
+    # fetch that fails or times out only leaves its symbol without articles
+    articles = fan_out(news, list(built))
+    store_stock_data(built, articles, interval, results)
+    return errors
+
+def get_stock_data(symbol, interval='1d'):
+    """Get comprehensive stock data"""
+    try:
+        results, errors = get_stocks_data([symbol], interval, metadata_wait=METADATA_WAIT)
+        if symbol in errors:
+            print(f"Error getting stock data for {symbol}: {errors[symbol]}")
+        return results.get(symbol)
     except Exception as e:
         print(f"Error getting stock data for {symbol}: {str(e)}")
         return None
 
 def analyze_stocks():
     """Analyze stocks and return recommendations"""
-    recommendations = []
+    # History for all symbols comes from one batched download; metadata and
+    # news are fetched concurrently under the shared token buckets
+    results, errors = get_stocks_data([stock['symbol'] for stock in STOCKS], metadata_wait=METADATA_WAIT)
+    for symbol, error in errors.items():
+        print(f"Error getting stock data for {symbol}: {error}")
     
-    for stock in STOCKS:
-        data = get_stock_data(stock['symbol'])
-        if not data:
-            continue
-        
-        # Calculate technical score
-        technical_score = 0
-        if data['rsi'] < 30:  # Oversold
-            technical_score += 1
-        elif data['rsi'] > 70:  # Overbought
-            technical_score -= 1
-        
-        if data['macd'] > 0:  # Bullish MACD
-            technical_score += 1
-        else:  # Bearish MACD
-            technical_score -= 1
-        
-        # Calculate sentiment score
-        sentiment_score = (data['sentiment'] + 1) / 2  # Normalize to 0-1
-        
-        # Calculate momentum score
-        momentum_score = 1 if data['change'] > 0 else 0
-        
-        # Calculate final score (weighted average)
-        final_score = (
-            technical_score * 0.4 +
-            sentiment_score * 0.3 +
-            momentum_score * 0.3
-        )
-        
-        # Determine trading signal
-        if final_score > 0.6:
-            signal = "Strong Buy"
-        elif final_score > 0.4:
-            signal = "Buy"
-        elif final_score < 0.4:
-            signal = "Sell"
-        else:
-            signal = "Hold"
-        
-        data['signal'] = signal
-        data['score'] = final_score
-        recommendations.append(data)
-        
-        # Add a delay to avoid hitting API rate limits
-        time.sleep(5)
+    table = QuoteTable.from_records([results[stock['symbol']] for stock in STOCKS if results.get(stock['symbol'])])
     
-    # Sort by score and return top 5
-    recommendations.sort(key=lambda x: x['score'], reverse=True)
-    return recommendations[:5]
+    # Score every symbol in one vectorized pass and keep the top 5
+    return table.score(scoring_config).top(5).records()
 
 def get_mock_predictions():
     """Return mock predictions when API calls fail"""
@@ -397,83 +543,399 @@ def get_mock_predictions():
         }
     ]
 
+def json_response(payload, headers=None):
+    """JSON response timed as the encode stage; QuoteTables are encoded from their columns"""
+    with span('json'):
+        body = dumps(payload)
+    return encoded_response(body, headers)
+
+def encoded_response(body, headers=None):
+    """Response for an encoded JSON body with an ETag
+    
+    Clients that already hold the body get a 304 and large bodies are
+    compressed when the client accepts it.
+    """
+    status, body, headers = negotiate(body, request.headers, headers)
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
+def scored_quote(data):
+    """One symbol's stock data with its score, signal and explanations"""
+    return QuoteTable.from_records([data]).score(scoring_config).records()[0]
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Top-5 recommendations recomputed in the background and served from memory;
+# with a shared cache backend all workers serve the same snapshot
+predictions_snapshot = PredictionSnapshot(
+    analyze_stocks,
+    cache=make_cache('predictions') if CACHE_BACKEND != 'memory' else None
+)
+# Seconds clients are asked to wait before polling again while the first
+# snapshot is being computed
+PREDICTIONS_RETRY_AFTER = int(os.getenv('PREDICTIONS_RETRY_AFTER', 5))
+
+def start_background_jobs():
+    """Start the snapshot scheduler and warm the metadata cache once per process"""
+    if predictions_snapshot.start():
+        metadata_store.prefetch([stock['symbol'] for stock in STOCKS])
+
+# Encoded snapshot bodies by generation time; polls between refreshes reuse
+# the same bytes and ETag
+encoded_predictions = TTLCache(maxsize=4, ttl=24 * 3600)
+
+def latest_bar_time(quotes):
+    """Newest as_of among quotes, or None if none has one"""
+    times = [quote['as_of'] for quote in quotes if quote.get('as_of') is not None and not np.isnan(quote['as_of'])]
+    return max(times) if times else None
+
+def encoded_snapshot(snapshot):
+    """JSON body, ETag and newest bar time of a snapshot's predictions, encoded once per snapshot"""
+    encoded = encoded_predictions.get(snapshot['generated_at'])
+    if encoded is None:
+        with span('json'):
+            body = dumps(snapshot['predictions'])
+        encoded = (body, etag(body), latest_bar_time(snapshot['predictions']))
+        encoded_predictions.set(snapshot['generated_at'], encoded)
+    return encoded
+
+def current_predictions():
+    """Encoded top-5 predictions and response headers from the snapshot
+
+    Until the first snapshot exists the body is a warming_up state rather
+    than predictions, so clients never show placeholder signals as real.
+    """
+    start_background_jobs()
+    snapshot = predictions_snapshot.get()
+    if not snapshot:
+        print("No predictions snapshot yet, still warming up")
+        body = dumps({'warming_up': True, 'retry_after': PREDICTIONS_RETRY_AFTER})
+        return body, {'X-Snapshot-Stale': 'true', 'Cache-Control': 'no-cache',
+                      'Retry-After': str(PREDICTIONS_RETRY_AFTER)}
+    body, tag, as_of = encoded_snapshot(snapshot)
+    headers = {
+        'ETag': tag,
+        # Caches count Age against max-age, so this stays fresh until the next refresh
+        'Cache-Control': cache_control(predictions_snapshot.interval),
+        'Age': str(int(snapshot['age'])),
+        'X-Snapshot-Generated-At': datetime.fromtimestamp(snapshot['generated_at']).isoformat(),
+        'X-Snapshot-Stale': 'true' if snapshot['stale'] else 'false'
+    }
+    if as_of:
+        headers['Last-Modified'] = http_date(as_of)
+    return body, headers
+
 @app.route('/get_predictions')
 def get_predictions():
     try:
-        recommendations = analyze_stocks()
-        if not recommendations:
-            print("No recommendations found, using mock data")
-            return jsonify(get_mock_predictions())
-        return jsonify(recommendations)
+        body, headers = current_predictions()
+        return encoded_response(body, headers)
     except Exception as e:
         print(f"Error getting predictions: {str(e)}")
         print("Using mock data as fallback")
         return jsonify(get_mock_predictions())
 
+# Encoded /search_stock responses, served until the stock data behind them
+# expires so repeat and conditional requests skip the pipeline
+search_responses = TTLCache(ttl=market_ttl)
+
+def quote_headers(encoded):
+    """ETag, Last-Modified and Cache-Control of an encoded quote"""
+    headers = {
+        'ETag': encoded['etag'],
+        'Cache-Control': cache_control(encoded['expires'] - time.time())
+    }
+    if encoded['as_of']:
+        headers['Last-Modified'] = http_date(encoded['as_of'])
+    return headers
+
+def cached_quote(symbol, interval):
+    """Encoded body and headers of a still fresh /search_stock response, or None"""
+    encoded = search_responses.get((symbol, interval))
+    if encoded is None:
+        return None
+    return encoded['body'], quote_headers(encoded)
+
+def encode_quote(symbol, interval, data):
+    """Score and encode one symbol's stock data and keep it until the data expires"""
+    with span('json'):
+        body = dumps(scored_quote(data))
+    expires = data.get('fetched_at', time.time()) + market_ttl()
+    encoded = {'body': body, 'etag': etag(body), 'as_of': latest_bar_time([data]), 'expires': expires}
+    search_responses.set((symbol, interval), encoded, ttl=max(0, expires - time.time()))
+    return body, quote_headers(encoded)
+
+def bad_request(message):
+    """400 response for invalid request input
+    
+    Failures past validation (unknown symbols, upstream errors) are still
+    reported in the body of a 200.
+    """
+    return jsonify({'error': message}), 400
+
 @app.route('/search_stock/<symbol>')
 def search_stock(symbol):
     """Search for a specific stock and return its prediction"""
     try:
         # Validate symbol
         if not symbol or len(symbol) > 10:
-            return jsonify({'error': 'Invalid stock symbol'})
+            return bad_request('Invalid stock symbol')
+        
+        interval = requested_interval({}, request.args)
+        if interval is None:
+            return bad_request(interval_error())
+        
+        cached = cached_quote(symbol.upper(), interval)
+        if cached:
+            return encoded_response(*cached)
         
         # Get stock data
-        data = get_stock_data(symbol.upper())
+        data = get_stock_data(symbol.upper(), interval)
         if not data:
             return jsonify({'error': f'Could not find data for {symbol.upper()}. Please check the symbol and try again.'})
         
-        # Calculate technical score
-        technical_score = 0
-        if data['rsi'] < 30:  # Oversold
-            technical_score += 1
-        elif data['rsi'] > 70:  # Overbought
-            technical_score -= 1
-        
-        if data['macd'] > 0:  # Bullish MACD
-            technical_score += 1
-        else:  # Bearish MACD
-            technical_score -= 1
-        
-        # Calculate sentiment score
-        sentiment_score = (data['sentiment'] + 1) / 2  # Normalize to 0-1
-        
-        # Calculate momentum score
-        momentum_score = 1 if data['change'] > 0 else 0
-        
-        # Calculate final score (weighted average)
-        final_score = (
-            technical_score * 0.4 +
-            sentiment_score * 0.3 +
-            momentum_score * 0.3
-        )
-        
-        # Determine trading signal
-        if final_score > 0.6:
-            signal = "Strong Buy"
-        elif final_score > 0.4:
-            signal = "Buy"
-        elif final_score < 0.4:
-            signal = "Sell"
-        else:
-            signal = "Hold"
-        
-        data['signal'] = signal
-        data['score'] = final_score
-        
-        return jsonify(data)
+        # Calculate score and trading signal
+        return encoded_response(*encode_quote(symbol.upper(), interval, data))
         
     except Exception as e:
         print(f"Error searching for stock {symbol}: {str(e)}")
         return jsonify({'error': f'Error analyzing {symbol.upper()}. Please try again.'})
 
+def requested_symbols(body, args):
+    """Symbols asked for in a JSON body or comma separated 'symbols' argument
+    
+    Returns the cleaned-up request list and the valid, deduped symbols.
+    Raises ValueError if the body is not a JSON object or its 'symbols'
+    is neither a string nor a list.
+    """
+    if not isinstance(body, dict):
+        raise ValueError('Request body must be a JSON object')
+    requested = body.get('symbols') or args.get('symbols', '')
+    if isinstance(requested, str):
+        requested = requested.split(',')
+    elif not isinstance(requested, list):
+        raise ValueError("'symbols' must be a comma separated string or a list")
+    requested = [str(symbol).strip().upper() for symbol in requested if str(symbol).strip()]
+    return requested, normalize_symbols(requested)
+
+def requested_interval(body, args):
+    """Bar interval from a JSON body or 'interval' argument, or None if unsupported"""
+    interval = str(body.get('interval') or args.get('interval') or '1d')
+    return interval if interval in INTERVALS else None
+
+def interval_error():
+    return f"Interval must be one of {', '.join(INTERVALS)}"
+
+def requested_k(args):
+    """Number of top rows a screen returns, or None unless a whole number of at least 1"""
+    k = str(args.get('k', 20)).strip()
+    return int(k) if k.isdigit() and int(k) >= 1 else None
+
+def search_error(symbols):
+    """Error message for an unusable symbol list, or None"""
+    if not symbols:
+        return 'No valid stock symbols'
+    if len(symbols) > SEARCH_MAX_SYMBOLS:
+        return f'At most {SEARCH_MAX_SYMBOLS} symbols can be searched at once'
+    return None
+
+def search_results(requested, symbols, results, fetch_errors):
+    """Score the found symbols together and collect per-symbol errors
+    
+    The results are a QuoteTable; encode the payload with quotes.dumps().
+    """
+    errors = {symbol: 'Invalid stock symbol' for symbol in requested if symbol not in symbols}
+    found = QuoteTable.from_records([results[symbol] for symbol in symbols if symbol in results])
+    found.score(scoring_config)
+    for symbol in symbols:
+        if symbol not in results:
+            errors[symbol] = f'Could not find data for {symbol}. Please check the symbol and try again.'
+            if symbol in fetch_errors:
+                print(f"Error getting stock data for {symbol}: {fetch_errors[symbol]}")
+    return {'results': found, 'errors': errors}
+
+@app.route('/search_stocks', methods=['GET', 'POST'])
+def search_stocks():
+    """Search for many stocks at once and return their predictions
+    
+    Symbols come from a JSON body ({"symbols": [...]}) or a comma separated
+    'symbols' argument. They are deduped and fetched together, reusing any
+    cached data. An optional 'interval' selects intraday bars. Per-symbol
+    failures are returned under 'errors'.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        requested, symbols = requested_symbols(body, request.args)
+    except ValueError as e:
+        return bad_request(str(e))
+    error = search_error(symbols)
+    if error:
+        return bad_request(error)
+    interval = requested_interval(body, request.args)
+    if interval is None:
+        return bad_request(interval_error())
+    
+    try:
+        results, fetch_errors = get_stocks_data(symbols, interval, metadata_wait=METADATA_WAIT)
+    except Exception as e:
+        print(f"Error searching for {len(symbols)} stocks: {str(e)}")
+        return jsonify({'error': 'Error analyzing stocks. Please try again.'})
+    
+    # Calculate scores and trading signals for all found symbols together
+    return json_response(search_results(requested, symbols, results, fetch_errors))
+
+@app.route('/screener', methods=['GET', 'POST'])
+def screener():
+    """Screen a universe of symbols and stream matching rows as they complete
+    
+    Symbols come from a JSON body or 'symbols' argument (comma separated),
+    or from a named universe file; the default universe is STOCKS. Rows are
+    streamed as NDJSON, or as Server-Sent Events when the client accepts
+    text/event-stream, and the last message holds the top-k rows.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        requested, symbols = requested_symbols(body, request.args)
+    except ValueError as e:
+        return bad_request(str(e))
+    args = {**request.args.to_dict(), **{key: str(value) for key, value in body.items() if key != 'symbols'}}
+    
+    if not requested and args.get('universe'):
+        symbols = load_universe(args['universe'])
+        if symbols is None:
+            return bad_request(f"Unknown universe {args['universe']}")
+    elif not requested:
+        symbols = [stock['symbol'] for stock in STOCKS]
+    
+    if not symbols:
+        return bad_request('No valid stock symbols')
+    if len(symbols) > SCREENER_MAX_SYMBOLS:
+        return bad_request(f'At most {SCREENER_MAX_SYMBOLS} symbols can be screened at once')
+    k = requested_k(args)
+    if k is None:
+        return bad_request('k must be a whole number of at least 1')
+    try:
+        filters = parse_filters(args)
+    except ValueError:
+        return bad_request('Invalid screener filter')
+    
+    # Sector and market cap filters need metadata, so fetch it up front
+    metadata_wait = 0
+    if needs_metadata(filters):
+        metadata_store.prefetch(symbols)
+        metadata_wait = METADATA_WAIT
+    
+    use_sse = args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    formatter = format_sse if use_sse else format_ndjson
+    
+    def generate():
+        events = screen(
+            symbols,
+            lambda chunk: get_stocks_data(chunk, metadata_wait=metadata_wait),
+            filters=filters, k=k, scoring_config=scoring_config,
+            # Placeholder sector and market cap would fail the filters silently
+            known=metadata_store.known if metadata_wait else None
+        )
+        for event, payload in events:
+            yield formatter(event, payload)
+    
+    # Large scans compress well; each chunk is flushed so rows still arrive as they complete
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    chunks = compress_stream(generate(), encoding) if encoding else generate()
+    response = Response(
+        stream_with_context(chunks),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+# Indicator state of the tracked symbols; each live poll only feeds the bars
+# that arrived since the last one
+live_indicators = IndicatorStates()
+
+def live_indicator_table(histories):
+    try:
+        with span('indicators'):
+            return live_indicators.table(histories)
+    except Exception as e:
+        print(f"Error updating live indicators: {str(e)}")
+        return indicator_table(histories)
+
+def get_live_quotes(symbols):
+    """Scored stock data for the live stream, keyed by symbol"""
+    results, errors = get_stocks_data(symbols, indicator_source=live_indicator_table)
+    for symbol, error in errors.items():
+        print(f"Error getting stock data for {symbol}: {error}")
+    table = QuoteTable.from_records([results[symbol] for symbol in symbols if symbol in results])
+    quotes = table.score(scoring_config).records()
+    return {quote['symbol']: quote for quote in quotes}
+
+# One refresh loop for the tracked symbols shared by every open /stream
+live_quotes = QuoteBroadcaster(get_live_quotes, [stock['symbol'] for stock in STOCKS])
+
+@app.route('/stream')
+def stream():
+    """Push quote changes for the tracked symbols as Server-Sent Events
+    
+    Clients get a 'snapshot' event with every quote, then 'update' events
+    with only the fields that changed since the last poll.
+    """
+    subscriber = live_quotes.subscribe()
+    
+    def generate():
+        for message in live_quotes.stream(subscriber):
+            if message is None:
+                # Comment line keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+            else:
+                yield format_sse(*message)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/get_prediction')
 def get_prediction():
     return get_predictions()
 
+def cache_hit_counts():
+    """Hits and misses of every cache, keyed by cache name"""
+    sentiment = sentiment_scorer.stats()
+    return {
+        'history': history_cache.stats(),
+        'stock_data': stock_data_cache.stats(),
+        'metadata': metadata_store.stats(),
+        'news': news_client.stats()['cache'],
+        'sentiment': {
+            'hits': sentiment['texts_seen'] - sentiment['texts_scored'],
+            'misses': sentiment['texts_scored']
+        }
+    }
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Stage and request latency histograms, upstream errors and cache hit rates"""
+    return Response(metrics.render(cache_hit_counts()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Hit/miss counters for the in-process caches"""
+    return jsonify({
+        'history': history_cache.stats(),
+        'stock_data': stock_data_cache.stats(),
+        'metadata': metadata_store.stats(),
+        'news': news_client.stats(),
+        'sentiment': sentiment_scorer.stats(),
+        'live': live_quotes.stats(),
+        'intraday': intraday_bars.stats()
+    })
+
 if __name__ == '__main__':
+    start_background_jobs()
     app.run(host='0.0.0.0', port=5050) 
\ No newline at end of file
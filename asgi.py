@@ -0,0 +1,319 @@
+# Async (ASGI) serving mode: `uvicorn asgi:app`
+#
+# The I/O-bound JSON endpoints and /stream are served on an event loop.
+# Upstream calls run in a thread pool and are awaited concurrently,
+# indicator and sentiment math runs in a second thread pool sized to the
+# CPU count (NumPy releases the GIL for most of it), and a request waiting
+# on upstream data does not hold a worker thread. Every other route falls
+# through to the Flask app on a pool of its own threads.
+import asyncio
+import contextvars
+import json
+import os
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+import app as flask_app
+import metrics
+from concurrency import SYMBOL_TIMEOUT
+from metrics import span
+from quotes import dumps
+from responses import negotiate
+from screener import format_sse
+
+ASYNC_IO_WORKERS = int(os.getenv('ASYNC_IO_WORKERS', 32))
+ASYNC_CPU_WORKERS = int(os.getenv('ASYNC_CPU_WORKERS', os.cpu_count() or 1))
+# Threads for routes served by the Flask app; a long /screener scan holds one
+ASYNC_WSGI_WORKERS = int(os.getenv('ASYNC_WSGI_WORKERS', 16))
+# How often an open /stream checks its queue for new events
+STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL', 0.25))
+
+io_executor = ThreadPoolExecutor(max_workers=ASYNC_IO_WORKERS, thread_name_prefix='async-io')
+cpu_executor = ThreadPoolExecutor(max_workers=ASYNC_CPU_WORKERS, thread_name_prefix='async-cpu')
+wsgi_executor = ThreadPoolExecutor(max_workers=ASYNC_WSGI_WORKERS, thread_name_prefix='async-wsgi')
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'Content-Type,Authorization'),
+    (b'access-control-allow-methods', b'GET,PUT,POST,DELETE,OPTIONS'),
+]
+
+
+# Pool threads run in a copy of the request's context so stage spans land
+# on its trace
+async def run_io(func, *args):
+    call = partial(contextvars.copy_context().run, func, *args)
+    return await asyncio.get_running_loop().run_in_executor(io_executor, call)
+
+
+async def run_cpu(func, *args):
+    call = partial(contextvars.copy_context().run, func, *args)
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, call)
+
+
+async def fetch_stocks_data(symbols, interval, results):
+    """Async counterpart of app.fetch_stocks_data(); returns errors"""
+    histories, errors = await run_io(flask_app.fetch_histories, symbols, interval)
+    indicators = await run_cpu(flask_app.indicator_table, histories)
+    ready = flask_app.ready_symbols(histories, indicators, errors)
+    built = flask_app.build_ready(ready, histories, indicators, errors)
+
+    async def news(symbol):
+        with span('news', symbol):
+            return await run_io(flask_app.news_client.get_articles, symbol)
+
+    outcomes = await asyncio.gather(
+        *(asyncio.wait_for(news(symbol), SYMBOL_TIMEOUT) for symbol in built),
+        return_exceptions=True
+    )
+    # Symbols whose news failed are still returned, with neutral sentiment
+    articles = {}
+    for symbol, outcome in zip(built, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            print(f"Timed out after {SYMBOL_TIMEOUT}s fetching news for {symbol}")
+        elif isinstance(outcome, Exception):
+            print(f"Error fetching news for {symbol}: {str(outcome)}")
+        else:
+            articles[symbol] = outcome
+    await run_cpu(flask_app.store_stock_data, built, articles, interval, results)
+    return errors
+
+
+async def get_stocks_data(symbols, interval='1d', metadata_wait=0):
+    """Async counterpart of app.get_stocks_data()"""
+    if metadata_wait:
+        flask_app.metadata_store.prefetch(symbols)
+    results, missing = flask_app.cached_stocks_data(symbols, interval)
+    errors = await fetch_stocks_data(missing, interval, results) if missing else {}
+    await run_io(flask_app.merge_metadata, results, metadata_wait)
+    return results, errors
+
+
+class BadRequest(Exception):
+    """Invalid request input, answered like app.bad_request() with a 400"""
+
+
+class Request:
+    """The parts of an ASGI HTTP request the endpoints need"""
+
+    def __init__(self, scope, body, params):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.params = params
+        self.args = {key: values[0] for key, values in parse_qs(scope['query_string'].decode()).items()}
+        self.headers = {key.decode().lower(): value.decode() for key, value in scope['headers']}
+        self.body = body
+
+    def json(self):
+        try:
+            return json.loads(self.body) if self.body else {}
+        except ValueError:
+            return {}
+
+
+async def get_predictions(request):
+    try:
+        return await run_io(flask_app.current_predictions)
+    except Exception as e:
+        print(f"Error getting predictions: {str(e)}")
+        print("Using mock data as fallback")
+        return flask_app.get_mock_predictions(), {}
+
+
+async def search_stock(request):
+    """Search for a specific stock and return its prediction"""
+    symbol = request.params['symbol'].upper()
+    if not symbol or len(symbol) > 10:
+        raise BadRequest('Invalid stock symbol')
+    interval = flask_app.requested_interval({}, request.args)
+    if interval is None:
+        raise BadRequest(flask_app.interval_error())
+    try:
+        cached = flask_app.cached_quote(symbol, interval)
+        if cached:
+            return cached
+        results, errors = await get_stocks_data([symbol], interval, metadata_wait=flask_app.METADATA_WAIT)
+        data = results.get(symbol)
+        if not data:
+            if symbol in errors:
+                print(f"Error getting stock data for {symbol}: {errors[symbol]}")
+            return {'error': f'Could not find data for {symbol}. Please check the symbol and try again.'}, {}
+        return flask_app.encode_quote(symbol, interval, data)
+    except Exception as e:
+        print(f"Error searching for stock {symbol}: {str(e)}")
+        return {'error': f'Error analyzing {symbol}. Please try again.'}, {}
+
+
+async def search_stocks(request):
+    """Search for many stocks at once and return their predictions"""
+    body = request.json()
+    try:
+        requested, symbols = flask_app.requested_symbols(body, request.args)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    error = flask_app.search_error(symbols)
+    if error:
+        raise BadRequest(error)
+    interval = flask_app.requested_interval(body, request.args)
+    if interval is None:
+        raise BadRequest(flask_app.interval_error())
+    try:
+        results, fetch_errors = await get_stocks_data(symbols, interval, metadata_wait=flask_app.METADATA_WAIT)
+    except Exception as e:
+        print(f"Error searching for {len(symbols)} stocks: {str(e)}")
+        return {'error': 'Error analyzing stocks. Please try again.'}, {}
+    return await run_cpu(flask_app.search_results, requested, symbols, results, fetch_errors), {}
+
+
+ROUTES = [
+    ({'GET'}, re.compile(r'^/get_predictions$'), get_predictions),
+    ({'GET'}, re.compile(r'^/get_prediction$'), get_predictions),
+    ({'GET'}, re.compile(r'^/search_stock/(?P<symbol>[^/]+)$'), search_stock),
+    ({'GET', 'POST'}, re.compile(r'^/search_stocks$'), search_stocks),
+]
+
+class PooledWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs WSGI calls thread-sensitively, i.e. all on one shared
+    # thread, so one slow Flask response would block every other one
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.run_wsgi_app.__wrapped__, thread_sensitive=False, executor=wsgi_executor
+    )
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi running each request on wsgi_executor"""
+
+    async def __call__(self, scope, receive, send):
+        await PooledWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+
+wsgi_app = PooledWsgiToAsgi(flask_app.app)
+
+
+def match(method, path):
+    for methods, pattern, handler in ROUTES:
+        found = pattern.match(path)
+        if found and method in methods:
+            return handler, found.groupdict()
+    return None, None
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_json(send, request, payload, headers=None, status=200):
+    """Send a payload, or an already encoded body, with an ETag and compression
+
+    Responses with any other status than 200 are sent as they are.
+    """
+    if not isinstance(payload, bytes):
+        with span('json'):
+            payload = dumps(payload)
+    if status == 200:
+        status, body, headers = negotiate(payload, request.headers, headers)
+    else:
+        body, headers = payload, dict(headers or {})
+    trace = metrics.current_trace()
+    if trace is not None and metrics.SERVER_TIMING:
+        headers['Server-Timing'] = trace.server_timing()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            *CORS_HEADERS,
+            *((key.lower().encode(), str(value).encode()) for key, value in headers.items())
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream(scope, receive, send):
+    """/stream on the event loop: quote events as Server-Sent Events until the client disconnects
+
+    Open streams hold no thread; each checks its subscriber queue every
+    STREAM_POLL_INTERVAL seconds.
+    """
+    live = flask_app.live_quotes
+    subscriber = live.subscribe()
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                *CORS_HEADERS
+            ]
+        })
+        last_sent = time.monotonic()
+        while not disconnected.done():
+            try:
+                chunk = format_sse(*subscriber.get_nowait())
+            except queue.Empty:
+                if time.monotonic() - last_sent < live.heartbeat:
+                    await asyncio.sleep(STREAM_POLL_INTERVAL)
+                    continue
+                # Comment line keeps proxies from closing an idle connection
+                chunk = ': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+            last_sent = time.monotonic()
+    finally:
+        disconnected.cancel()
+        live.unsubscribe(subscriber)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            flask_app.start_background_jobs()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http':
+        if scope['method'] == 'GET' and scope['path'] == '/stream':
+            return await stream(scope, receive, send)
+        handler, params = match(scope['method'], scope['path'])
+        if handler is not None:
+            token = metrics.start_trace()
+            try:
+                request = Request(scope, await read_body(receive), params)
+                try:
+                    payload, headers = await handler(request)
+                    status = 200
+                except BadRequest as e:
+                    payload, headers, status = {'error': str(e)}, {}, 400
+                await send_json(send, request, payload, headers, status)
+                metrics.request_seconds.observe(metrics.current_trace().elapsed(), handler.__name__)
+            finally:
+                metrics.end_trace(token)
+            return
+    return await wsgi_app(scope, receive, send)
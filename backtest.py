@@ -0,0 +1,219 @@
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from indicators import macd_series, rsi_series
+from price_store import PRICE_STORE_DIR, PriceStore
+from scoring import SIGNALS, load_scoring_config, score_features
+from screener import load_universe, normalize_symbols
+
+TRADING_DAYS = 252
+# Historical news is not available, so every date gets the neutral
+# sentiment the app uses when there are no articles
+BACKTEST_SENTIMENT = 0.5
+# Direction each signal bets on, used for the hit rate
+SIGNAL_DIRECTION = {'Strong Buy': 1, 'Buy': 1, 'Sell': -1, 'Hold': 0}
+
+
+def compute_features(close):
+    """RSI, MACD and daily % change for every row of a (T, N) close array
+
+    Values at row t only use closes up to t, so there is no look-ahead.
+    Rows before the indicators have warmed up are NaN.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.full(close.shape, np.nan)
+        change[1:] = (close[1:] - close[:-1]) / close[:-1] * 100
+    return {'rsi': rsi_series(close), 'macd': macd_series(close), 'change': change}
+
+
+def compute_signals(close, config=None, sentiment=BACKTEST_SENTIMENT):
+    """Signal index (into SIGNALS) for every date and symbol of a (T, N) close array
+
+    Rows before the indicators have warmed up, or without a close, get -1.
+    """
+    features = compute_features(close)
+    rsi, macd, change = features['rsi'], features['macd'], features['change']
+    _, signals = score_features(
+        rsi.ravel(), macd.ravel(), np.full(close.size, sentiment), change.ravel(), config
+    )
+    signals = signals.reshape(close.shape)
+    valid = ~(np.isnan(rsi) | np.isnan(macd) | np.isnan(change))
+    return np.where(valid, signals, -1)
+
+
+def forward_returns(close, horizon):
+    """Return from the close at t to the close at t + horizon"""
+    returns = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return returns
+
+
+def aggregate(closes, horizons, config=None):
+    """Per-date sums of forward returns, hits and counts for each signal bucket
+
+    closes is a date x symbol frame of closing prices. The result can be
+    added to the aggregates of other symbols (e.g. from other processes)
+    before calling summarize().
+    """
+    close = closes.to_numpy(dtype=float)
+    signals = compute_signals(close, config)
+    columns = {}
+    for horizon in horizons:
+        returns = forward_returns(close, horizon)
+        has_return = ~np.isnan(returns)
+        for index, signal in enumerate(SIGNALS):
+            in_bucket = (signals == index) & has_return
+            bucket_returns = np.where(in_bucket, returns, 0.0)
+            direction = SIGNAL_DIRECTION[signal]
+            hits = in_bucket & (np.sign(returns) == direction) if direction else np.zeros_like(in_bucket)
+            columns[(horizon, signal, 'sum')] = bucket_returns.sum(axis=1)
+            columns[(horizon, signal, 'count')] = in_bucket.sum(axis=1)
+            columns[(horizon, signal, 'hits')] = hits.sum(axis=1)
+    return pd.DataFrame(columns, index=closes.index)
+
+
+def _max_drawdown(equity):
+    peaks = np.maximum.accumulate(equity)
+    return float(np.min(equity / peaks - 1)) if len(equity) else 0.0
+
+
+def summarize(aggregates, horizons):
+    """Hit rate, returns and drawdown per horizon and signal bucket
+
+    Drawdown and total return describe an equal-weight portfolio that
+    holds every symbol in the bucket for one day and rebalances daily.
+    """
+    rows = []
+    for horizon in horizons:
+        for signal in SIGNALS:
+            count = aggregates[(horizon, signal, 'count')]
+            total = int(count.sum())
+            row = {
+                'horizon': horizon,
+                'signal': signal,
+                'observations': total,
+                'hit_rate': float(aggregates[(horizon, signal, 'hits')].sum() / total) if total and SIGNAL_DIRECTION[signal] else None,
+                'mean_return': float(aggregates[(horizon, signal, 'sum')].sum() / total) if total else None
+            }
+            if horizon == 1:
+                daily = (aggregates[(1, signal, 'sum')] / count.where(count > 0)).fillna(0.0).to_numpy()
+                equity = np.cumprod(1 + daily)
+                years = len(daily) / TRADING_DAYS
+                row['total_return'] = float(equity[-1] - 1) if len(equity) else 0.0
+                row['annualized_return'] = float(equity[-1] ** (1 / years) - 1) if years and equity[-1] > 0 else None
+                row['max_drawdown'] = _max_drawdown(equity)
+            rows.append(row)
+    return rows
+
+
+def load_closes(symbols, root=PRICE_STORE_DIR, start=None):
+    """Date x symbol close prices from the local price store"""
+    store = PriceStore(root)
+    series = {}
+    for symbol in symbols:
+        bars = store.read(symbol, start=start)
+        if not bars.empty:
+            series[symbol] = bars['Close']
+    if not series:
+        return pd.DataFrame()
+    closes = pd.DataFrame(series)
+    # Compare dates, not timestamps, so bars stamped at different times line up
+    closes.index = closes.index.normalize()
+    return closes.groupby(level=0).last()
+
+
+def _backtest_chunk(symbols, root, start, horizons, config):
+    closes = load_closes(symbols, root, start)
+    if closes.empty:
+        return None, []
+    return aggregate(closes, horizons, config), list(closes.columns)
+
+
+def run_backtest(symbols, horizons=(1, 5, 20), years=10, config=None, workers=1, root=PRICE_STORE_DIR):
+    """Backtest the scoring rules over stored history for many symbols
+
+    With workers > 1 the symbols are split across a process pool and the
+    per-date aggregates are summed afterwards. Returns the summary rows and
+    the list of symbols that had stored history.
+    """
+    horizons = sorted(set(horizons) | {1})
+    start = datetime.now() - timedelta(days=int(years * 365.25))
+    chunk_size = max(1, math.ceil(len(symbols) / max(workers, 1)))
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outputs = list(executor.map(
+                _backtest_chunk, chunks, [root] * len(chunks), [start] * len(chunks),
+                [horizons] * len(chunks), [config] * len(chunks)
+            ))
+    else:
+        outputs = [_backtest_chunk(chunk, root, start, horizons, config) for chunk in chunks]
+
+    frames = [frame for frame, _ in outputs if frame is not None]
+    covered = [symbol for _, chunk_symbols in outputs for symbol in chunk_symbols]
+    if not frames:
+        return [], covered
+    total = frames[0]
+    for frame in frames[1:]:
+        total = total.add(frame, fill_value=0)
+    return summarize(total.sort_index(), horizons), covered
+
+
+def _format_value(value, percent=False):
+    if value is None:
+        return '-'
+    return f"{value * 100:.2f}%" if percent else str(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backtest the signal rules over stored daily bars')
+    parser.add_argument('symbols', nargs='*')
+    parser.add_argument('--universe', help='name of a universe file in universes/')
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--horizon', type=int, nargs='+', default=[1, 5, 20], help='forward return horizons in days')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--root', default=PRICE_STORE_DIR, help='price store directory')
+    parser.add_argument('--config', default='', help='scoring config JSON file')
+    parser.add_argument('--output', help='write the summary as JSON')
+    args = parser.parse_args(argv)
+
+    symbols = normalize_symbols(args.symbols)
+    if args.universe:
+        symbols += load_universe(args.universe) or []
+    symbols = list(dict.fromkeys(symbols)) or PriceStore(args.root).symbols()
+    if not symbols:
+        parser.error('no symbols given and the price store is empty')
+
+    started = time.perf_counter()
+    rows, covered = run_backtest(
+        symbols, args.horizon, args.years, load_scoring_config(args.config), args.workers, args.root
+    )
+    elapsed = time.perf_counter() - started
+
+    missing = sorted(set(symbols) - set(covered))
+    if missing:
+        print(f"No stored history for {len(missing)} symbols (run price_store.py backfill): {', '.join(missing[:20])}")
+    print(f"Backtested {len(covered)} symbols in {elapsed:.2f}s")
+    print(f"{'horizon':>7} {'signal':>10} {'obs':>9} {'hit rate':>9} {'mean':>8} {'total':>9} {'max dd':>8}")
+    for row in rows:
+        print(f"{row['horizon']:>7} {row['signal']:>10} {row['observations']:>9} "
+              f"{_format_value(row['hit_rate'], True):>9} {_format_value(row['mean_return'], True):>8} "
+              f"{_format_value(row.get('total_return'), True):>9} {_format_value(row.get('max_drawdown'), True):>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'symbols': covered, 'seconds': elapsed, 'results': rows}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import platform
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import app as app_module
+from cache import CACHE_MAX_ENTRIES, TTLCache
+from metadata import MetadataStore
+from news import NewsClient
+from providers import REPLAY_FIXTURES_DIR, NewsAPIProvider, ReplayProvider, YFinanceProvider, save_fixtures
+from screener import load_universe
+from sentiment import SentimentScorer
+from snapshot import PredictionSnapshot
+
+# Small generated fixture set kept in the repository, used by the tests and
+# by 'run' when nothing has been recorded to REPLAY_FIXTURES_DIR; rebuild
+# it with: python benchmark.py synthesize --count 20 --fixtures tests/fixtures/replay
+COMMITTED_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'fixtures', 'replay')
+
+SECTORS = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Consumer Cyclical', 'Industrials']
+HEADLINES = [
+    '{name} reported strong quarterly results and raised its full-year outlook.',
+    '{name} shares fell after weak guidance disappointed analysts.',
+    'Analysts remain cautious on {name} ahead of next week\'s earnings call.',
+    '{name} announced a new buyback program and a higher dividend.',
+    'Regulators opened an inquiry into {name}, weighing on the stock.',
+    '{name} traded flat in a quiet session for the broader market.',
+    'Investors cheered {name}\'s surprising growth in its core business.',
+    '{name} cut jobs as demand slowed across its main markets.',
+]
+
+
+def record(path, symbols, days=60):
+    """Record live history, metadata and news for symbols as replay fixtures
+
+    News is only recorded when NEWS_API_KEY is set; without it the replay
+    serves no articles, as the app does without a key.
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    market_data = YFinanceProvider()
+    histories, errors = market_data.get_history(symbols, start_date, end_date)
+    for symbol, error in errors.items():
+        print(f"No history recorded for {symbol}: {error}")
+
+    recorded = sorted(histories)
+    metadata, errors = market_data.get_metadata(recorded)
+    for symbol, error in errors.items():
+        print(f"No metadata recorded for {symbol}: {error}")
+
+    news = {}
+    news_provider = NewsAPIProvider()
+    if news_provider.enabled:
+        news, errors = news_provider.get_news(recorded)
+        for symbol, error in errors.items():
+            print(f"No news recorded for {symbol}: {error}")
+    save_fixtures(path, histories, metadata, news)
+    return recorded
+
+
+def synthesize(path, count, days=60, seed=0):
+    """Write generated fixtures for count made-up symbols, for when recording is not possible"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end='2024-03-01', periods=int(days * 5 / 7))
+    histories = {}
+    metadata = {}
+    news = {}
+    for i in range(count):
+        symbol = f'S{i:04d}'
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, len(index)))) * rng.uniform(0.2, 5)
+        spread = close * rng.uniform(0.002, 0.02, len(index))
+        histories[symbol] = pd.DataFrame({
+            'Open': close + rng.normal(0, 0.5, len(index)) * spread,
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rng.integers(10 ** 5, 10 ** 7, len(index))
+        }, index=index)
+        name = f'Company {symbol} Inc.'
+        metadata[symbol] = {
+            'name': name,
+            'sector': SECTORS[i % len(SECTORS)],
+            'industry': 'Various',
+            'market_cap': int(rng.integers(10 ** 8, 10 ** 12)),
+            'pe_ratio': float(rng.uniform(5, 60))
+        }
+        news[symbol] = [
+            {'title': f'{symbol} news', 'description': HEADLINES[j].format(name=name)}
+            for j in rng.choice(len(HEADLINES), size=5, replace=False)
+        ]
+    save_fixtures(path, histories, metadata, news)
+    return sorted(histories)
+
+
+@contextmanager
+def replay(provider, symbols):
+    """Point the app at a replay provider with cold caches, restoring everything after
+
+    The replay provider is not rate limited, so the benchmark measures the
+    app's own work.
+    """
+    patches = [
+        ('market_data', provider),
+        ('price_store', None),
+        ('history_cache', TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=3600)),
+        ('stock_data_cache', TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=3600)),
+        ('search_responses', TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=3600)),
+        ('metadata_store', MetadataStore(provider=provider, path=None)),
+        ('news_client', NewsClient(provider=provider, daily_quota=10 ** 9)),
+        ('sentiment_scorer', SentimentScorer(path=None)),
+        ('predictions_snapshot', PredictionSnapshot(app_module.analyze_stocks, path=None)),
+        ('start_background_jobs', lambda: None),
+        ('STOCKS', [{'symbol': symbol, 'name': symbol} for symbol in symbols]),
+        ('SEARCH_MAX_SYMBOLS', max(app_module.SEARCH_MAX_SYMBOLS, len(symbols))),
+    ]
+    saved = [(name, getattr(app_module, name)) for name, _ in patches]
+    for name, value in patches:
+        setattr(app_module, name, value)
+    try:
+        yield app_module
+    finally:
+        for name, value in saved:
+            setattr(app_module, name, value)
+
+
+# Each benchmark returns the calls to time and how many symbols each call covers
+def _technical_indicators(app, client, symbols, provider):
+    return [lambda symbol=symbol: app.get_technical_indicators(provider.histories[symbol]) for symbol in symbols], 1
+
+
+def _news_sentiment(app, client, symbols, provider):
+    return [lambda symbol=symbol: app.get_news_sentiment(symbol) for symbol in symbols], 1
+
+
+def _stock_data(app, client, symbols, provider):
+    return [lambda symbol=symbol: app.get_stock_data(symbol) for symbol in symbols], 1
+
+
+def _analyze_stocks(app, client, symbols, provider):
+    return [app.analyze_stocks], len(symbols)
+
+
+def _search_stock(app, client, symbols, provider):
+    return [lambda symbol=symbol: client.get(f'/search_stock/{symbol}') for symbol in symbols], 1
+
+
+def _search_stocks(app, client, symbols, provider):
+    return [lambda: client.post('/search_stocks', json={'symbols': symbols})], len(symbols)
+
+
+def _get_predictions(app, client, symbols, provider):
+    # Served from a snapshot computed over all symbols
+    app.predictions_snapshot.refresh()
+    return [lambda: client.get('/get_predictions')] * 100, 0
+
+
+BENCHMARKS = {
+    'get_technical_indicators': _technical_indicators,
+    'get_news_sentiment': _news_sentiment,
+    'get_stock_data': _stock_data,
+    'analyze_stocks': _analyze_stocks,
+    'GET /search_stock': _search_stock,
+    'POST /search_stocks': _search_stocks,
+    'GET /get_predictions': _get_predictions,
+}
+
+
+def run_benchmark(name, provider, symbols, repeat=1):
+    """Time one benchmark over symbols, repeat times from cold caches"""
+    latencies = []
+    covered = 0
+    for _ in range(repeat):
+        with replay(provider, symbols) as app:
+            calls, per_call = BENCHMARKS[name](app, app.app.test_client(), symbols, provider)
+            for call in calls:
+                started = time.perf_counter()
+                call()
+                latencies.append(time.perf_counter() - started)
+            covered += per_call * len(calls)
+    latencies = np.array(latencies)
+    seconds = float(latencies.sum())
+    return {
+        'benchmark': name,
+        'symbols': len(symbols),
+        'calls': len(latencies),
+        'seconds': seconds,
+        'calls_per_sec': len(latencies) / seconds if seconds else 0.0,
+        'symbols_per_sec': covered / seconds if seconds else 0.0,
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'max_ms': float(latencies.max() * 1000)
+    }
+
+
+def run_suite(provider, sizes=(10, 100, 1000), names=None, repeat=1):
+    """Run the benchmarks at each symbol count the fixtures cover"""
+    results = []
+    for size in sizes:
+        if size > len(provider.symbols):
+            print(f"Skipping {size} symbols: the fixtures only have {len(provider.symbols)}")
+            continue
+        symbols = provider.symbols[:size]
+        for name in names or BENCHMARKS:
+            results.append(run_benchmark(name, provider, symbols, repeat))
+    return results
+
+
+def compare(baseline, results, tolerance=0.2):
+    """Benchmarks whose mean latency grew by more than tolerance over baseline"""
+    previous = {(row['benchmark'], row['symbols']): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get((row['benchmark'], row['symbols']))
+        if before and before['mean_ms'] and row['mean_ms'] > before['mean_ms'] * (1 + tolerance):
+            regressions.append({**row, 'baseline_mean_ms': before['mean_ms'],
+                                'change': row['mean_ms'] / before['mean_ms'] - 1})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the app offline against recorded market data')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help='record live data as fixtures (needs network)')
+    record_parser.add_argument('symbols', nargs='*')
+    record_parser.add_argument('--universe', help='name of a universe file in universes/')
+    record_parser.add_argument('--fixtures', default=REPLAY_FIXTURES_DIR)
+
+    synth_parser = commands.add_parser('synthesize', help='generate fixtures for made-up symbols')
+    synth_parser.add_argument('--count', type=int, default=1000)
+    synth_parser.add_argument('--seed', type=int, default=0)
+    synth_parser.add_argument('--fixtures', default=REPLAY_FIXTURES_DIR)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks against fixtures')
+    run_parser.add_argument('--fixtures', help=f'fixture directory (default {REPLAY_FIXTURES_DIR} '
+                                               'if it exists, else the committed set)')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    run_parser.add_argument('--benchmark', action='append', choices=list(BENCHMARKS),
+                            help='benchmark to run; may be repeated (default all)')
+    run_parser.add_argument('--repeat', type=int, default=1, help='cold runs per benchmark')
+    run_parser.add_argument('--output', help='write the results as JSON')
+    run_parser.add_argument('--compare', help='results JSON of an earlier run to check for regressions')
+    run_parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before flagging')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        symbols = list(args.symbols)
+        if args.universe:
+            symbols += load_universe(args.universe) or []
+        if not symbols:
+            parser.error('no symbols given')
+        recorded = record(args.fixtures, list(dict.fromkeys(symbols)))
+        print(f"Recorded {len(recorded)} symbols to {args.fixtures}")
+        return 0
+    if args.command == 'synthesize':
+        synthesize(args.fixtures, args.count, seed=args.seed)
+        print(f"Wrote {args.count} generated symbols to {args.fixtures}")
+        return 0
+
+    if not args.fixtures:
+        args.fixtures = REPLAY_FIXTURES_DIR if os.path.isdir(REPLAY_FIXTURES_DIR) else COMMITTED_FIXTURES_DIR
+    provider = ReplayProvider(args.fixtures)
+    results = run_suite(provider, args.sizes, args.benchmark, args.repeat)
+    print(f"{'benchmark':<26} {'symbols':>7} {'calls':>6} {'calls/s':>9} {'symbols/s':>10} {'p50':>9} {'p95':>9}")
+    for row in results:
+        print(f"{row['benchmark']:<26} {row['symbols']:>7} {row['calls']:>6} {row['calls_per_sec']:>9.1f} "
+              f"{row['symbols_per_sec']:>10.1f} {row['p50_ms']:>7.2f}ms {row['p95_ms']:>7.2f}ms")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({
+                'generated_at': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'fixtures': args.fixtures,
+                'results': results
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f)['results'], results, args.tolerance)
+        for row in regressions:
+            print(f"Regression: {row['benchmark']} at {row['symbols']} symbols is {row['change']:.0%} slower "
+                  f"({row['baseline_mean_ms']:.2f}ms -> {row['mean_ms']:.2f}ms)")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,544 @@
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, time as dt_time, timedelta
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+CACHE_TTL_MARKET = float(os.getenv('CACHE_TTL_MARKET', 60))
+CACHE_TTL_CLOSED = float(os.getenv('CACHE_TTL_CLOSED', 3600))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 512))
+
+# 'memory' keeps caches per process; 'sqlite' and 'redis' share them between
+# gunicorn workers (and, for redis, between hosts)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_PATH = os.getenv(
+    'CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache.sqlite')
+)
+CACHE_URL = os.getenv('CACHE_URL', 'redis://localhost:6379/0')
+# Seconds a refresh lock is held before another worker may take it over
+CACHE_LOCK_TIMEOUT = float(os.getenv('CACHE_LOCK_TIMEOUT', 30))
+CACHE_LOCK_POLL = 0.05
+
+
+def is_market_open(now=None):
+    """Return True during regular US equity trading hours"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_market_open(now=None):
+    """The next regular session open at or after now"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TZ)
+
+
+def market_ttl(now=None):
+    """Short TTL while the market is open, long TTL after the close
+
+    The long TTL never runs past the next open, so data cached before the
+    bell is not served into the session.
+    """
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    if is_market_open(now):
+        return CACHE_TTL_MARKET
+    # Timestamps, so a DST change overnight is accounted for
+    return min(CACHE_TTL_CLOSED, next_market_open(now).timestamp() - now.timestamp())
+
+
+class CacheBackend:
+    """Interface shared by the cache backends
+
+    Subclasses implement _get(), set(), delete(), clear(), __len__(),
+    acquire() and release(); hit/miss counting and single-flight helpers
+    live here. ttl may be a number of seconds or a callable returning one,
+    evaluated when an entry is stored.
+    """
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=market_ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _ttl(self):
+        return self.ttl() if callable(self.ttl) else self.ttl
+
+    def get(self, key, default=None):
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def single_flight(self, key, compute, wait=CACHE_LOCK_TIMEOUT):
+        """Run compute() for a missing key in one thread or process at a time
+
+        compute() is expected to store its result. Callers that don't get
+        the key's lock wait for the value to appear; if nothing shows up
+        within wait seconds they compute it themselves.
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            if self.acquire(key):
+                try:
+                    value = self._get(key)
+                    return value if value is not None else compute()
+                finally:
+                    self.release(key)
+            value = self._get(key)
+            if value is not None:
+                return value
+            if time.monotonic() >= deadline:
+                return compute()
+            time.sleep(CACHE_LOCK_POLL)
+
+    def get_or_set(self, key, compute, ttl=None, wait=CACHE_LOCK_TIMEOUT):
+        """Cached value for key, computing and storing it once if missing"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        def fill():
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+        return self.single_flight(key, fill, wait)
+
+    def incr(self, key, ttl=None, wait=CACHE_LOCK_TIMEOUT):
+        """Add one to a counter shared by everyone using the cache; returns the new count"""
+        deadline = time.monotonic() + wait
+        locked = self.acquire(key)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(CACHE_LOCK_POLL)
+            locked = self.acquire(key)
+        try:
+            count = (self._get(key) or 0) + 1
+            self.set(key, count, ttl)
+            return count
+        finally:
+            if locked:
+                self.release(key)
+
+    def wait(self, key, timeout=CACHE_LOCK_TIMEOUT):
+        """Wait for whoever holds key's lock to store a value; returns it or None"""
+        deadline = time.monotonic() + timeout
+        while True:
+            value = self._get(key)
+            if value is not None or time.monotonic() >= deadline:
+                return value
+            if self.acquire(key):
+                # The holder is done without storing anything
+                self.release(key)
+                return self._get(key)
+            time.sleep(CACHE_LOCK_POLL)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class TTLCache(CacheBackend):
+    """Thread-safe in-process LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=market_ttl):
+        super().__init__(maxsize, ttl)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._held = set()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (ttl if ttl is not None else self._ttl())
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def acquire(self, key, timeout=CACHE_LOCK_TIMEOUT):
+        with self._lock:
+            if key in self._held:
+                return False
+            self._held.add(key)
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._held.discard(key)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _key(namespace, key):
+    """Flatten a cache key like ('AAPL', '1d') into a namespaced string"""
+    if isinstance(key, tuple):
+        key = '|'.join(str(part) for part in key)
+    return f"{namespace}:{key}"
+
+
+def _token():
+    """Random lock owner id, so only the holder can release a lock"""
+    return os.urandom(16).hex()
+
+
+class SQLiteCache(CacheBackend):
+    """Cache shared by every process on the host through one SQLite file
+
+    Values are pickled. Each cache uses its own key namespace, so several
+    caches can share a file. Locks are rows that expire after their
+    timeout, so a crashed worker cannot hold a key forever. If the file
+    cannot be locked, an in-process lock keeps single-flight within this
+    worker.
+    """
+
+    def __init__(self, namespace, path=CACHE_PATH, maxsize=CACHE_MAX_ENTRIES, ttl=market_ttl):
+        super().__init__(maxsize, ttl)
+        self.namespace = namespace
+        self.path = path
+        self._local = threading.local()
+        self._tokens = {}
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._sets = 0
+        self.errors = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+            db.execute('CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT, expires REAL)')
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def _range(self):
+        # Every key of this namespace sorts between these two strings
+        return f"{self.namespace}:", f"{self.namespace};"
+
+    def _failed(self, action, e):
+        self.errors += 1
+        print(f"Error {action} cache {self.namespace}: {str(e)}")
+
+    def _get(self, key):
+        try:
+            row = self._connection().execute(
+                'SELECT value, expires FROM entries WHERE key = ?', (_key(self.namespace, key),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._failed('reading', e)
+            return None
+        if row is None or row[1] <= time.time():
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + (ttl if ttl is not None else self._ttl())
+        try:
+            db = self._connection()
+            db.execute(
+                'INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)',
+                (_key(self.namespace, key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+            )
+            self._sets += 1
+            if self._sets % 64 == 0:
+                self._evict(db)
+        except sqlite3.Error as e:
+            self._failed('writing', e)
+
+    def _evict(self, db):
+        """Drop expired entries, then the ones closest to expiry above maxsize"""
+        low, high = self._range()
+        db.execute('DELETE FROM entries WHERE key >= ? AND key < ? AND expires <= ?', (low, high, time.time()))
+        excess = len(self) - self.maxsize
+        if excess > 0:
+            db.execute(
+                'DELETE FROM entries WHERE key IN '
+                '(SELECT key FROM entries WHERE key >= ? AND key < ? ORDER BY expires LIMIT ?)',
+                (low, high, excess)
+            )
+            self.evictions += excess
+
+    def delete(self, key):
+        try:
+            self._connection().execute('DELETE FROM entries WHERE key = ?', (_key(self.namespace, key),))
+        except sqlite3.Error as e:
+            self._failed('deleting from', e)
+
+    def clear(self):
+        try:
+            self._connection().execute('DELETE FROM entries WHERE key >= ? AND key < ?', self._range())
+        except sqlite3.Error as e:
+            self._failed('clearing', e)
+
+    def acquire(self, key, timeout=CACHE_LOCK_TIMEOUT):
+        lock_key = _key(self.namespace, key)
+        token = _token()
+        now = time.time()
+        try:
+            db = self._connection()
+            db.execute('DELETE FROM locks WHERE key = ? AND expires <= ?', (lock_key, now))
+            cursor = db.execute(
+                'INSERT OR IGNORE INTO locks (key, owner, expires) VALUES (?, ?, ?)',
+                (lock_key, token, now + timeout)
+            )
+        except sqlite3.Error as e:
+            self._failed(f'locking {key!r} in', e)
+            with self._held_lock:
+                if lock_key in self._held:
+                    return False
+                self._held.add(lock_key)
+                return True
+        if cursor.rowcount != 1:
+            return False
+        self._tokens[lock_key] = token
+        return True
+
+    def release(self, key):
+        lock_key = _key(self.namespace, key)
+        with self._held_lock:
+            if lock_key in self._held:
+                self._held.discard(lock_key)
+                return
+        token = self._tokens.pop(lock_key, None)
+        if token is None:
+            return
+        try:
+            self._connection().execute('DELETE FROM locks WHERE key = ? AND owner = ?', (lock_key, token))
+        except sqlite3.Error as e:
+            self._failed(f'unlocking {key!r} in', e)
+
+    def __len__(self):
+        low, high = self._range()
+        try:
+            return self._connection().execute(
+                'SELECT COUNT(*) FROM entries WHERE key >= ? AND key < ? AND expires > ?', (low, high, time.time())
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            self._failed('counting', e)
+            return 0
+
+    def stats(self):
+        stats = super().stats()
+        stats['errors'] = self.errors
+        return stats
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """Minimal client for the Redis protocol (RESP), enough for caching"""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=5):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def execute(self, *args):
+        parts = [arg if isinstance(arg, bytes) else str(arg).encode() for arg in args]
+        payload = b'*%d\r\n' % len(parts) + b''.join(b'$%d\r\n%s\r\n' % (len(part), part) for part in parts)
+        self._sock.sendall(payload)
+        return self._read()
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            return None if length < 0 else self._file.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+
+# Delete a lock only if it still holds our token, in one server-side step
+RELEASE_SCRIPT = "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end return 0"
+
+
+class RedisCache(CacheBackend):
+    """Cache stored in Redis (or any server speaking its protocol)
+
+    Expiry is left to the server, so maxsize is informational; configure
+    maxmemory on the server instead. Connections are kept per thread. If
+    the server is unreachable every lookup is a miss and locks are granted,
+    so the app keeps working without sharing.
+    """
+
+    def __init__(self, namespace, url=CACHE_URL, maxsize=CACHE_MAX_ENTRIES, ttl=market_ttl, timeout=5):
+        super().__init__(maxsize, ttl)
+        self.namespace = namespace
+        parsed = urlparse(url)
+        self._params = {
+            'host': parsed.hostname or 'localhost',
+            'port': parsed.port or 6379,
+            'db': int(parsed.path.strip('/') or 0),
+            'password': parsed.password,
+            'timeout': timeout
+        }
+        self._local = threading.local()
+        self._tokens = {}
+        self.errors = 0
+
+    def _command(self, *args):
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            try:
+                if connection is None:
+                    connection = self._local.connection = RedisConnection(**self._params)
+                return connection.execute(*args)
+            except (OSError, ConnectionError):
+                # Reconnect once on a dropped connection
+                self._local.connection = None
+                if connection is not None:
+                    connection.close()
+                if attempt:
+                    raise
+
+    def _call(self, default, *args):
+        try:
+            return self._command(*args)
+        except (OSError, ConnectionError, RedisError) as e:
+            self.errors += 1
+            print(f"Error talking to cache server for {self.namespace}: {str(e)}")
+            return default
+
+    def _get(self, key):
+        value = self._call(None, 'GET', _key(self.namespace, key))
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self._ttl()
+        self._call(None, 'SET', _key(self.namespace, key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                   'PX', max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self._call(None, 'DEL', _key(self.namespace, key))
+
+    def _keys(self):
+        keys = []
+        cursor = '0'
+        while True:
+            reply = self._call(None, 'SCAN', cursor, 'MATCH', f"{self.namespace}:*", 'COUNT', 1000)
+            if reply is None:
+                return keys
+            cursor, batch = reply[0].decode(), reply[1]
+            keys.extend(batch)
+            if cursor == '0':
+                return keys
+
+    def clear(self):
+        keys = self._keys()
+        if keys:
+            self._call(None, 'DEL', *keys)
+
+    def acquire(self, key, timeout=CACHE_LOCK_TIMEOUT):
+        lock_key = 'lock:' + _key(self.namespace, key)
+        token = _token()
+        if self._call('OK', 'SET', lock_key, token, 'NX', 'PX', int(timeout * 1000)) != 'OK':
+            return False
+        self._tokens[lock_key] = token
+        return True
+
+    def release(self, key):
+        lock_key = 'lock:' + _key(self.namespace, key)
+        token = self._tokens.pop(lock_key, None)
+        if token is not None:
+            # A separate GET and DEL could delete a lock that expired and
+            # was taken by another worker in between
+            self._call(None, 'EVAL', RELEASE_SCRIPT, 1, lock_key, token)
+
+    def __len__(self):
+        return len(self._keys())
+
+    def stats(self):
+        stats = super().stats()
+        stats['errors'] = self.errors
+        return stats
+
+
+def make_cache(namespace, maxsize=CACHE_MAX_ENTRIES, ttl=market_ttl, backend=None):
+    """Cache for one kind of data using the configured CACHE_BACKEND"""
+    backend = backend or CACHE_BACKEND
+    if backend == 'sqlite':
+        return SQLiteCache(namespace, CACHE_PATH, maxsize, ttl)
+    if backend == 'redis':
+        return RedisCache(namespace, CACHE_URL, maxsize, ttl)
+    if backend != 'memory':
+        print(f"Unknown CACHE_BACKEND {backend}, using in-memory caches")
+    return TTLCache(maxsize, ttl)
+
+
+
+# Raw OHLCV frames and finished get_stock_data() results, keyed by (symbol, interval)
+history_cache = make_cache('history')
+stock_data_cache = make_cache('stock_data')
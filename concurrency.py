@@ -0,0 +1,124 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Bounded worker pool shared by every request so concurrent users cannot
+# multiply the number of upstream connections
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', 8))
+SYMBOL_TIMEOUT = float(os.getenv('SYMBOL_TIMEOUT', 20))
+# Upper bound on a whole fan_out() call, including time items spend queued
+# behind other requests' work
+FAN_OUT_DEADLINE = float(os.getenv('FAN_OUT_DEADLINE', 30))
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='fetch')
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available without blocking"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; return False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait_time = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_time = min(wait_time, remaining)
+            time.sleep(wait_time)
+
+
+# One bucket per upstream, shared across threads
+RATE_LIMITERS = {
+    'yfinance': TokenBucket(
+        rate=float(os.getenv('YFINANCE_RATE_PER_SEC', 4)),
+        capacity=float(os.getenv('YFINANCE_BURST', 8))
+    ),
+    'newsapi': TokenBucket(
+        rate=float(os.getenv('NEWSAPI_RATE_PER_SEC', 1)),
+        capacity=float(os.getenv('NEWSAPI_BURST', 5))
+    ),
+}
+
+
+def rate_limited(upstream, timeout=None):
+    """Wait for a token from the named upstream's bucket"""
+    limiter = RATE_LIMITERS.get(upstream)
+    if limiter is None:
+        return True
+    return limiter.acquire(timeout=timeout)
+
+
+def fan_out(func, items, timeout=SYMBOL_TIMEOUT, executor=None, deadline=FAN_OUT_DEADLINE):
+    """Run func over items concurrently and return {item: result}
+
+    Each item gets its own timeout measured from when it actually starts
+    running, so a slow item only drops itself. Whatever is still queued or
+    running deadline seconds after the call is dropped too, so a busy pool
+    cannot hold the caller indefinitely. Items that fail or time out are
+    left out of the result. func runs in a copy of the caller's context,
+    so spans it records land on the caller's request trace.
+    """
+    executor = executor or _executor
+    started = {}
+    give_up = time.monotonic() + deadline
+
+    def run(item):
+        started[item] = time.monotonic()
+        return func(item)
+
+    futures = {executor.submit(contextvars.copy_context().run, run, item): item for item in items}
+    pending = set(futures)
+    results = {}
+
+    while pending:
+        done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+        for future in done:
+            item = futures[future]
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                print(f"Error processing {item}: {str(e)}")
+
+        now = time.monotonic()
+        for future in list(pending):
+            item = futures[future]
+            if item in started and now - started[item] > timeout:
+                print(f"Timed out processing {item} after {timeout}s")
+            elif now > give_up:
+                print(f"Gave up on {item} after {deadline}s" + ('' if item in started else ' waiting for a worker'))
+            else:
+                continue
+            future.cancel()
+            pending.discard(future)
+
+    return results
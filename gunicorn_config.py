@@ -1,4 +1,6 @@
 bind = "0.0.0.0:10000"
 workers = 4
-threads = 2
+# /stream keeps a thread per open dashboard, so use threaded workers
+worker_class = "gthread"
+threads = 32
 timeout = 120 
\ No newline at end of file
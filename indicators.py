@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+MIN_POINTS = 20  # Need at least 20 data points for reliable indicators
+
+RSI_WINDOW = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+BOLLINGER_WINDOW = 20
+BOLLINGER_DEV = 2
+ADX_WINDOW = 14
+
+INDICATOR_COLUMNS = ['rsi', 'macd', 'upper_band', 'lower_band', 'adx', 'obv']
+
+
+def panel_from_frames(frames):
+    """Build a wide (field, symbol) panel from a dict of per-symbol OHLCV frames"""
+    panel = pd.concat(frames, axis=1)
+    return panel.swaplevel(axis=1).sort_index(axis=1)
+
+
+def _right_align(panel, symbols):
+    """Stack OHLCV into (T, N) arrays with each symbol's valid rows pushed to the bottom
+
+    Rows where any field is missing are dropped per symbol (like
+    DataFrame.dropna() on a single-symbol frame), so after alignment every
+    column is a contiguous block of valid bars ending at the last row.
+    Returns the arrays by field and the number of valid rows per symbol.
+    """
+    arrays = {
+        field: panel[field].reindex(columns=symbols).to_numpy(dtype=float)
+        for field in FIELDS
+    }
+    valid = np.ones(arrays['Close'].shape, dtype=bool)
+    for values in arrays.values():
+        valid &= ~np.isnan(values)
+
+    # Stable sort puts invalid rows first while keeping bar order
+    order = np.argsort(valid, axis=0, kind='stable')
+    aligned = {field: np.take_along_axis(values, order, axis=0) for field, values in arrays.items()}
+    return aligned, valid.sum(axis=0)
+
+
+def _ewm_last(values, alpha):
+    """Last value of an adjust=False exponential moving average for each column"""
+    state = values[0].copy()
+    for row in values[1:]:
+        state = alpha * row + (1 - alpha) * state
+    return state
+
+
+def _rsi(close):
+    diff = np.diff(close, axis=0)
+    up = np.vstack([np.zeros((1, close.shape[1])), np.where(diff > 0, diff, 0.0)])
+    down = np.vstack([np.zeros((1, close.shape[1])), np.where(diff < 0, -diff, 0.0)])
+    ema_up = _ewm_last(up, 1 / RSI_WINDOW)
+    ema_down = _ewm_last(down, 1 / RSI_WINDOW)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(ema_down == 0, 100.0, 100 - 100 / (1 + ema_up / ema_down))
+    return rsi
+
+
+def _macd(close):
+    fast = _ewm_last(close, 2 / (MACD_FAST + 1))
+    slow = _ewm_last(close, 2 / (MACD_SLOW + 1))
+    return fast - slow
+
+
+def _bollinger(close):
+    window = close[-BOLLINGER_WINDOW:]
+    mean = window.mean(axis=0)
+    std = window.std(axis=0, ddof=0)
+    return mean + BOLLINGER_DEV * std, mean - BOLLINGER_DEV * std
+
+
+def _wilder_sums(values, window):
+    """Wilder running sums seeded with the sum of the first window values
+
+    Mirrors ta's ADXIndicator, including leaving the final slot at zero.
+    """
+    sums = np.zeros((values.shape[0] - (window - 1), values.shape[1]))
+    sums[0] = values[1:window + 1].sum(axis=0)
+    for i in range(1, len(sums) - 1):
+        sums[i] = sums[i - 1] - sums[i - 1] / window + values[window + i]
+    return sums
+
+
+def _adx(high, low, close):
+    """Last ADX value per column, matching ta.trend.ADXIndicator"""
+    w = ADX_WINDOW
+    length = close.shape[0]
+    if length < 2 * w:
+        return np.full(close.shape[1], np.nan)
+
+    prev_close = close[:-1]
+    movement = np.zeros_like(close)
+    movement[1:] = np.maximum(high[1:], prev_close) - np.minimum(low[1:], prev_close)
+
+    diff_up = np.zeros_like(close)
+    diff_down = np.zeros_like(close)
+    diff_up[1:] = high[1:] - high[:-1]
+    diff_down[1:] = low[:-1] - low[1:]
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+
+    trs = _wilder_sums(movement, w)
+    dip = _wilder_sums(pos, w)
+    din = _wilder_sums(neg, w)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        di_pos = 100 * dip / trs
+        di_neg = 100 * din / trs
+        dx = 100 * np.abs((di_pos - di_neg) / (di_pos + di_neg))
+
+    adx = dx[:w].mean(axis=0)
+    for i in range(w + 1, len(trs)):
+        adx = (adx * (w - 1) + dx[i - 1]) / w
+    return adx
+
+
+def _obv(close, volume):
+    signed = np.where(close[1:] < close[:-1], -volume[1:], volume[1:])
+    return volume[0] + signed.sum(axis=0)
+
+
+def _compute_block(block):
+    """Indicators for columns that all share the same number of valid bars"""
+    close = block['Close']
+    length = close.shape[0]
+
+    rsi = _rsi(close) if length >= RSI_WINDOW else np.full(close.shape[1], np.nan)
+    macd = _macd(close) if length >= MACD_SLOW else np.full(close.shape[1], np.nan)
+    upper_band, lower_band = _bollinger(close)
+    adx = _adx(block['High'], block['Low'], close)
+    obv = _obv(close, block['Volume'])
+
+    # Same neutral defaults as the per-symbol path
+    last_close = close[-1]
+    rsi = np.where(np.isnan(rsi), 50.0, rsi)
+    macd = np.where(np.isnan(macd), 0.0, macd)
+    missing_bands = np.isnan(upper_band) | np.isnan(lower_band)
+    upper_band = np.where(missing_bands, last_close * 1.02, upper_band)
+    lower_band = np.where(missing_bands, last_close * 0.98, lower_band)
+    adx = np.where(np.isnan(adx) | (adx <= 0), 50.0, adx)
+    obv = np.where(np.isnan(obv), 0.0, obv)
+    return np.column_stack([rsi, macd, upper_band, lower_band, adx, obv])
+
+
+def compute_indicators(panel, symbols=None):
+    """Compute RSI, MACD, Bollinger Bands, ADX and OBV for every symbol in a panel
+
+    The panel is a wide OHLCV frame with (field, symbol) columns, such as
+    the output of yf.download() for several tickers. All symbols are
+    processed together on 2-D arrays; symbols with fewer than 20 clean bars
+    are left out. Returns a frame indexed by symbol with one column per
+    indicator.
+    """
+    if symbols is None:
+        symbols = list(panel['Close'].columns)
+    symbols = list(symbols)
+    if not symbols or panel.empty:
+        return pd.DataFrame(columns=INDICATOR_COLUMNS, dtype=float)
+
+    aligned, counts = _right_align(panel, symbols)
+    result = np.full((len(symbols), len(INDICATOR_COLUMNS)), np.nan)
+
+    # Symbols with different history lengths are computed in separate blocks
+    # so every recurrence starts at each symbol's first valid bar
+    for length in np.unique(counts):
+        if length < MIN_POINTS:
+            continue
+        columns = np.flatnonzero(counts == length)
+        block = {field: values[-length:, columns] for field, values in aligned.items()}
+        result[columns] = _compute_block(block)
+
+    table = pd.DataFrame(result, index=pd.Index(symbols, name='symbol'), columns=INDICATOR_COLUMNS)
+    return table.dropna(how='all')
+
+
+def ewm_series(values, alpha, min_periods=1):
+    """adjust=False exponential moving average down the rows of a (T, N) array
+
+    Each column starts at its first valid value; missing rows leave the
+    average unchanged and come out as NaN, as do rows before min_periods
+    valid values have been seen.
+    """
+    out = np.full(values.shape, np.nan)
+    state = np.full(values.shape[1], np.nan)
+    count = np.zeros(values.shape[1])
+    for t, row in enumerate(values):
+        valid = ~np.isnan(row)
+        updated = alpha * row + (1 - alpha) * state
+        state = np.where(np.isnan(state), row, np.where(valid, updated, state))
+        count += valid
+        out[t] = np.where(valid & (count >= min_periods), state, np.nan)
+    return out
+
+
+def rsi_series(close):
+    """RSI for every row of a (T, N) close array, using only data up to that row"""
+    previous = pd.DataFrame(close).ffill().shift(1).to_numpy()
+    diff = close - previous
+    # The first bar of each column counts as no movement, like ta
+    diff = np.where(np.isnan(previous) & ~np.isnan(close), 0.0, diff)
+    up = np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+    down = np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0))
+    ema_up = ewm_series(up, 1 / RSI_WINDOW, RSI_WINDOW)
+    ema_down = ewm_series(down, 1 / RSI_WINDOW, RSI_WINDOW)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(ema_down == 0, 100.0, 100 - 100 / (1 + ema_up / ema_down))
+    return np.where(np.isnan(ema_down), np.nan, rsi)
+
+
+def macd_series(close):
+    """MACD line for every row of a (T, N) close array"""
+    fast = ewm_series(close, 2 / (MACD_FAST + 1), MACD_FAST)
+    slow = ewm_series(close, 2 / (MACD_SLOW + 1), MACD_SLOW)
+    return fast - slow
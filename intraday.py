@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from indicators import FIELDS
+
+# Finest interval downloaded; coarser ones are resampled from it
+INTRADAY_BASE_INTERVAL = os.getenv('INTRADAY_BASE_INTERVAL', '1m')
+# Bars kept per symbol (390 one-minute bars per regular session)
+INTRADAY_BUFFER_BARS = int(os.getenv('INTRADAY_BUFFER_BARS', 5 * 390))
+INTRADAY_MAX_SYMBOLS = int(os.getenv('INTRADAY_MAX_SYMBOLS', 1000))
+INTRADAY_REFRESH_INTERVAL = float(os.getenv('INTRADAY_REFRESH_INTERVAL', 60))
+# How far back a symbol's first download reaches; Yahoo serves 7 days of 1m bars
+INTRADAY_LOOKBACK_DAYS = int(os.getenv('INTRADAY_LOOKBACK_DAYS', 5))
+
+# Every interval divides the 9:30 session open, so resampled bars line up
+# with the session like the ones Yahoo serves
+INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30}
+
+INTRADAY_INTERVALS = [
+    interval for interval, minutes in INTERVAL_MINUTES.items()
+    if minutes % INTERVAL_MINUTES[INTRADAY_BASE_INTERVAL] == 0
+]
+
+
+class BarBuffer:
+    """Fixed-size ring buffer of OHLCV bars over NumPy arrays
+
+    The arrays are allocated once; when the buffer is full each new bar
+    overwrites the oldest one, so memory stays flat however long it runs.
+    """
+
+    def __init__(self, capacity=INTRADAY_BUFFER_BARS):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype='int64')   # UTC nanoseconds
+        self.values = np.zeros((capacity, len(FIELDS)))
+        self.start = 0
+        self.size = 0
+        self.tz = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+    def last_time(self):
+        """Timestamp of the newest bar, or None if empty"""
+        if not self.size:
+            return None
+        return pd.Timestamp(self.times[(self.start + self.size - 1) % self.capacity], tz='UTC').tz_convert(self.tz)
+
+    def append(self, frame):
+        """Add the bars of an OHLCV frame that are newer than the newest bar
+
+        A bar with the newest bar's timestamp replaces it, since the bar
+        still forming when it was fetched has moved on since. Returns the
+        number of bars written.
+        """
+        frame = frame[FIELDS].dropna(subset=['Close']).sort_index()
+        frame = frame[~frame.index.duplicated(keep='last')]
+        if frame.empty:
+            return 0
+        index = frame.index if frame.index.tz is not None else frame.index.tz_localize('UTC')
+        if self.tz is None:
+            self.tz = index.tz
+        times = index.tz_convert('UTC').as_unit('ns').asi8
+        values = frame.to_numpy(dtype=float)
+
+        written = 0
+        if self.size:
+            last = (self.start + self.size - 1) % self.capacity
+            keep = times >= self.times[last]
+            times, values = times[keep], values[keep]
+            if len(times) and times[0] == self.times[last]:
+                self.values[last] = values[0]
+                times, values = times[1:], values[1:]
+                written += 1
+        times, values = times[-self.capacity:], values[-self.capacity:]
+
+        count = len(times)
+        positions = (self.start + self.size + np.arange(count)) % self.capacity
+        self.times[positions] = times
+        self.values[positions] = values
+        overflow = max(0, self.size + count - self.capacity)
+        self.start = (self.start + overflow) % self.capacity
+        self.size = min(self.capacity, self.size + count)
+        return written + count
+
+    def arrays(self):
+        """Copies of the timestamps and OHLCV values, oldest first"""
+        order = (self.start + np.arange(self.size)) % self.capacity
+        return self.times[order], self.values[order]
+
+
+def resample_arrays(times, values, minutes):
+    """Aggregate sorted OHLCV bars into bars of minutes each
+
+    Bars are bucketed by their start time; buckets keep the first open,
+    highest high, lowest low, last close and total volume.
+    """
+    if not len(times):
+        return times, values
+    step = minutes * 60 * 10 ** 9
+    buckets = times // step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+    open_, high, low, close, volume = (values[:, i] for i in range(len(FIELDS)))
+    resampled = np.column_stack([
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends],
+        np.add.reduceat(volume, starts)
+    ])
+    return buckets[starts] * step, resampled
+
+
+def to_frame(times, values, tz=None):
+    index = pd.DatetimeIndex(pd.to_datetime(times, utc=True)).tz_convert(tz or 'UTC')
+    return pd.DataFrame(values, index=index, columns=FIELDS)
+
+
+class IntradayStore:
+    """Rolling intraday bars per symbol, fetched once at the finest interval
+
+    Each refresh downloads only the bars after a symbol's newest buffered
+    bar; coarser timeframes are resampled from the buffer on read rather
+    than downloaded separately. Buffers are bounded in bars per symbol and
+    in number of symbols, least recently used first out.
+    """
+
+    def __init__(self, provider, base_interval=INTRADAY_BASE_INTERVAL, capacity=INTRADAY_BUFFER_BARS,
+                 max_symbols=INTRADAY_MAX_SYMBOLS, refresh_interval=INTRADAY_REFRESH_INTERVAL,
+                 lookback_days=INTRADAY_LOOKBACK_DAYS):
+        self.provider = provider
+        self.base_interval = base_interval
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self.refresh_interval = refresh_interval
+        self.lookback_days = lookback_days
+        self._buffers = OrderedDict()
+        self._refreshed = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.downloads = 0
+
+    def _buffer(self, symbol):
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            buffer = self._buffers[symbol] = BarBuffer(self.capacity)
+            while len(self._buffers) > self.max_symbols:
+                evicted, _ = self._buffers.popitem(last=False)
+                self._refreshed.pop(evicted, None)
+        self._buffers.move_to_end(symbol)
+        return buffer
+
+    def _download(self, symbols):
+        """Fetch the missing tail of each symbol's bars; returns errors"""
+        end = datetime.now()
+        # Group symbols by where their tail starts so each group is one
+        # batched download
+        tails = {}
+        with self._lock:
+            for symbol in symbols:
+                buffer = self._buffers.get(symbol)
+                last = buffer.last_time() if buffer is not None else None
+                start = last.to_pydatetime().replace(tzinfo=None) if last is not None else end - timedelta(days=self.lookback_days)
+                tails.setdefault(start.date(), []).append(symbol)
+
+        errors = {}
+        for start, group in tails.items():
+            self.downloads += 1
+            frames, group_errors = self.provider.get_history(group, start, end, self.base_interval)
+            with self._lock:
+                for symbol, frame in frames.items():
+                    self._buffer(symbol).append(frame)
+                for symbol, error in group_errors.items():
+                    if len(self._buffers.get(symbol, ())):
+                        print(f"Serving buffered intraday bars for {symbol} after download error: {error}")
+                    else:
+                        errors[symbol] = error
+        return errors
+
+    def refresh(self, symbols):
+        """Download new bars for symbols not refreshed within refresh_interval
+
+        Symbols another thread is already refreshing are waited for rather
+        than downloaded twice. Returns per-symbol error messages.
+        """
+        now = time.monotonic()
+        owned = []
+        waiting = {}
+        with self._lock:
+            for symbol in symbols:
+                if symbol in self._inflight:
+                    waiting[symbol] = self._inflight[symbol]
+                elif now - self._refreshed.get(symbol, float('-inf')) >= self.refresh_interval:
+                    self._inflight[symbol] = Future()
+                    owned.append(symbol)
+
+        errors = {}
+        if owned:
+            try:
+                errors = self._download(owned)
+            except Exception as e:
+                print(f"Error downloading intraday bars for {len(owned)} symbols: {str(e)}")
+                errors = {symbol: str(e) for symbol in owned}
+            finally:
+                with self._lock:
+                    refreshed = time.monotonic()
+                    for symbol in owned:
+                        self._refreshed[symbol] = refreshed
+                        self._inflight.pop(symbol).set_result(errors.get(symbol))
+        for symbol, future in waiting.items():
+            error = future.result()
+            if error:
+                errors[symbol] = error
+        return errors
+
+    def bars(self, symbol, interval=None):
+        """Buffered bars for a symbol at interval, or None if there are none"""
+        interval = interval or self.base_interval
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if not buffer:
+                return None
+            times, values = buffer.arrays()
+            tz = buffer.tz
+        if interval != self.base_interval:
+            times, values = resample_arrays(times, values, INTERVAL_MINUTES[interval])
+        return to_frame(times, values, tz)
+
+    def histories(self, symbols, interval):
+        """Refreshed bars for many symbols at interval, plus per-symbol errors"""
+        errors = self.refresh(symbols)
+        frames = {}
+        for symbol in symbols:
+            frame = self.bars(symbol, interval)
+            if frame is not None:
+                frames[symbol] = frame
+            else:
+                errors.setdefault(symbol, 'No intraday data found')
+        return frames, errors
+
+    def stats(self):
+        with self._lock:
+            return {
+                'base_interval': self.base_interval,
+                'symbols': len(self._buffers),
+                'max_symbols': self.max_symbols,
+                'bars': sum(len(buffer) for buffer in self._buffers.values()),
+                'bars_per_symbol': self.capacity,
+                'bytes': sum(buffer.nbytes for buffer in self._buffers.values()),
+                'downloads': self.downloads
+            }
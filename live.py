@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+import time
+
+LIVE_REFRESH_INTERVAL = float(os.getenv('LIVE_REFRESH_INTERVAL', 60))
+LIVE_HEARTBEAT = float(os.getenv('LIVE_HEARTBEAT', 15))
+LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', 100))
+
+# Quote fields pushed to clients when they change
+LIVE_FIELDS = ['price', 'change', 'volume', 'rsi', 'macd', 'sentiment', 'score', 'signal', 'explanations']
+
+
+def diff_quotes(previous, current, fields=LIVE_FIELDS):
+    """Changed fields per symbol between two {symbol: quote} dicts"""
+    changes = {}
+    for symbol, quote in current.items():
+        old = previous.get(symbol)
+        if old is None:
+            changes[symbol] = {field: quote[field] for field in fields if field in quote}
+            continue
+        changed = {field: quote[field] for field in fields if field in quote and quote[field] != old.get(field)}
+        if changed:
+            changes[symbol] = changed
+    return changes
+
+
+class QuoteBroadcaster:
+    """One shared refresh loop whose quote changes are pushed to every subscriber
+
+    fetch(symbols) returns {symbol: quote}. The loop runs only while
+    someone is subscribed, so any number of clients cost one upstream poll
+    per interval. Each subscriber gets a 'snapshot' event with all current
+    quotes, then 'update' events with only the fields that changed.
+    A subscriber that falls queue_size events behind is resynced with a
+    fresh snapshot instead of blocking the loop.
+    """
+
+    def __init__(self, fetch, symbols, interval=LIVE_REFRESH_INTERVAL,
+                 heartbeat=LIVE_HEARTBEAT, queue_size=LIVE_QUEUE_SIZE):
+        self.fetch = fetch
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self._quotes = {}
+        self._generated_at = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        self.polls = 0
+        self.events_sent = 0
+        self.resyncs = 0
+
+    def _snapshot_event(self):
+        return 'snapshot', {'quotes': list(self._quotes.values()), 'generated_at': self._generated_at}
+
+    def _send(self, subscriber, event):
+        try:
+            subscriber.put_nowait(event)
+        except queue.Full:
+            # Drop the backlog; the snapshot carries everything the client missed
+            while True:
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    break
+            subscriber.put_nowait(self._snapshot_event())
+            self.resyncs += 1
+        self.events_sent += 1
+
+    def subscribe(self):
+        """Register a client and start the refresh loop if needed; returns its queue"""
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._quotes:
+                self._send(subscriber, self._snapshot_event())
+            if self._loop is None or not self._loop.is_alive():
+                self._loop = threading.Thread(target=self._run, name='live-quotes', daemon=True)
+                self._loop.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def poll(self):
+        """Fetch all symbols once and broadcast what changed; returns the changes"""
+        try:
+            quotes = self.fetch(self.symbols)
+        except Exception as e:
+            print(f"Error refreshing live quotes: {str(e)}")
+            return {}
+        self.polls += 1
+        if not quotes:
+            return {}
+
+        with self._lock:
+            first = not self._quotes
+            changes = diff_quotes(self._quotes, quotes)
+            signal_changes = [
+                {'symbol': symbol, 'from': self._quotes[symbol].get('signal'), 'to': change['signal']}
+                for symbol, change in changes.items()
+                if 'signal' in change and symbol in self._quotes
+            ]
+            self._quotes.update(quotes)
+            self._generated_at = time.time()
+            if first:
+                event = self._snapshot_event()
+            elif changes:
+                event = ('update', {
+                    'quotes': changes,
+                    'signal_changes': signal_changes,
+                    'generated_at': self._generated_at
+                })
+            else:
+                return changes
+            for subscriber in self._subscribers:
+                self._send(subscriber, event)
+        return changes
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._loop = None
+                    return
+            self.poll()
+            time.sleep(self.interval)
+
+    def stream(self, subscriber):
+        """Yield (event, payload) for a subscriber, or None as a heartbeat
+
+        Unsubscribes when the consumer stops iterating (e.g. the client
+        disconnected and the generator is closed).
+        """
+        try:
+            while True:
+                try:
+                    yield subscriber.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield None
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        return {
+            'subscribers': len(self._subscribers),
+            'symbols': len(self.symbols),
+            'polls': self.polls,
+            'events_sent': self.events_sent,
+            'resyncs': self.resyncs,
+            'last_poll_age': time.time() - self._generated_at if self._generated_at else None
+        }
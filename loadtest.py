@@ -0,0 +1,99 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def _request(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status == 200
+    except Exception:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run_level(urls, concurrency, requests, timeout=60):
+    """Send requests spread over urls from concurrency clients at once
+
+    Returns throughput and latency percentiles for the level.
+    """
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    latencies = []
+    failures = 0
+
+    def client():
+        nonlocal failures
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            latency, ok = _request(urls[i % len(urls)], timeout)
+            with lock:
+                latencies.append(latency)
+                failures += not ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies)
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'failures': failures,
+        'seconds': elapsed,
+        'requests_per_sec': requests / elapsed,
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'p99': float(np.percentile(latencies, 99))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure how many concurrent requests a running server handles'
+    )
+    parser.add_argument('base_url', help='e.g. http://localhost:5050')
+    parser.add_argument('--path', action='append',
+                        help='request path; may be repeated, {i} is replaced by the request number')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 100])
+    parser.add_argument('--requests', type=int, default=200, help='requests per path per concurrency level')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    paths = args.path or ['/get_predictions']
+    base_url = args.base_url.rstrip('/')
+
+    results = []
+    print(f"{'clients':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'failed':>7}")
+    for number, concurrency in enumerate(args.concurrency):
+        # {i} is unique across levels, so uncached endpoints stay uncached
+        first = number * args.requests
+        urls = [
+            base_url + path.format(i=i)
+            for i in range(first, first + args.requests) for path in paths
+        ]
+        level = run_level(urls, concurrency, len(urls), args.timeout)
+        results.append(level)
+        print(f"{concurrency:>8} {level['requests_per_sec']:>8.1f} {level['p50']:>7.3f}s "
+              f"{level['p95']:>7.3f}s {level['p99']:>7.3f}s {level['failures']:>7}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'base_url': args.base_url, 'paths': paths, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from cache import make_cache
+from providers import YFinanceProvider
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+METADATA_TTL = float(os.getenv('METADATA_TTL', 24 * 3600))
+METADATA_RETRY_AFTER = float(os.getenv('METADATA_RETRY_AFTER', 300))
+# Metadata is fetched on its own small pool so a large prefetch never
+# queues ahead of request work; fetches beyond METADATA_MAX_PENDING are
+# not started until earlier ones finish
+METADATA_WORKERS = int(os.getenv('METADATA_WORKERS', 2))
+METADATA_MAX_PENDING = int(os.getenv('METADATA_MAX_PENDING', 200))
+# Fetched metadata is written to disk when no more fetches are pending, or
+# at most this often while a long prefetch is running
+METADATA_SAVE_INTERVAL = float(os.getenv('METADATA_SAVE_INTERVAL', 30))
+METADATA_PATH = os.getenv(
+    'METADATA_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'metadata.json')
+)
+
+
+def default_metadata(symbol):
+    """Placeholder fields used until a symbol's metadata has been fetched"""
+    return {
+        'name': symbol,
+        'sector': 'Unknown',
+        'industry': 'Unknown',
+        'market_cap': 0,
+        'pe_ratio': 0.0
+    }
+
+
+def fetch_metadata(symbol, provider):
+    """Fetch the handful of ticker info fields the app uses from a data provider"""
+    fields, errors = provider.get_metadata([symbol])
+    if symbol not in fields:
+        raise RuntimeError(errors.get(symbol, 'No metadata found'))
+    return fields[symbol]
+
+
+class MetadataStore:
+    """Ticker metadata cached for a day and persisted across restarts
+
+    lookup() never blocks on the network by default: a symbol that is not
+    cached yet gets placeholder fields and a background fetch is started.
+    """
+
+    def __init__(self, fetch=None, ttl=METADATA_TTL, path=METADATA_PATH, maxsize=10000, provider=None,
+                 workers=METADATA_WORKERS, max_pending=METADATA_MAX_PENDING):
+        self.fetch = fetch or partial(fetch_metadata, provider=provider or YFinanceProvider())
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='metadata')
+        self.path = path or None
+        self._cache = make_cache('metadata', maxsize=maxsize, ttl=ttl)
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._load()
+
+    def _read_entries(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading metadata cache: {str(e)}")
+            return {}
+
+    def _load(self):
+        entries = self._read_entries()
+        now = time.time()
+        for symbol, entry in entries.items():
+            remaining = self.ttl - (now - entry['fetched_at'])
+            if remaining > 0:
+                self._cache.set(symbol, entry['fields'], ttl=remaining)
+                self._entries[symbol] = entry
+
+    def _save(self):
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Every worker saves to the same file, so merge with what the
+            # others wrote under a lock instead of replacing their entries
+            with open(f"{self.path}.lock", 'w') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                entries = self._read_entries()
+                for symbol, entry in self._entries.items():
+                    if symbol not in entries or entries[symbol]['fetched_at'] < entry['fetched_at']:
+                        entries[symbol] = entry
+                now = time.time()
+                entries = {
+                    symbol: entry for symbol, entry in entries.items()
+                    if now - entry['fetched_at'] < self.ttl
+                }
+                with open(tmp_path, 'w') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error writing metadata cache: {str(e)}")
+
+    def _fetch_fields(self, symbol):
+        try:
+            fields = self.fetch(symbol)
+            self._cache.set(symbol, fields)
+            with self._lock:
+                self._entries[symbol] = {'fields': fields, 'fetched_at': time.time()}
+                self._dirty = True
+                if time.monotonic() - self._saved_at >= METADATA_SAVE_INTERVAL:
+                    self._save()
+            return fields
+        except Exception as e:
+            print(f"Error getting metadata for {symbol}: {str(e)}")
+            # Remember the failure briefly so lookups don't retry on every call
+            self._cache.set(symbol, default_metadata(symbol), ttl=METADATA_RETRY_AFTER)
+            return None
+
+    def _refresh(self, symbol):
+        try:
+            # Only one process fetches a symbol; the others pick up its result
+            return self._cache.single_flight(symbol, lambda: self._fetch_fields(symbol))
+        finally:
+            with self._lock:
+                self._inflight.pop(symbol, None)
+                if self._dirty and not self._inflight:
+                    self._save()
+
+    def _schedule(self, symbol):
+        """The symbol's pending fetch, started if needed; None if too many are pending"""
+        with self._lock:
+            future = self._inflight.get(symbol)
+            if future is None:
+                if len(self._inflight) >= self.max_pending:
+                    return None
+                future = self._executor.submit(self._refresh, symbol)
+                self._inflight[symbol] = future
+            return future
+
+    def get(self, symbol):
+        """Cached metadata fields, or None if not fetched yet"""
+        return self._cache.get(symbol)
+
+    def known(self, symbol):
+        """Whether fetched fields, not placeholders, are cached for a symbol"""
+        fields = self._cache.get(symbol)
+        return fields is not None and fields != default_metadata(symbol)
+
+    def lookup(self, symbol, wait=0):
+        """Metadata fields for a symbol, falling back to placeholders
+
+        A missing or expired entry is fetched in the background; wait gives
+        that fetch up to so many seconds to finish before placeholders are
+        returned.
+        """
+        fields = self._cache.get(symbol)
+        if fields is not None:
+            return fields
+        future = self._schedule(symbol)
+        if wait and future is not None:
+            try:
+                fields = future.result(timeout=wait)
+            except Exception:
+                fields = None
+        return fields or default_metadata(symbol)
+
+    def prefetch(self, symbols):
+        """Start background fetches for symbols without fresh metadata, up to max_pending at a time
+
+        Symbols left over are fetched by a later prefetch or lookup.
+        """
+        for symbol in symbols:
+            if self._cache.get(symbol) is None and self._schedule(symbol) is None:
+                break
+
+    def stats(self):
+        return self._cache.stats()
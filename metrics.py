@@ -0,0 +1,177 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Attach per-stage timings to responses as a Server-Timing header
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _labels(name, value):
+    return f'{{{name}="{value}"}}'
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with a single label"""
+
+    def __init__(self, name, help, label, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {label: {**series, 'buckets': list(series['buckets'])} for label, series in self._series.items()}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for label, series in sorted(self.snapshot().items()):
+            for bound, count in zip(self.buckets, series['buckets']):
+                lines.append(f'{self.name}_bucket{{{self.label}="{label}",le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{self.label}="{label}",le="+Inf"}} {series["count"]}')
+            lines.append(f'{self.name}_sum{_labels(self.label, label)} {series["sum"]}')
+            lines.append(f'{self.name}_count{_labels(self.label, label)} {series["count"]}')
+        return lines
+
+
+class Counter:
+    """Thread-safe Prometheus counter with a single label"""
+
+    def __init__(self, name, help, label):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label, amount=1):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for label, value in sorted(self.snapshot().items()):
+            lines.append(f'{self.name}{_labels(self.label, label)} {value}')
+        return lines
+
+
+# Symbols are kept on each request's spans but not used as a label, so the
+# number of series stays bounded
+stage_seconds = Histogram('stock_stage_seconds', 'Time spent in each pipeline stage', 'stage')
+request_seconds = Histogram('http_request_seconds', 'Time spent serving each endpoint', 'endpoint')
+upstream_errors = Counter('upstream_errors_total', 'Failed calls to upstream data providers', 'upstream')
+
+
+class Trace:
+    """Stage spans recorded while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, symbol=None):
+        with self._lock:
+            self.spans.append((stage, symbol, seconds))
+
+    def totals(self):
+        """Seconds per stage, in the order stages first ran
+
+        Per-symbol stages run concurrently, so their totals can add up to
+        more than the request's wall time.
+        """
+        totals = {}
+        with self._lock:
+            for stage, _, seconds in self.spans:
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value with durations in milliseconds"""
+        entries = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in self.totals().items()]
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+
+_current = contextvars.ContextVar('trace', default=None)
+
+
+def start_trace():
+    """Start recording spans for the current request; returns a reset token"""
+    return _current.set(Trace())
+
+
+def end_trace(token):
+    _current.reset(token)
+
+
+def current_trace():
+    return _current.get()
+
+
+def record(stage, seconds, symbol=None):
+    stage_seconds.observe(seconds, stage)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds, symbol)
+
+
+@contextmanager
+def span(stage, symbol=None):
+    """Time a block as one pipeline stage, optionally for one symbol"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started, symbol)
+
+
+def record_error(upstream):
+    upstream_errors.inc(upstream)
+
+
+def render(caches):
+    """Prometheus text exposition of all metrics
+
+    caches maps a cache name to a stats dict with 'hits' and 'misses'.
+    """
+    lines = stage_seconds.render() + request_seconds.render() + upstream_errors.render()
+    for name, kind, help in (
+        ('cache_hits_total', 'counter', 'Cache lookups that found a fresh entry'),
+        ('cache_misses_total', 'counter', 'Cache lookups that found nothing'),
+        ('cache_hit_ratio', 'gauge', 'Share of cache lookups that were hits'),
+    ):
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+        for cache, stats in sorted(caches.items()):
+            total = stats['hits'] + stats['misses']
+            value = {
+                'cache_hits_total': stats['hits'],
+                'cache_misses_total': stats['misses'],
+                'cache_hit_ratio': stats['hits'] / total if total else 0.0
+            }[name]
+            lines.append(f'{name}{_labels("cache", cache)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,105 @@
+import os
+import threading
+from concurrent.futures import Future
+from datetime import date
+
+from cache import make_cache
+from providers import NEWS_API_URL, NEWS_CONNECT_TIMEOUT, NEWS_READ_TIMEOUT, NewsAPIProvider, make_session
+
+NEWS_CACHE_TTL = float(os.getenv('NEWS_CACHE_TTL', 1800))
+NEWS_STALE_TTL = float(os.getenv('NEWS_STALE_TTL', 24 * 3600))
+NEWS_DAILY_QUOTA = int(os.getenv('NEWS_DAILY_QUOTA', 100))
+
+
+class NewsClient:
+    """Shared news client with per-symbol caching and request coalescing
+
+    Concurrent requests for the same symbol wait on a single upstream call.
+    Results are cached for NEWS_CACHE_TTL seconds, and at most
+    NEWS_DAILY_QUOTA upstream calls are made per day. The count is kept in
+    the cache backend, so with a shared backend the quota covers every
+    worker rather than each one separately. Once the quota is
+    used up, or when a call fails, the last articles seen for the symbol
+    are served if they are less than NEWS_STALE_TTL seconds old.
+
+    Articles come from provider; by default that is NewsAPI at url with
+    api_key and session.
+    """
+
+    def __init__(self, url=NEWS_API_URL, api_key=None, session=None,
+                 cache_ttl=NEWS_CACHE_TTL, daily_quota=NEWS_DAILY_QUOTA,
+                 timeout=(NEWS_CONNECT_TIMEOUT, NEWS_READ_TIMEOUT), provider=None):
+        self.provider = provider or NewsAPIProvider(url, api_key, session or make_session(), timeout)
+        self.daily_quota = daily_quota
+        self._cache = make_cache('news', ttl=cache_ttl)
+        self._stale = make_cache('news_stale', ttl=NEWS_STALE_TTL)
+        self._quota = make_cache('news_quota', maxsize=8, ttl=2 * 24 * 3600)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._quota_used = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+
+    def _take_quota(self):
+        # One counter per day, expiring on its own once the day is over
+        used = self._quota.incr(date.today().isoformat())
+        self._quota_used = min(used, self.daily_quota)
+        return used <= self.daily_quota
+
+    def _fetch(self, symbol):
+        if not self._take_quota():
+            print(f"News daily quota reached, serving cached news for {symbol}")
+            return self._stale.get(symbol)
+
+        self.upstream_calls += 1
+        found, errors = self.provider.get_news([symbol])
+        if symbol not in found:
+            self.upstream_errors += 1
+            print(f"Error getting news for {symbol}: {errors.get(symbol, 'no articles returned')}")
+            return self._stale.get(symbol)
+
+        articles = found[symbol]
+        self._cache.set(symbol, articles)
+        self._stale.set(symbol, articles)
+        return articles
+
+    def get_articles(self, symbol):
+        """Latest articles for a symbol, or None if no API key or no data"""
+        if not self.provider.enabled:
+            return None
+
+        articles = self._cache.get(symbol)
+        if articles is not None:
+            return articles
+
+        with self._lock:
+            future = self._inflight.get(symbol)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[symbol] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            # With a shared cache backend, workers in other processes wait
+            # for this fetch too
+            articles = self._cache.single_flight(symbol, lambda: self._fetch(symbol))
+            future.set_result(articles)
+            return articles
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(symbol, None)
+
+    def stats(self):
+        return {
+            'cache': self._cache.stats(),
+            'upstream_calls': self.upstream_calls,
+            'upstream_errors': self.upstream_errors,
+            'quota_used': self._quota_used,
+            'daily_quota': self.daily_quota
+        }
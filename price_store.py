@@ -0,0 +1,234 @@
+import argparse
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from providers import YFinanceProvider
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+PRICE_STORE_DIR = os.getenv(
+    'PRICE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prices')
+)
+
+# One fixed-size record per bar; timestamps are UTC nanoseconds
+BAR_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('Open', '<f8'),
+    ('High', '<f8'),
+    ('Low', '<f8'),
+    ('Close', '<f8'),
+    ('Volume', '<f8'),
+])
+COLUMNS = list(BAR_DTYPE.names[1:])
+
+
+def _to_utc_ns(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return index.tz_convert('UTC').as_unit('ns').asi8
+
+
+def _latest_per_timestamp(records):
+    """Keep the last written record for each timestamp, sorted by time"""
+    ts = records['ts']
+    if len(ts) < 2 or np.all(ts[1:] > ts[:-1]):
+        return records
+    # np.unique on the reversed array returns the first (i.e. latest) occurrence
+    _, reverse_index = np.unique(ts[::-1], return_index=True)
+    return records[len(ts) - 1 - reverse_index]
+
+
+class PriceStore:
+    """Append-only OHLCV store with one memory-mapped binary file per symbol
+
+    Each file is a flat array of BAR_DTYPE records. New bars are appended
+    without rewriting the file; a re-fetched newest bar (e.g. today's
+    still-forming daily bar) overwrites the last record in place. Bars
+    written out of order by backfills are appended again and the latest
+    copy wins on read. compact() rewrites a file sorted and deduplicated.
+    """
+
+    def __init__(self, root=PRICE_STORE_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol, interval='1d'):
+        return os.path.join(self.root, interval, f"{symbol.upper()}.bin")
+
+    def _lock(self, path):
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def _records(self, symbol, interval):
+        path = self.path(symbol, interval)
+        try:
+            # Ignore a trailing partial record from an append still in progress
+            count = os.path.getsize(path) // BAR_DTYPE.itemsize
+        except OSError:
+            return None
+        if not count:
+            return None
+        return np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(count,))
+
+    def symbols(self, interval='1d'):
+        directory = os.path.join(self.root, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.bin'))
+
+    def last_timestamp(self, symbol, interval='1d'):
+        """Timestamp of the newest stored bar, or None"""
+        records = self._records(symbol, interval)
+        if records is None:
+            return None
+        return pd.Timestamp(int(records['ts'].max()), tz='UTC')
+
+    def read(self, symbol, interval='1d', start=None, end=None):
+        """Return stored bars in [start, end) as an OHLCV frame indexed by UTC time"""
+        records = self._records(symbol, interval)
+        if records is None:
+            return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], tz='UTC'))
+
+        # Slice before deduplicating so a short window never sorts the whole file
+        ts = records['ts']
+        lo_ts = None if start is None else _to_utc_ns([start])[0]
+        hi_ts = None if end is None else _to_utc_ns([end])[0]
+        if np.all(ts[1:] >= ts[:-1]):
+            lo = 0 if lo_ts is None else np.searchsorted(ts, lo_ts, side='left')
+            hi = len(ts) if hi_ts is None else np.searchsorted(ts, hi_ts, side='left')
+            records = records[lo:hi]
+        elif lo_ts is not None or hi_ts is not None:
+            # Uncompacted backfill: records are not in time order
+            mask = np.ones(len(ts), dtype=bool)
+            if lo_ts is not None:
+                mask &= ts >= lo_ts
+            if hi_ts is not None:
+                mask &= ts < hi_ts
+            records = records[mask]
+        selected = np.array(_latest_per_timestamp(records))
+
+        index = pd.to_datetime(selected['ts'], utc=True)
+        return pd.DataFrame({column: selected[column] for column in COLUMNS}, index=index)
+
+    def append(self, symbol, frame, interval='1d', only_new=True):
+        """Append bars to a symbol's file; returns the number written
+
+        By default bars older than the newest stored bar are skipped, and a
+        bar with the same timestamp as the last record replaces it in place,
+        so refreshing a still-forming bar does not grow the file.
+        Backfills pass only_new=False and compact afterwards.
+        """
+        frame = frame[COLUMNS].dropna()
+        if frame.empty:
+            return 0
+        records = np.empty(len(frame), dtype=BAR_DTYPE)
+        records['ts'] = _to_utc_ns(frame.index)
+        for column in COLUMNS:
+            records[column] = frame[column].to_numpy(dtype=float)
+
+        last = self.last_timestamp(symbol, interval) if only_new else None
+        if last is not None:
+            records = records[records['ts'] >= last.value]
+        if not len(records):
+            return 0
+
+        records = np.sort(records, order='ts')
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._lock(path), os.fdopen(fd, 'r+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            # Drop a partial record left by an interrupted write so records stay aligned
+            count = f.seek(0, os.SEEK_END) // BAR_DTYPE.itemsize
+            f.truncate(count * BAR_DTYPE.itemsize)
+            position = count
+            if only_new and count:
+                f.seek((count - 1) * BAR_DTYPE.itemsize)
+                tail = np.frombuffer(f.read(BAR_DTYPE.itemsize), dtype=BAR_DTYPE)
+                if tail['ts'][0] == records['ts'][0]:
+                    position = count - 1
+            f.seek(position * BAR_DTYPE.itemsize)
+            f.write(records.tobytes())
+        return len(records)
+
+    def compact(self, symbol, interval='1d'):
+        """Rewrite a symbol's file without superseded records; returns records dropped"""
+        path = self.path(symbol, interval)
+        with self._lock(path):
+            records = self._records(symbol, interval)
+            if records is None:
+                return 0
+            before = len(records)
+            compacted = np.array(_latest_per_timestamp(records))
+            del records
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            compacted.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        return before - len(compacted)
+
+    def compact_all(self, interval='1d'):
+        return {symbol: self.compact(symbol, interval) for symbol in self.symbols(interval)}
+
+
+def _read_symbols(args):
+    symbols = [symbol.upper() for symbol in args.symbols]
+    if args.file:
+        with open(args.file) as f:
+            symbols += [line.strip().upper() for line in f if line.strip() and not line.startswith('#')]
+    return list(dict.fromkeys(symbols))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the local OHLCV price store')
+    parser.add_argument('--root', default=PRICE_STORE_DIR, help='store directory')
+    parser.add_argument('--interval', default='1d')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backfill = subparsers.add_parser('backfill', help='download history for a symbol list')
+    backfill.add_argument('symbols', nargs='*')
+    backfill.add_argument('--file', help='file with one symbol per line')
+    backfill.add_argument('--days', type=int, default=365)
+
+    compact = subparsers.add_parser('compact', help='drop superseded records')
+    compact.add_argument('symbols', nargs='*', help='defaults to every stored symbol')
+
+    subparsers.add_parser('list', help='show stored symbols and their newest bar')
+
+    args = parser.parse_args(argv)
+    store = PriceStore(args.root)
+
+    if args.command == 'backfill':
+        symbols = _read_symbols(args)
+        if not symbols:
+            parser.error('no symbols given')
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=args.days)
+        frames, errors = YFinanceProvider().get_history(symbols, start_date, end_date, args.interval)
+        for symbol, frame in frames.items():
+            written = store.append(symbol, frame, args.interval, only_new=False)
+            store.compact(symbol, args.interval)
+            print(f"{symbol}: {written} bars")
+        for symbol, error in errors.items():
+            print(f"{symbol}: failed ({error})")
+    elif args.command == 'compact':
+        symbols = [s.upper() for s in args.symbols] or store.symbols(args.interval)
+        for symbol in symbols:
+            print(f"{symbol}: dropped {store.compact(symbol, args.interval)} records")
+    elif args.command == 'list':
+        for symbol in store.symbols(args.interval):
+            print(f"{symbol}: {store.last_timestamp(symbol, args.interval)}")
+
+
+if __name__ == '__main__':
+    main()
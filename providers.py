@@ -0,0 +1,304 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from concurrency import rate_limited
+from metrics import record_error
+
+# Upstream for price history and ticker metadata, and for news:
+# 'yfinance' / 'newsapi', or 'replay' to serve recorded fixtures offline
+MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER', 'yfinance')
+NEWS_PROVIDER = os.getenv('NEWS_PROVIDER', 'newsapi')
+REPLAY_FIXTURES_DIR = os.getenv(
+    'REPLAY_FIXTURES_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fixtures')
+)
+
+# Maximum symbols per yf.download() call
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', 100))
+
+NEWS_API_URL = os.getenv('NEWS_API_URL', 'https://newsapi.org/v2/everything')
+NEWS_CONNECT_TIMEOUT = float(os.getenv('NEWS_CONNECT_TIMEOUT', 3))
+NEWS_READ_TIMEOUT = float(os.getenv('NEWS_READ_TIMEOUT', 10))
+NEWS_RETRIES = int(os.getenv('NEWS_RETRIES', 2))
+NEWS_POOL_SIZE = int(os.getenv('NEWS_POOL_SIZE', 10))
+
+
+class DataProvider:
+    """Source of price history, ticker metadata and news for many symbols
+
+    Every method takes a list of symbols and returns a dict of results and
+    a dict of per-symbol error messages for the symbols that failed.
+    Metadata fields are the ones the app shows: name, sector, industry,
+    market_cap and pe_ratio.
+    """
+
+    # Whether get_news() can return anything, e.g. an API key is configured
+    enabled = True
+
+    def get_history(self, symbols, start, end, interval='1d'):
+        """OHLCV frames indexed by date"""
+        raise NotImplementedError
+
+    def get_metadata(self, symbols):
+        raise NotImplementedError
+
+    def get_news(self, symbols):
+        """Lists of NewsAPI-style article dicts"""
+        raise NotImplementedError
+
+
+def split_batch(batch, symbols):
+    """Split a yf.download(group_by='ticker') frame into per-symbol frames
+
+    Each frame is a column slice of the batch result, with the rows where
+    that symbol has no bar dropped. Returns the frames and an error message
+    for each symbol that is missing from the batch or has no closes, which
+    is how yf.download() reports a failed ticker.
+    """
+    if not isinstance(batch.columns, pd.MultiIndex) and not batch.empty:
+        # Single-ticker downloads come back with flat columns
+        batch = pd.concat({symbols[0]: batch}, axis=1)
+    returned = set(batch.columns.get_level_values(0)) if isinstance(batch.columns, pd.MultiIndex) else set()
+    frames = {}
+    errors = {}
+    for symbol in symbols:
+        if symbol not in returned:
+            errors[symbol] = 'Missing from download'
+            continue
+        frame = batch[symbol].dropna(subset=['Close'])
+        if frame.empty:
+            errors[symbol] = 'No price data found'
+        else:
+            frames[symbol] = frame
+    return frames, errors
+
+
+class YFinanceProvider(DataProvider):
+    """History and metadata from Yahoo Finance under the shared rate limit"""
+
+    def __init__(self, batch_size=HISTORY_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def get_history(self, symbols, start, end, interval='1d'):
+        """Download history in batched yf.download() calls of batch_size symbols"""
+        frames = {}
+        errors = {}
+        for i in range(0, len(symbols), self.batch_size):
+            chunk = symbols[i:i + self.batch_size]
+            try:
+                rate_limited('yfinance')
+                batch = yf.download(
+                    chunk, start=start, end=end, interval=interval,
+                    group_by='ticker', auto_adjust=True, progress=False, threads=True
+                )
+            except Exception as e:
+                print(f"Error downloading history for {len(chunk)} symbols: {str(e)}")
+                record_error('yfinance_history')
+                errors.update({symbol: str(e) for symbol in chunk})
+                continue
+
+            # yf.shared._ERRORS is reset by every download, so concurrent
+            # calls would see each other's errors; judge by the frame instead
+            chunk_frames, chunk_errors = split_batch(batch, chunk)
+            frames.update(chunk_frames)
+            errors.update(chunk_errors)
+            for _ in chunk_errors:
+                record_error('yfinance_history')
+        return frames, errors
+
+    def get_metadata(self, symbols):
+        """Ticker info fields, one rate-limited lookup per symbol"""
+        fields = {}
+        errors = {}
+        for symbol in symbols:
+            try:
+                rate_limited('yfinance')
+                info = yf.Ticker(symbol).info
+                fields[symbol] = {
+                    'name': info.get('longName', symbol),
+                    'sector': info.get('sector', 'Unknown'),
+                    'industry': info.get('industry', 'Unknown'),
+                    'market_cap': int(info.get('marketCap', 0) or 0),
+                    'pe_ratio': float(info.get('trailingPE', 0) or 0)
+                }
+            except Exception as e:
+                record_error('yfinance_info')
+                errors[symbol] = str(e)
+        return fields, errors
+
+
+def make_session(retries=NEWS_RETRIES, backoff_factor=0.5, pool_size=NEWS_POOL_SIZE):
+    """Keep-alive session with a bounded connection pool and retry/backoff"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class NewsAPIProvider(DataProvider):
+    """Latest articles per symbol from NewsAPI's /v2/everything endpoint"""
+
+    def __init__(self, url=NEWS_API_URL, api_key=None, session=None,
+                 timeout=(NEWS_CONNECT_TIMEOUT, NEWS_READ_TIMEOUT)):
+        self.url = url
+        self.api_key = api_key
+        self.session = session or make_session()
+        self.timeout = timeout
+
+    @property
+    def enabled(self):
+        return bool(self.api_key or os.getenv('NEWS_API_KEY'))
+
+    def get_news(self, symbols):
+        articles = {}
+        errors = {}
+        for symbol in symbols:
+            params = {
+                'q': f'{symbol} stock',
+                'apiKey': self.api_key or os.getenv('NEWS_API_KEY'),
+                'language': 'en',
+                'sortBy': 'publishedAt',
+                'pageSize': 10
+            }
+            rate_limited('newsapi')
+            try:
+                response = self.session.get(self.url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                record_error('newsapi')
+                errors[symbol] = str(e)
+                continue
+            if response.status_code != 200:
+                record_error('newsapi')
+                errors[symbol] = f"NewsAPI returned {response.status_code}"
+                continue
+            articles[symbol] = response.json().get('articles', [])
+        return articles, errors
+
+
+def history_file(interval):
+    """Fixture file name of the bars recorded at interval"""
+    return 'history.csv.gz' if interval == '1d' else f'history-{interval}.csv.gz'
+
+
+def save_fixtures(path, histories, metadata, news, interval='1d'):
+    """Write histories (bars at interval), metadata fields and articles as replay fixtures"""
+    os.makedirs(path, exist_ok=True)
+    frames = [frame.assign(Symbol=symbol) for symbol, frame in histories.items()]
+    history = pd.concat(frames).rename_axis('Date').reset_index()
+    history.to_csv(os.path.join(path, history_file(interval)), index=False)
+    with open(os.path.join(path, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f)
+    with open(os.path.join(path, 'news.json'), 'w') as f:
+        json.dump(news, f)
+
+
+def _bound(value, index):
+    """A requested start or end as a Timestamp comparable with index"""
+    bound = pd.Timestamp(value)
+    if index.tz is not None and bound.tz is None:
+        bound = bound.tz_localize(index.tz)
+    return bound
+
+
+class ReplayProvider(DataProvider):
+    """Recorded history, metadata and articles served from local fixtures
+
+    Nothing is rate limited. Bars are recorded per interval, and each
+    recording is moved forward by whole weeks to end within the last week,
+    so fixtures recorded months ago still fill the app's 60-day window with
+    weekdays and trading hours intact. Symbols without recorded news get no
+    articles.
+    """
+
+    def __init__(self, path=REPLAY_FIXTURES_DIR):
+        self.path = path
+        self.recordings = {}
+        for name in os.listdir(path):
+            if name == history_file('1d'):
+                self.recordings['1d'] = self._load_history(os.path.join(path, name))
+            elif name.startswith('history-') and name.endswith('.csv.gz'):
+                self.recordings[name[len('history-'):-len('.csv.gz')]] = self._load_history(os.path.join(path, name))
+        self.histories = self.recordings.get('1d', {})
+        with open(os.path.join(path, 'metadata.json')) as f:
+            self.metadata = json.load(f)
+        with open(os.path.join(path, 'news.json')) as f:
+            self.news = json.load(f)
+        self.symbols = sorted(self.histories)
+
+    @staticmethod
+    def _load_history(path):
+        history = pd.read_csv(path, parse_dates=['Date'])
+        frames = {
+            symbol: frame.drop(columns='Symbol').set_index('Date')
+            for symbol, frame in history.groupby('Symbol')
+        }
+        last = history['Date'].max()
+        week = pd.Timedelta(weeks=1)
+        shift = max((pd.Timestamp.now(tz=last.tz) - last) // week, 0) * week
+        for frame in frames.values():
+            frame.index = frame.index + shift
+        return frames
+
+    def get_history(self, symbols, start=None, end=None, interval='1d'):
+        """Recorded bars at interval from start (inclusive) to end (exclusive)"""
+        recording = self.recordings.get(interval)
+        if recording is None:
+            return {}, {symbol: f'No recorded history for {interval}' for symbol in symbols}
+        frames = {}
+        errors = {}
+        for symbol in symbols:
+            frame = recording.get(symbol)
+            if frame is None:
+                errors[symbol] = 'No recorded history'
+                continue
+            index = frame.index
+            keep = np.ones(len(frame), dtype=bool)
+            if start is not None:
+                keep &= index >= _bound(start, index)
+            if end is not None:
+                keep &= index < _bound(end, index)
+            if keep.any():
+                frames[symbol] = frame[keep]
+            else:
+                errors[symbol] = 'No recorded history in the requested range'
+        return frames, errors
+
+    def get_metadata(self, symbols):
+        fields = {symbol: dict(self.metadata[symbol]) for symbol in symbols if symbol in self.metadata}
+        errors = {symbol: 'No recorded metadata' for symbol in symbols if symbol not in fields}
+        return fields, errors
+
+    def get_news(self, symbols):
+        return {symbol: self.news.get(symbol, []) for symbol in symbols}, {}
+
+
+PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'newsapi': NewsAPIProvider,
+    'replay': ReplayProvider,
+}
+
+
+def make_provider(name, default):
+    """Provider registered under name, falling back to the default one"""
+    factory = PROVIDERS.get(name)
+    if factory is None:
+        print(f"Unknown data provider {name}, using {default}")
+        factory = PROVIDERS[default]
+    return factory()
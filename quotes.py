@@ -0,0 +1,199 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # plain json instead
+    orjson = None
+
+from metrics import span
+from scoring import SIGNALS, score_features, top_k
+
+# Columns of a QuoteTable, in the key order rows are rendered in
+TEXT_FIELDS = ('symbol', 'name', 'sector', 'industry')
+FLOAT_FIELDS = ('price', 'change', 'pe_ratio', 'rsi', 'macd', 'adx', 'sentiment', 'as_of')
+INT_FIELDS = ('volume', 'market_cap')
+FIELD_ORDER = (
+    'symbol', 'name', 'price', 'change', 'volume', 'sector', 'industry',
+    'market_cap', 'pe_ratio', 'rsi', 'macd', 'adx', 'sentiment', 'as_of'
+)
+# Indicators get_indicator_explanations() describes
+EXPLAINED_FIELDS = ('rsi', 'macd', 'adx')
+
+
+def get_indicator_explanations(rsi, macd, adx):
+    """Get explanations for technical indicators"""
+    explanations = {}
+
+    # RSI explanation
+    if rsi < 30:
+        explanations['rsi'] = f"RSI: {rsi:.1f} - Oversold (Bullish signal, stock may be undervalued)"
+    elif rsi > 70:
+        explanations['rsi'] = f"RSI: {rsi:.1f} - Overbought (Bearish signal, stock may be overvalued)"
+    else:
+        explanations['rsi'] = f"RSI: {rsi:.1f} - Neutral (Stock is neither overbought nor oversold)"
+
+    # MACD explanation
+    if macd > 0:
+        explanations['macd'] = f"MACD: {macd:.2f} - Bullish (Moving average convergence indicates upward momentum)"
+    else:
+        explanations['macd'] = f"MACD: {macd:.2f} - Bearish (Moving average convergence indicates downward momentum)"
+
+    # ADX explanation
+    if adx > 25:
+        explanations['adx'] = f"ADX: {adx:.1f} - Strong trend (Price movement is directional)"
+    else:
+        explanations['adx'] = f"ADX: {adx:.1f} - Weak trend (Price movement is sideways/choppy)"
+
+    return explanations
+
+
+def _float_tokens(values):
+    tokens = list(map(float.__repr__, values.tolist()))
+    # JSON has no NaN or infinities; they are null, as orjson writes them
+    for i in np.flatnonzero(~np.isfinite(values)).tolist():
+        tokens[i] = 'null'
+    return tokens
+
+
+def _finite(value):
+    """value with NaN and infinite floats replaced by None, nested in dicts and lists"""
+    if isinstance(value, float):
+        return value if np.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def _text_tokens(values):
+    return [encode_basestring_ascii(value) if isinstance(value, str) else json.dumps(value) for value in values]
+
+
+class QuoteTable:
+    """Stock data for many symbols as one array per field
+
+    Prices, indicators, sentiment and scores are NumPy columns and the
+    text fields are plain lists, so a table of thousands of symbols is a
+    handful of objects rather than a dict per symbol. Rows keep the order
+    they were added in. Explanation text is only formatted for the rows
+    that are rendered, by records() or to_json().
+    """
+
+    def __init__(self, columns, scored=False):
+        self.columns = columns
+        self.scored = scored
+
+    @classmethod
+    def from_records(cls, records):
+        """Table of stock data dicts; missing numbers are NaN (or 0 for ints)"""
+        count = len(records)
+        columns = {field: [record.get(field) for record in records] for field in TEXT_FIELDS}
+        for field in FLOAT_FIELDS:
+            columns[field] = np.fromiter(
+                (record.get(field, np.nan) for record in records), dtype=float, count=count
+            )
+        for field in INT_FIELDS:
+            columns[field] = np.fromiter(
+                (record.get(field) or 0 for record in records), dtype='int64', count=count
+            )
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.columns['symbol'])
+
+    def score(self, config=None):
+        """Fill in the score and signal columns in one vectorized pass"""
+        with span('scoring'):
+            scores, signals = score_features(
+                self.columns['rsi'], self.columns['macd'], self.columns['sentiment'],
+                self.columns['change'], config
+            )
+        self.columns['score'] = scores
+        self.columns['signal'] = signals
+        self.scored = True
+        return self
+
+    def take(self, rows):
+        """Table of the given row positions, in that order"""
+        rows = np.asarray(rows, dtype=int)
+        return QuoteTable({
+            field: column[rows] if isinstance(column, np.ndarray) else [column[i] for i in rows.tolist()]
+            for field, column in self.columns.items()
+        }, self.scored)
+
+    def top(self, k):
+        """The k highest-scoring rows, best first"""
+        return self.take(top_k(self.columns['score'], k))
+
+    def _explanations(self):
+        return [
+            get_indicator_explanations(rsi, macd, adx)
+            for rsi, macd, adx in zip(
+                self.columns['rsi'].tolist(), self.columns['macd'].tolist(), self.columns['adx'].tolist()
+            )
+        ]
+
+    def records(self):
+        """Rows as stock data dicts, with signal, score and explanations"""
+        values = [
+            self.columns[field].tolist() if isinstance(self.columns[field], np.ndarray) else self.columns[field]
+            for field in FIELD_ORDER
+        ]
+        rows = [dict(zip(FIELD_ORDER, row)) for row in zip(*values)]
+        if self.scored:
+            for row, signal, score in zip(rows, SIGNALS[self.columns['signal']].tolist(),
+                                          self.columns['score'].tolist()):
+                row['signal'] = signal
+                row['score'] = score
+        for row, explanations in zip(rows, self._explanations()):
+            row['explanations'] = explanations
+        return rows
+
+    def to_json(self):
+        """JSON array of the rows, formatted column by column"""
+        if not len(self):
+            return '[]'
+        fields = list(FIELD_ORDER)
+        tokens = []
+        for field in FIELD_ORDER:
+            column = self.columns[field]
+            if field in TEXT_FIELDS:
+                tokens.append(_text_tokens(column))
+            elif field in INT_FIELDS:
+                tokens.append(list(map(str, column.tolist())))
+            else:
+                tokens.append(_float_tokens(column))
+        if self.scored:
+            fields += ['signal', 'score']
+            signal_tokens = _text_tokens(SIGNALS.tolist())
+            tokens.append([signal_tokens[code] for code in self.columns['signal'].tolist()])
+            tokens.append(_float_tokens(self.columns['score']))
+        explanations = self._explanations()
+        for key in EXPLAINED_FIELDS:
+            tokens.append(_text_tokens([row[key] for row in explanations]))
+
+        template = '{' + ','.join(f'"{field}":%s' for field in fields) + ',"explanations":{' + \
+            ','.join(f'"{key}":%s' for key in EXPLAINED_FIELDS) + '}}'
+        return '[' + ','.join(template % row for row in zip(*tokens)) + ']'
+
+
+def dumps(payload):
+    """UTF-8 JSON of payload; QuoteTables in it (or in its top-level values) are rendered as rows
+
+    Tables are always encoded from their columns, so they come out the same
+    with or without orjson. Everything else uses orjson when installed, or
+    json. NaN and infinities are written as null either way.
+    """
+    if isinstance(payload, QuoteTable):
+        return payload.to_json().encode()
+    if isinstance(payload, dict) and any(isinstance(value, QuoteTable) for value in payload.values()):
+        return b'{' + b','.join(
+            json.dumps(str(key)).encode() + b':' + dumps(value) for key, value in payload.items()
+        ) + b'}'
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_finite(payload), separators=(',', ':')).encode()
@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import os
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+
+from cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+# Compressed bodies kept by ETag, so polls for unchanged data are not recompressed
+COMPRESSED_CACHE_SIZE = int(os.getenv('COMPRESSED_CACHE_SIZE', 64))
+
+ENCODINGS = ['br', 'gzip']
+
+compressed_cache = TTLCache(maxsize=COMPRESSED_CACHE_SIZE, ttl=3600)
+
+
+def etag(body):
+    """Strong ETag of an uncompressed body"""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def encoded_etag(tag, encoding):
+    """ETag of the body compressed with encoding; strong ETags differ per encoding"""
+    return f'{tag[:-1]}-{encoding}"' if encoding else tag
+
+
+def not_modified(tag, if_none_match):
+    """Whether an If-None-Match header matches tag in any encoding"""
+    for candidate in (if_none_match or '').split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # If-None-Match uses the weak comparison
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate in [tag] + [encoded_etag(tag, encoding) for encoding in ENCODINGS]:
+            return True
+    return False
+
+
+def not_modified_since(last_modified, if_modified_since):
+    """Whether a Last-Modified date is no later than an If-Modified-Since header"""
+    if not last_modified or not if_modified_since:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+def cache_control(max_age):
+    """Cache-Control letting browsers and shared caches reuse a response for max_age seconds"""
+    return f'public, max-age={max(0, int(max_age))}'
+
+
+def choose_encoding(accept_encoding):
+    """'br' or 'gzip' if the Accept-Encoding header allows it, else None"""
+    accepted = set()
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    for encoding in ENCODINGS:
+        if encoding in accepted and (encoding != 'br' or brotli is not None):
+            return encoding
+    return 'gzip' if '*' in accepted else None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def negotiate(body, request_headers, headers=None):
+    """Status, body and headers for an encoded JSON body
+
+    The ETag is the one in headers if set, else a hash of body. Clients
+    that already hold it get an empty 304, as do clients without an ETag
+    whose If-Modified-Since is no earlier than the Last-Modified in
+    headers. Bodies of COMPRESS_MIN_SIZE
+    or more are compressed if Accept-Encoding allows, reusing an earlier
+    compression of the same body. request_headers is any mapping whose
+    get() takes lowercase header names.
+    """
+    headers = dict(headers or {})
+    tag = headers.get('ETag') or etag(body)
+    encoding = None
+    if len(body) >= COMPRESS_MIN_SIZE:
+        encoding = choose_encoding(request_headers.get('accept-encoding'))
+    headers['ETag'] = encoded_etag(tag, encoding)
+    headers['Vary'] = 'Accept-Encoding'
+    # If-None-Match takes precedence over If-Modified-Since
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match:
+        fresh = not_modified(tag, if_none_match)
+    else:
+        fresh = not_modified_since(headers.get('Last-Modified'), request_headers.get('if-modified-since'))
+    if fresh:
+        return 304, b'', headers
+    if encoding:
+        key = (tag, encoding)
+        compressed = compressed_cache.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding)
+            compressed_cache.set(key, compressed)
+        body = compressed
+        headers['Content-Encoding'] = encoding
+    return 200, body, headers
+
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed response, flushing after every chunk
+
+    Each chunk is decodable as soon as it arrives, so clients still see
+    rows as they complete.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            yield compressor.process(chunk.encode()) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+
+SCORING_CONFIG_PATH = os.getenv('SCORING_CONFIG_PATH', '')
+
+DEFAULT_SCORING = {
+    # Weights of the final score
+    'technical_weight': 0.4,
+    'sentiment_weight': 0.3,
+    'momentum_weight': 0.3,
+    # RSI levels counted as oversold (bullish) and overbought (bearish)
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+    # Score above strong_buy is "Strong Buy", above buy is "Buy",
+    # below sell is "Sell", anything else is "Hold"
+    'strong_buy': 0.6,
+    'buy': 0.4,
+    'sell': 0.4
+}
+
+SIGNALS = np.array(['Strong Buy', 'Buy', 'Sell', 'Hold'])
+
+
+def load_scoring_config(path=SCORING_CONFIG_PATH):
+    """Default scoring config, overridden by any keys in a JSON file"""
+    config = dict(DEFAULT_SCORING)
+    if not path:
+        return config
+    try:
+        with open(path) as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading scoring config {path}: {str(e)}")
+        return config
+    # Files written by the sweep tool keep the parameters under 'config'
+    overrides = overrides.get('config', overrides)
+    config.update({key: overrides[key] for key in DEFAULT_SCORING if key in overrides})
+    return config
+
+
+def score_features(rsi, macd, sentiment, change, config=None):
+    """Score N symbols from columnar features
+
+    Each argument is a length-N array. Returns the final scores and the
+    index of each symbol's signal in SIGNALS.
+    """
+    config = config or DEFAULT_SCORING
+    rsi = np.asarray(rsi, dtype=float)
+    macd = np.asarray(macd, dtype=float)
+    sentiment = np.asarray(sentiment, dtype=float)
+    change = np.asarray(change, dtype=float)
+
+    # Technical score: +1 oversold / -1 overbought, +1 bullish / -1 bearish MACD
+    technical_score = (
+        (rsi < config['rsi_oversold']).astype(float)
+        - (rsi > config['rsi_overbought'])
+        + np.where(macd > 0, 1.0, -1.0)
+    )
+    sentiment_score = (sentiment + 1) / 2  # Normalize to 0-1
+    momentum_score = (change > 0).astype(float)
+
+    scores = (
+        technical_score * config['technical_weight'] +
+        sentiment_score * config['sentiment_weight'] +
+        momentum_score * config['momentum_weight']
+    )
+
+    signals = np.select(
+        [scores > config['strong_buy'], scores > config['buy'], scores < config['sell']],
+        [0, 1, 2],
+        default=3
+    )
+    return scores, signals
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first, without a full sort"""
+    scores = np.asarray(scores, dtype=float)
+    if k <= 0 or not len(scores):
+        return np.array([], dtype=int)
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    if np.isnan(kth):
+        return np.argsort(-scores, kind='stable')[:k]
+    # Every score tying the k-th is a candidate, so ties keep index order
+    # like list.sort(reverse=True) rather than whatever argpartition picked
+    candidates = np.flatnonzero(scores >= kth)
+    return candidates[np.argsort(-scores[candidates], kind='stable')[:k]]
@@ -0,0 +1,165 @@
+import heapq
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from quotes import QuoteTable, dumps
+
+UNIVERSE_DIR = os.getenv(
+    'UNIVERSE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universes')
+)
+SCREENER_MAX_SYMBOLS = int(os.getenv('SCREENER_MAX_SYMBOLS', 5000))
+SCREENER_CHUNK_SIZE = int(os.getenv('SCREENER_CHUNK_SIZE', 25))
+SCREENER_CONCURRENCY = int(os.getenv('SCREENER_CONCURRENCY', 2))
+
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9.\-^=]{1,10}$')
+
+
+def normalize_symbols(symbols):
+    """Uppercase, validate and dedupe symbols, keeping their order"""
+    cleaned = []
+    for symbol in symbols:
+        symbol = symbol.strip().upper()
+        if symbol and SYMBOL_PATTERN.match(symbol):
+            cleaned.append(symbol)
+    return list(dict.fromkeys(cleaned))
+
+
+def list_universes():
+    if not os.path.isdir(UNIVERSE_DIR):
+        return []
+    return sorted(name[:-4] for name in os.listdir(UNIVERSE_DIR) if name.endswith('.txt'))
+
+
+def load_universe(name):
+    """Symbols of a named universe file in UNIVERSE_DIR, or None if unknown"""
+    if name not in list_universes():
+        return None
+    with open(os.path.join(UNIVERSE_DIR, f"{name}.txt")) as f:
+        return normalize_symbols(line for line in f if not line.startswith('#'))
+
+
+def parse_filters(args):
+    """Screener filters from request arguments; raises ValueError on bad input"""
+    filters = {}
+    if args.get('sector'):
+        filters['sector'] = args['sector'].strip().lower()
+    for name in ('min_market_cap', 'rsi_min', 'rsi_max'):
+        if args.get(name) not in (None, ''):
+            filters[name] = float(args[name])
+    return filters
+
+
+def needs_metadata(filters):
+    return 'sector' in filters or 'min_market_cap' in filters
+
+
+def matches(row, filters):
+    if 'sector' in filters and row['sector'].lower() != filters['sector']:
+        return False
+    if 'min_market_cap' in filters and row['market_cap'] < filters['min_market_cap']:
+        return False
+    if 'rsi_min' in filters and row['rsi'] < filters['rsi_min']:
+        return False
+    if 'rsi_max' in filters and row['rsi'] > filters['rsi_max']:
+        return False
+    return True
+
+
+class TopK:
+    """Keeps the k highest-scoring rows seen so far in a min-heap"""
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+        self._seq = 0
+
+    def push(self, row):
+        # The sequence number breaks ties so rows themselves are never compared
+        entry = (row['score'], -self._seq, row)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def results(self):
+        return [row for _, _, row in sorted(self._heap, reverse=True)]
+
+
+def screen(symbols, fetch, filters=None, k=20, scoring_config=None,
+           chunk_size=SCREENER_CHUNK_SIZE, concurrency=SCREENER_CONCURRENCY, known=None):
+    """Scan a universe and yield events as chunks of symbols complete
+
+    fetch(symbols) must return (results, errors) like get_stocks_data().
+    Yields ('row', row) for every symbol that passes the filters,
+    ('error', {...}) for symbols that failed, and finally
+    ('top', {...}) with the k best rows and scan totals. If known is given,
+    symbols for which known(symbol) is false lack data the filters need;
+    they are listed under 'skipped' in the last message instead of being
+    filtered. Chunks are
+    submitted as earlier ones finish, so closing the generator (e.g. when
+    the client disconnects) stops the scan after the chunks in flight.
+    """
+    filters = filters or {}
+    top = TopK(k)
+    scanned = matched = failed = 0
+    skipped = []
+    chunks = (symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size))
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='screener')
+    futures = {}
+
+    def submit_next():
+        chunk = next(chunks, None)
+        if chunk:
+            futures[executor.submit(fetch, chunk)] = chunk
+
+    try:
+        for _ in range(concurrency):
+            submit_next()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            future = done.pop()
+            chunk = futures.pop(future)
+            submit_next()
+            try:
+                results, errors = future.result()
+            except Exception as e:
+                print(f"Error screening {len(chunk)} symbols: {str(e)}")
+                results, errors = {}, {symbol: str(e) for symbol in chunk}
+
+            rows = [results[symbol] for symbol in chunk if symbol in results]
+            if known is not None:
+                skipped.extend(row['symbol'] for row in rows if not known(row['symbol']))
+                rows = [row for row in rows if known(row['symbol'])]
+            table = QuoteTable.from_records(rows).score(scoring_config)
+            scanned += len(chunk)
+            # Only matching rows are rendered
+            passed = [i for i, row in enumerate(rows) if matches(row, filters)]
+            for row in table.take(passed).records():
+                matched += 1
+                top.push(row)
+                yield 'row', row
+            for symbol, error in errors.items():
+                failed += 1
+                yield 'error', {'symbol': symbol, 'error': error}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield 'top', {
+        'results': top.results(),
+        'scanned': scanned,
+        'matched': matched,
+        'failed': failed,
+        'skipped': skipped
+    }
+
+
+# Encoded with quotes.dumps() so NaN and infinities are null, not invalid JSON
+def format_ndjson(event, payload):
+    return dumps({'type': event, **payload}).decode() + '\n'
+
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {dumps(payload).decode()}\n\n"
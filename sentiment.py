@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from textblob import TextBlob
+
+SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', 50000))
+SENTIMENT_CACHE_PATH = os.getenv(
+    'SENTIMENT_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sentiment.log')
+)
+
+
+def text_key(text):
+    """Content hash used as the memo key for an article text"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def score_text(text):
+    return TextBlob(text).sentiment.polarity
+
+
+class SentimentScorer:
+    """Scores article texts in batches, memoizing polarity by content hash
+
+    The memo is an LRU bounded to maxsize entries. New scores are appended
+    to a log file so they survive restarts; the log is rewritten from the
+    in-memory memo once it grows to twice maxsize lines.
+    """
+
+    def __init__(self, maxsize=SENTIMENT_CACHE_SIZE, path=SENTIMENT_CACHE_PATH, score=score_text):
+        self.maxsize = maxsize
+        self.path = path or None
+        self.score = score
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lines = 0
+        self.texts_seen = 0
+        self.texts_scored = 0
+        self.scoring_seconds = 0.0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    key, _, value = line.partition(' ')
+                    try:
+                        self._memo[key] = float(value)
+                    except ValueError:
+                        continue  # Partially written last line
+                    self._memo.move_to_end(key)
+                    self._log_lines += 1
+        except OSError as e:
+            print(f"Error reading sentiment cache: {str(e)}")
+        while len(self._memo) > self.maxsize:
+            self._memo.popitem(last=False)
+
+    def _persist(self, scored):
+        if not self.path or not scored:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if self._log_lines + len(scored) > 2 * self.maxsize:
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    f.writelines(f"{key} {value!r}\n" for key, value in self._memo.items())
+                os.replace(tmp_path, self.path)
+                self._log_lines = len(self._memo)
+            else:
+                with open(self.path, 'a') as f:
+                    f.writelines(f"{key} {value!r}\n" for key, value in scored.items())
+                self._log_lines += len(scored)
+        except OSError as e:
+            print(f"Error writing sentiment cache: {str(e)}")
+
+    def score_texts(self, texts):
+        """Return the polarity of each text, scoring only texts not seen before"""
+        keys = [text_key(text) for text in texts]
+        polarities = {}
+        pending = {}
+        with self._lock:
+            self.texts_seen += len(texts)
+            for key, text in zip(keys, texts):
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    polarities[key] = self._memo[key]
+                else:
+                    # Duplicates within the batch are scored once
+                    pending.setdefault(key, text)
+
+        scored = {}
+        start = time.perf_counter()
+        for key, text in pending.items():
+            scored[key] = self.score(text)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.texts_scored += len(scored)
+            self.scoring_seconds += elapsed
+            for key, value in scored.items():
+                self._memo[key] = value
+                self._memo.move_to_end(key)
+            while len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+            self._persist(scored)
+
+        polarities.update(scored)
+        return [polarities[key] for key in keys]
+
+    def stats(self):
+        """Memo hit rate and TextBlob throughput"""
+        hits = self.texts_seen - self.texts_scored
+        return {
+            'size': len(self._memo),
+            'maxsize': self.maxsize,
+            'texts_seen': self.texts_seen,
+            'texts_scored': self.texts_scored,
+            'hit_rate': hits / self.texts_seen if self.texts_seen else 0.0,
+            'articles_per_sec': self.texts_scored / self.scoring_seconds if self.scoring_seconds else 0.0
+        }
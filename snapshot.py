@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv('SNAPSHOT_REFRESH_INTERVAL', 300))
+SNAPSHOT_MAX_AGE = float(os.getenv('SNAPSHOT_MAX_AGE', 600))
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', '')
+# How long a snapshot kept in a shared cache backend outlives its refresh
+SNAPSHOT_CACHE_TTL = 24 * 3600
+
+
+class PredictionSnapshot:
+    """Latest result of a compute function, refreshed in the background
+
+    Readers always get the most recent snapshot immediately. When it is
+    older than max_age it is still served, flagged as stale, and a refresh
+    is started (stale-while-revalidate). If path is set the snapshot is also
+    written there so several gunicorn workers can share one copy; a lock
+    file ensures only one worker recomputes at a time. A shared cache
+    backend (see cache.make_cache) can be passed instead of a path, which
+    also works across hosts with Redis.
+    """
+
+    def __init__(self, compute, interval=SNAPSHOT_REFRESH_INTERVAL,
+                 max_age=SNAPSHOT_MAX_AGE, path=SNAPSHOT_PATH, cache=None):
+        self.compute = compute
+        self.interval = interval
+        self.max_age = max_age
+        self.path = path or None
+        self.cache = cache
+        self._snapshot = None
+        self._disk_mtime = None
+        self._refresh_lock = threading.Lock()
+        self._scheduler = None
+        self._start_lock = threading.Lock()
+
+    def _load_from_disk(self):
+        """Pick up a snapshot written by another worker if it is newer"""
+        if self.cache is not None:
+            snapshot = self.cache.get('latest')
+            if snapshot and (self._snapshot is None or snapshot['generated_at'] > self._snapshot['generated_at']):
+                self._snapshot = snapshot
+            return
+        if not self.path:
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._disk_mtime:
+            return
+        self._disk_mtime = mtime
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading predictions snapshot: {str(e)}")
+            return
+        if self._snapshot is None or snapshot['generated_at'] > self._snapshot['generated_at']:
+            self._snapshot = snapshot
+
+    def _save_to_disk(self, snapshot):
+        if self.cache is not None:
+            self.cache.set('latest', snapshot, ttl=SNAPSHOT_CACHE_TTL)
+            return
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error writing predictions snapshot: {str(e)}")
+
+    def _acquire_file_lock(self):
+        if self.cache is not None:
+            return self.cache.acquire('refresh', timeout=self.interval)
+        if not self.path or fcntl is None:
+            return None
+        lock_file = open(f"{self.path}.lock", 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        return lock_file
+
+    def refresh(self):
+        """Recompute the snapshot unless a refresh is already running"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        lock_file = None
+        try:
+            lock_file = self._acquire_file_lock()
+            if lock_file is False:
+                # Another worker is recomputing; it will write the file
+                return False
+            predictions = self.compute()
+            if not predictions:
+                print("Snapshot refresh returned no predictions, keeping previous snapshot")
+                return False
+            snapshot = {'predictions': predictions, 'generated_at': time.time()}
+            self._snapshot = snapshot
+            self._save_to_disk(snapshot)
+            return True
+        except Exception as e:
+            print(f"Error refreshing predictions snapshot: {str(e)}")
+            return False
+        finally:
+            if lock_file is True:
+                self.cache.release('refresh')
+            elif lock_file:
+                lock_file.close()
+            self._refresh_lock.release()
+
+    def refresh_async(self):
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh, name='snapshot-refresh', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._load_from_disk()
+            snapshot = self._snapshot
+            if snapshot is None or time.time() - snapshot['generated_at'] >= self.interval:
+                self.refresh()
+            time.sleep(min(self.interval, 30))
+
+    def start(self):
+        """Start the background scheduler once per process; returns True if it was started"""
+        with self._start_lock:
+            if self._scheduler is not None and self._scheduler.is_alive():
+                return False
+            self._scheduler = threading.Thread(target=self._run, name='snapshot-scheduler', daemon=True)
+            self._scheduler.start()
+            return True
+
+    def get(self):
+        """Return the current snapshot with its age and staleness, or None"""
+        self._load_from_disk()
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh_async()
+            return None
+
+        age = time.time() - snapshot['generated_at']
+        stale = age > self.max_age
+        if stale:
+            self.refresh_async()
+        return {
+            'predictions': snapshot['predictions'],
+            'generated_at': snapshot['generated_at'],
+            'age': age,
+            'stale': stale
+        }
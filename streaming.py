@@ -0,0 +1,348 @@
+import math
+import threading
+from collections import deque
+
+import pandas as pd
+
+from indicators import (
+    ADX_WINDOW, BOLLINGER_DEV, BOLLINGER_WINDOW, FIELDS, INDICATOR_COLUMNS, MACD_FAST,
+    MACD_SLOW, MIN_POINTS, RSI_WINDOW
+)
+
+NAN = float('nan')
+
+
+class StreamingRSI:
+    """RSI updated one close at a time (Wilder smoothing, same as ta)"""
+
+    def __init__(self, window=RSI_WINDOW):
+        self.window = window
+        self.count = 0
+        self.prev_close = None
+        self.avg_up = 0.0
+        self.avg_down = 0.0
+
+    def update(self, close):
+        if self.count > 0:
+            diff = close - self.prev_close
+            alpha = 1 / self.window
+            self.avg_up = alpha * max(diff, 0.0) + (1 - alpha) * self.avg_up
+            self.avg_down = alpha * max(-diff, 0.0) + (1 - alpha) * self.avg_down
+        self.prev_close = close
+        self.count += 1
+
+    @property
+    def value(self):
+        if self.count < self.window:
+            return NAN
+        if self.avg_down == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.avg_up / self.avg_down)
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(state)
+        return obj
+
+
+class StreamingMACD:
+    """MACD line from fast and slow EMAs of the close"""
+
+    def __init__(self, fast=MACD_FAST, slow=MACD_SLOW):
+        self.fast = fast
+        self.slow = slow
+        self.count = 0
+        self.ema_fast = None
+        self.ema_slow = None
+
+    def update(self, close):
+        if self.count == 0:
+            self.ema_fast = self.ema_slow = close
+        else:
+            alpha_fast = 2 / (self.fast + 1)
+            alpha_slow = 2 / (self.slow + 1)
+            self.ema_fast = alpha_fast * close + (1 - alpha_fast) * self.ema_fast
+            self.ema_slow = alpha_slow * close + (1 - alpha_slow) * self.ema_slow
+        self.count += 1
+
+    @property
+    def value(self):
+        if self.count < self.slow:
+            return NAN
+        return self.ema_fast - self.ema_slow
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(state)
+        return obj
+
+
+class StreamingBollinger:
+    """Bollinger Bands from running sums over a fixed window of closes"""
+
+    def __init__(self, window=BOLLINGER_WINDOW, dev=BOLLINGER_DEV):
+        self.window = window
+        self.dev = dev
+        self.closes = deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, close):
+        if len(self.closes) == self.window:
+            oldest = self.closes[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.closes.append(close)
+        self.total += close
+        self.total_sq += close * close
+
+    @property
+    def value(self):
+        """(upper_band, lower_band), NaN until the window is full"""
+        if len(self.closes) < self.window:
+            return NAN, NAN
+        mean = self.total / self.window
+        std = math.sqrt(max(self.total_sq / self.window - mean * mean, 0.0))
+        return mean + self.dev * std, mean - self.dev * std
+
+    def to_dict(self):
+        state = dict(vars(self))
+        state['closes'] = list(self.closes)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(state)
+        obj.closes = deque(state['closes'], maxlen=state['window'])
+        return obj
+
+
+class StreamingADX:
+    """ADX with Wilder sums seeded over the first window, same as ta"""
+
+    def __init__(self, window=ADX_WINDOW):
+        self.window = window
+        self.count = 0
+        self.prev_high = None
+        self.prev_low = None
+        self.prev_close = None
+        self.trs = 0.0
+        self.dip = 0.0
+        self.din = 0.0
+        self.dx_count = 0
+        self.dx_sum = 0.0
+        self.adx = NAN
+
+    def update(self, high, low, close):
+        if self.count > 0:
+            w = self.window
+            movement = max(high, self.prev_close) - min(low, self.prev_close)
+            diff_up = high - self.prev_high
+            diff_down = self.prev_low - low
+            pos = diff_up if diff_up > diff_down and diff_up > 0 else 0.0
+            neg = diff_down if diff_down > diff_up and diff_down > 0 else 0.0
+
+            if self.count <= w:
+                self.trs += movement
+                self.dip += pos
+                self.din += neg
+            else:
+                self.trs += movement - self.trs / w
+                self.dip += pos - self.dip / w
+                self.din += neg - self.din / w
+
+            if self.count >= w:
+                total = self.dip + self.din
+                dx = 100 * abs(self.dip - self.din) / total if total and self.trs else NAN
+                self.dx_count += 1
+                if self.dx_count < w:
+                    self.dx_sum += dx
+                elif self.dx_count == w:
+                    self.adx = (self.dx_sum + dx) / w
+                else:
+                    self.adx = (self.adx * (w - 1) + dx) / w
+
+        self.prev_high = high
+        self.prev_low = low
+        self.prev_close = close
+        self.count += 1
+
+    @property
+    def value(self):
+        return self.adx
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(state)
+        return obj
+
+
+class StreamingOBV:
+    """Running on-balance volume"""
+
+    def __init__(self):
+        self.count = 0
+        self.prev_close = None
+        self.obv = 0.0
+
+    def update(self, close, volume):
+        if self.count > 0 and close < self.prev_close:
+            self.obv -= volume
+        else:
+            self.obv += volume
+        self.prev_close = close
+        self.count += 1
+
+    @property
+    def value(self):
+        return self.obv
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(state)
+        return obj
+
+
+class StreamingIndicators:
+    """All dashboard indicators for one symbol, updated in O(1) per bar
+
+    Produces the same values as get_technical_indicators() over the same
+    bars, but a new bar only touches the running state instead of
+    recomputing the full history. The state round-trips through to_dict()
+    and from_dict() as plain JSON-compatible data so it can be persisted
+    and resumed.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.last_close = None
+        self.rsi = StreamingRSI()
+        self.macd = StreamingMACD()
+        self.bollinger = StreamingBollinger()
+        self.adx = StreamingADX()
+        self.obv = StreamingOBV()
+
+    @classmethod
+    def from_history(cls, data):
+        """Warm up from an OHLCV frame, skipping rows with missing values"""
+        stream = cls()
+        for row in data[FIELDS].dropna().itertuples(index=False):
+            stream.update(*row)
+        return stream
+
+    def update(self, open_, high, low, close, volume):
+        """Feed one OHLCV bar"""
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.bollinger.update(close)
+        self.adx.update(high, low, close)
+        self.obv.update(close, volume)
+        self.last_close = close
+        self.count += 1
+
+    def values(self):
+        """Latest indicator values, or None if fewer than 20 bars were seen"""
+        if self.count < MIN_POINTS:
+            return None
+
+        rsi = self.rsi.value
+        macd = self.macd.value
+        upper_band, lower_band = self.bollinger.value
+        if math.isnan(upper_band) or math.isnan(lower_band):
+            upper_band = self.last_close * 1.02
+            lower_band = self.last_close * 0.98
+        adx = self.adx.value
+
+        # Same neutral defaults as the batch engine
+        return {
+            'rsi': 50.0 if math.isnan(rsi) else rsi,
+            'macd': 0.0 if math.isnan(macd) else macd,
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+            'adx': 50.0 if math.isnan(adx) or adx <= 0 else adx,
+            'obv': self.obv.value
+        }
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'last_close': self.last_close,
+            'rsi': self.rsi.to_dict(),
+            'macd': self.macd.to_dict(),
+            'bollinger': self.bollinger.to_dict(),
+            'adx': self.adx.to_dict(),
+            'obv': self.obv.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls.__new__(cls)
+        obj.count = state['count']
+        obj.last_close = state['last_close']
+        obj.rsi = StreamingRSI.from_dict(state['rsi'])
+        obj.macd = StreamingMACD.from_dict(state['macd'])
+        obj.bollinger = StreamingBollinger.from_dict(state['bollinger'])
+        obj.adx = StreamingADX.from_dict(state['adx'])
+        obj.obv = StreamingOBV.from_dict(state['obv'])
+        return obj
+
+
+class IndicatorStates:
+    """Streaming indicators per symbol, advanced only by bars not seen before
+
+    Each refresh of a symbol's history feeds the completed bars newer than
+    the ones already applied, so a poll costs O(new bars) rather than a
+    pass over the whole window. The newest bar may still be forming and
+    change on the next poll, so it is applied to a copy of the state.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def values(self, symbol, data):
+        """Latest indicator values for a symbol's OHLCV frame, or None if too short"""
+        bars = data[FIELDS].dropna()
+        if bars.empty:
+            return None
+        completed = bars.iloc[:-1]
+        with self._lock:
+            stream, last_time = self._states.get(symbol, (None, None))
+            if stream is None or last_time not in completed.index:
+                # First sight of the symbol, or the history no longer lines
+                # up with the state (e.g. a gap longer than the window)
+                stream = StreamingIndicators.from_history(completed)
+            else:
+                for row in completed[completed.index > last_time].itertuples(index=False):
+                    stream.update(*row)
+            if len(completed):
+                self._states[symbol] = (stream, completed.index[-1])
+            current = StreamingIndicators.from_dict(stream.to_dict())
+        current.update(*bars.iloc[-1])
+        return current.values()
+
+    def table(self, histories):
+        """Indicator table like indicators.compute_indicators() for many symbols"""
+        rows = {}
+        for symbol, data in histories.items():
+            values = self.values(symbol, data)
+            if values is not None:
+                rows[symbol] = values
+        return pd.DataFrame.from_dict(rows, orient='index', columns=INDICATOR_COLUMNS, dtype=float)
@@ -0,0 +1,318 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backtest import BACKTEST_SENTIMENT, compute_features, forward_returns, load_closes
+from price_store import PRICE_STORE_DIR, PriceStore
+from scoring import DEFAULT_SCORING, load_scoring_config
+from screener import load_universe, normalize_symbols
+
+SWEEP_FEATURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sweep_features.npz')
+
+# Values tried for each scoring parameter; the defaults are always included
+DEFAULT_GRID = {
+    'technical_weight': [0.2, 0.3, 0.4, 0.5, 0.6],
+    'sentiment_weight': [0.1, 0.2, 0.3, 0.4],
+    'momentum_weight': [0.1, 0.2, 0.3, 0.4, 0.5],
+    'rsi_oversold': [20, 25, 30, 35],
+    'rsi_overbought': [65, 70, 75, 80],
+    'strong_buy': [0.5, 0.6, 0.7, 0.8],
+    'buy': [0.3, 0.4, 0.5],
+    'sell': [0.2, 0.3, 0.4]
+}
+WEIGHT_KEYS = ['technical_weight', 'sentiment_weight', 'momentum_weight']
+THRESHOLD_KEYS = ['strong_buy', 'buy', 'sell']
+METRICS = ['spread', 'hit_rate', 'buy_mean', 'buy_hit_rate', 'buy_observations',
+           'sell_mean', 'sell_hit_rate', 'sell_observations']
+
+
+def build_features(closes, horizon, sentiment=BACKTEST_SENTIMENT):
+    """Flat arrays of scoring inputs and forward returns for every usable date
+
+    Only (date, symbol) pairs with warmed-up indicators and a known forward
+    return are kept. The result is what gets cached between sweeps.
+    """
+    close = closes.to_numpy(dtype=float)
+    features = compute_features(close)
+    features['sentiment'] = np.full(close.shape, sentiment)
+    returns = forward_returns(close, horizon)
+    valid = ~np.isnan(returns)
+    for values in features.values():
+        valid &= ~np.isnan(values)
+    flat = {name: values[valid] for name, values in features.items()}
+    flat['returns'] = returns[valid]
+    return flat
+
+
+def load_features(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def cached_features(path, symbols, horizon, years):
+    """Features cached for exactly these symbols, horizon and years, or None"""
+    if not os.path.exists(path):
+        return None
+    features = load_features(path)
+    if not {'requested', 'horizon', 'years'} <= set(features):
+        return None
+    if (features['requested'].tolist() != symbols or int(features['horizon']) != horizon
+            or float(features['years']) != years):
+        return None
+    return features
+
+
+def save_features(path, features, **info):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, **features, **{name: np.asarray(value) for name, value in info.items()})
+
+
+def expand_grid(grid=None):
+    """Weight combinations and threshold combinations of a parameter grid
+
+    Threshold combinations where strong_buy is not above buy are skipped.
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    grid = {key: sorted(set(values) | {DEFAULT_SCORING[key]}) for key, values in grid.items()}
+    weights = np.array(list(itertools.product(*(grid[key] for key in WEIGHT_KEYS))), dtype=float)
+    thresholds = np.array([
+        combo for combo in itertools.product(*(grid[key] for key in THRESHOLD_KEYS))
+        if combo[0] > combo[1]
+    ], dtype=float)
+    rsi_levels = [
+        (oversold, overbought)
+        for oversold, overbought in itertools.product(grid['rsi_oversold'], grid['rsi_overbought'])
+        if oversold < overbought
+    ]
+    return weights, thresholds, rsi_levels
+
+
+def cell_stats(features, oversold, overbought):
+    """Group observations into cells that always get the same score
+
+    With the RSI levels fixed, the score only depends on the technical
+    score (-2..2), whether the price went up, and the sentiment. Returns
+    the inputs of each cell with its observation count, summed return and
+    number of up and down moves.
+    """
+    rsi = features['rsi']
+    technical = (
+        (rsi < oversold).astype(np.int64)
+        - (rsi > overbought)
+        + np.where(features['macd'] > 0, 1, -1)
+    )
+    momentum = (features['change'] > 0).astype(np.int64)
+    sentiments, sentiment_index = np.unique(features['sentiment'], return_inverse=True)
+
+    cells = ((technical + 2) * 2 + momentum) * len(sentiments) + sentiment_index
+    size = 10 * len(sentiments)
+    returns = features['returns']
+    grid = np.arange(size)
+    return {
+        'technical': grid // (2 * len(sentiments)) - 2.0,
+        'momentum': (grid // len(sentiments)) % 2.0,
+        'sentiment': (sentiments[grid % len(sentiments)] + 1) / 2,
+        'count': np.bincount(cells, minlength=size).astype(float),
+        'sum': np.bincount(cells, weights=returns, minlength=size),
+        'up': np.bincount(cells, weights=returns > 0, minlength=size),
+        'down': np.bincount(cells, weights=returns < 0, minlength=size)
+    }
+
+
+def evaluate(cells, weights, thresholds):
+    """Metrics for every weight x threshold combination as (W * T, len(METRICS))
+
+    Scores are computed per cell rather than per observation, so each
+    combination costs a few small matrix products.
+    """
+    inputs = np.column_stack([cells['technical'], cells['sentiment'], cells['momentum']])
+    scores = weights @ inputs.T                                   # (W, C)
+    strong_buy, buy, sell = (thresholds[:, i][:, None, None] for i in range(3))
+    buy_side = (scores > strong_buy) | (scores > buy)             # (T, W, C)
+    sell_side = ~buy_side & (scores < sell)
+
+    def side(mask, hits):
+        observations = mask @ cells['count']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (mask @ cells['sum']) / observations
+            hit_rate = (mask @ cells[hits]) / observations
+        return observations, mean, hit_rate, mask @ cells[hits]
+
+    buy_obs, buy_mean, buy_hit_rate, buy_hits = side(buy_side.astype(float), 'up')
+    sell_obs, sell_mean, sell_hit_rate, sell_hits = side(sell_side.astype(float), 'down')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hit_rate = (buy_hits + sell_hits) / (buy_obs + sell_obs)
+    metrics = np.stack([
+        buy_mean - sell_mean, hit_rate, buy_mean, buy_hit_rate, buy_obs,
+        sell_mean, sell_hit_rate, sell_obs
+    ], axis=-1)
+    # Threshold-major to match the order of _configs()
+    return metrics.reshape(-1, len(METRICS))
+
+
+_worker_features = None
+
+
+def _init_worker(path):
+    global _worker_features
+    _worker_features = load_features(path)
+
+
+def _evaluate_levels(levels, weights, thresholds, features=None):
+    features = features if features is not None else _worker_features
+    return [evaluate(cell_stats(features, *level), weights, thresholds) for level in levels]
+
+
+def _configs(level, weights, thresholds):
+    for strong_buy, buy, sell in thresholds.tolist():
+        for technical, sentiment, momentum in weights.tolist():
+            yield {
+                'technical_weight': technical,
+                'sentiment_weight': sentiment,
+                'momentum_weight': momentum,
+                'rsi_oversold': level[0],
+                'rsi_overbought': level[1],
+                'strong_buy': strong_buy,
+                'buy': buy,
+                'sell': sell
+            }
+
+
+def sweep(features, grid=None, metric='spread', min_observations=100, workers=1, features_path=None):
+    """Evaluate every config of the grid and return them ranked by metric
+
+    Each entry is {'config': {...}, **metrics}. Configs that leave the
+    buy or sell side with fewer than min_observations are dropped. With
+    workers > 1 the RSI levels are spread over a process pool whose workers
+    load the cached features from features_path.
+    """
+    weights, thresholds, rsi_levels = expand_grid(grid)
+    if workers > 1 and features_path:
+        chunks = [rsi_levels[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(features_path,)) as executor:
+            outputs = list(executor.map(_evaluate_levels, chunks, [weights] * workers, [thresholds] * workers))
+        by_level = {
+            level: result for chunk, output in zip(chunks, outputs) for level, result in zip(chunk, output)
+        }
+        # Same order as a serial run so ties rank identically
+        results = [by_level[level] for level in rsi_levels]
+    else:
+        results = _evaluate_levels(rsi_levels, weights, thresholds, features)
+
+    metric_index = METRICS.index(metric)
+    ranked = []
+    for level, metrics in zip(rsi_levels, results):
+        usable = (
+            (metrics[:, METRICS.index('buy_observations')] >= min_observations)
+            & (metrics[:, METRICS.index('sell_observations')] >= min_observations)
+            & ~np.isnan(metrics[:, metric_index])
+        )
+        for config, row, keep in zip(_configs(level, weights, thresholds), metrics.tolist(), usable):
+            if keep:
+                ranked.append({'config': config, **dict(zip(METRICS, row))})
+    ranked.sort(key=lambda entry: entry[metric], reverse=True)
+    return ranked
+
+
+def evaluate_config(features, config):
+    """Metrics of a single config, e.g. the one the app is running with"""
+    cells = cell_stats(features, config['rsi_oversold'], config['rsi_overbought'])
+    weights = np.array([[config[key] for key in WEIGHT_KEYS]], dtype=float)
+    thresholds = np.array([[config[key] for key in THRESHOLD_KEYS]], dtype=float)
+    return dict(zip(METRICS, evaluate(cells, weights, thresholds)[0].tolist()))
+
+
+def _format_row(rank, entry):
+    config = entry['config']
+    return (f"{rank:>5} {config['technical_weight']:>5.2f} {config['sentiment_weight']:>5.2f} "
+            f"{config['momentum_weight']:>5.2f} {config['rsi_oversold']:>5g} {config['rsi_overbought']:>5g} "
+            f"{config['strong_buy']:>5.2f} {config['buy']:>5.2f} {config['sell']:>5.2f} "
+            f"{entry['spread'] * 100:>7.3f}% {entry['hit_rate'] * 100:>7.2f}% "
+            f"{int(entry['buy_observations']):>9} {int(entry['sell_observations']):>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Grid search over the scoring weights and signal thresholds')
+    parser.add_argument('symbols', nargs='*')
+    parser.add_argument('--universe', help='name of a universe file in universes/')
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--horizon', type=int, default=5, help='forward return horizon in days')
+    parser.add_argument('--root', default=PRICE_STORE_DIR, help='price store directory')
+    parser.add_argument('--features', default=SWEEP_FEATURES_PATH, help='feature cache file')
+    parser.add_argument('--refresh', action='store_true', help='recompute the cached features')
+    parser.add_argument('--grid', help='JSON file with lists of values per parameter')
+    parser.add_argument('--metric', choices=METRICS[:4], default='spread')
+    parser.add_argument('--min-observations', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--top', type=int, default=20, help='rows to print')
+    parser.add_argument('--output', help='write the ranked configs as JSON (loadable as SCORING_CONFIG_PATH)')
+    args = parser.parse_args(argv)
+
+    grid = None
+    if args.grid:
+        try:
+            with open(args.grid) as f:
+                grid = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f'cannot read grid {args.grid}: {e}')
+        if not isinstance(grid, dict):
+            parser.error('the grid must be a JSON object of parameter lists')
+        unknown = sorted(set(grid) - set(DEFAULT_GRID))
+        if unknown:
+            parser.error(f"unknown grid parameters: {', '.join(unknown)} (expected {', '.join(DEFAULT_GRID)})")
+        for key, values in grid.items():
+            if not isinstance(values, list) or not all(
+                    isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+                parser.error(f"grid parameter '{key}' must be a list of numbers")
+
+    started = time.perf_counter()
+    symbols = normalize_symbols(args.symbols)
+    if args.universe:
+        symbols += load_universe(args.universe) or []
+    symbols = list(dict.fromkeys(symbols)) or PriceStore(args.root).symbols()
+    if not symbols:
+        parser.error('no symbols given and the price store is empty')
+    # A cache built for other symbols, a different horizon or period is recomputed
+    features = None if args.refresh else cached_features(args.features, symbols, args.horizon, args.years)
+    if features is None:
+        start = datetime.now() - timedelta(days=int(args.years * 365.25))
+        closes = load_closes(symbols, args.root, start)
+        if closes.empty:
+            parser.error('no stored history for these symbols (run price_store.py backfill)')
+        features = build_features(closes, args.horizon)
+        save_features(args.features, features, symbols=list(closes.columns), requested=symbols,
+                      horizon=args.horizon, years=args.years)
+        print(f"Computed features for {len(closes.columns)} symbols in {time.perf_counter() - started:.2f}s")
+    else:
+        print(f"Using cached features from {args.features} (horizon {int(features['horizon'])} days)")
+    features = {name: features[name] for name in ('rsi', 'macd', 'change', 'sentiment', 'returns')}
+
+    started = time.perf_counter()
+    ranked = sweep(features, grid, args.metric, args.min_observations, args.workers, args.features)
+    print(f"Evaluated {len(features['returns'])} observations, {len(ranked)} usable configs "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    print(f"{'rank':>5} {'tech':>5} {'sent':>5} {'mom':>5} {'rsi<':>5} {'rsi>':>5} "
+          f"{'s.buy':>5} {'buy':>5} {'sell':>5} {'spread':>8} {'hits':>8} {'buy obs':>9} {'sell obs':>9}")
+    for rank, entry in enumerate(ranked[:args.top], 1):
+        print(_format_row(rank, entry))
+    current = load_scoring_config()
+    print(_format_row(0, {'config': current, **evaluate_config(features, current)}) + '  (current)')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'metric': args.metric,
+                'config': ranked[0]['config'] if ranked else current,
+                'results': ranked
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def random_bars(length, seed, end='2024-03-01'):
+    """Random-walk daily OHLCV frame shaped like yfinance history()"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, length))
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.5, length),
+        'High': close + rng.uniform(0.1, 2, length),
+        'Low': close - rng.uniform(0.1, 2, length),
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 5_000_000, length).astype(float)
+    }, index=pd.bdate_range(end=end, periods=length))
+
+
+@pytest.fixture
+def make_bars():
+    """Factory for random OHLCV frames"""
+    return random_bars
+
+
+class NewsStub:
+    """Local stand-in for the NewsAPI /v2/everything endpoint"""
+
+    def __init__(self):
+        self.requests = []
+        self.statuses = []   # status codes to return before falling back to 200
+        self.delay = 0
+        self.articles = [
+            {'title': 'Strong quarter', 'description': 'The company reported great results and strong growth.'},
+            {'title': 'Analyst note', 'description': 'Analysts remain cautious about weak guidance.'},
+        ]
+        self.url = None
+
+
+@pytest.fixture
+def news_stub():
+    """Threaded HTTP server that answers like NewsAPI, for offline tests"""
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    stub = NewsStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            stub.requests.append(parse_qs(urlparse(self.path).query))
+            if stub.delay:
+                time.sleep(stub.delay)
+            status = stub.statuses.pop(0) if stub.statuses else 200
+            body = json.dumps({'status': 'ok', 'articles': stub.articles} if status == 200
+                              else {'status': 'error'}).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    stub.url = f'http://127.0.0.1:{server.server_port}/v2/everything'
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+class RedisStub:
+    """In-memory store behind a local server speaking the Redis protocol"""
+
+    def __init__(self):
+        self.data = {}      # key -> (value, expires monotonic time or None)
+        self.commands = []
+        self.url = None
+
+    def get(self, key):
+        import time
+        entry = self.data.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+            self.data.pop(key, None)
+            return None
+        return entry[0]
+
+
+@pytest.fixture
+def redis_stub():
+    """Threaded TCP server handling the handful of Redis commands the cache uses"""
+    import fnmatch
+    import socketserver
+    import threading
+    import time
+
+    from cache import RELEASE_SCRIPT
+
+    stub = RedisStub()
+    lock = threading.Lock()
+
+    def encode(reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, str):
+            return b'+%s\r\n' % reply.encode()
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, bytes):
+            return b'$%d\r\n%s\r\n' % (len(reply), reply)
+        return b'*%d\r\n' % len(reply) + b''.join(encode(item) for item in reply)
+
+    def execute(args):
+        command = args[0].upper().decode()
+        stub.commands.append(command)
+        with lock:
+            if command == 'PING':
+                return 'PONG'
+            if command == 'SELECT':
+                return 'OK'
+            if command == 'GET':
+                return stub.get(args[1])
+            if command == 'SET':
+                options = [arg.upper() for arg in args[3:]]
+                if b'NX' in options and stub.get(args[1]) is not None:
+                    return None
+                expires = None
+                if b'PX' in options:
+                    expires = time.monotonic() + int(options[options.index(b'PX') + 1]) / 1000
+                stub.data[args[1]] = (args[2], expires)
+                return 'OK'
+            if command == 'DEL':
+                return sum(stub.data.pop(key, None) is not None for key in args[1:])
+            if command == 'EVAL' and args[1].decode() == RELEASE_SCRIPT:
+                # The only script the cache runs: compare-and-delete of a lock
+                if stub.get(args[3]) != args[4]:
+                    return 0
+                del stub.data[args[3]]
+                return 1
+            if command == 'SCAN':
+                pattern = args[args.index(b'MATCH') + 1].decode() if b'MATCH' in args else '*'
+                keys = [key for key in list(stub.data) if stub.get(key) is not None
+                        and fnmatch.fnmatchcase(key.decode(), pattern)]
+                return [b'0', keys]
+        raise ValueError(f"unsupported command {command}")
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                count = int(line[1:-2])
+                args = []
+                for _ in range(count):
+                    length = int(self.rfile.readline()[1:-2])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                try:
+                    self.wfile.write(encode(execute(args)))
+                except ValueError as e:
+                    self.wfile.write(b'-ERR %s\r\n' % str(e).encode())
+
+    class Server(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    stub.url = f'redis://127.0.0.1:{server.server_address[1]}/0'
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def offline_app(monkeypatch, make_bars):
+    """The Flask app module pointed at fake history, metadata and news sources"""
+    import yfinance as yf
+
+    import app as app_module
+    import concurrency
+    from cache import TTLCache
+    from metadata import MetadataStore
+
+    def download(tickers, **kwargs):
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        return pd.concat({ticker: make_bars(60, seed=len(ticker) + ord(ticker[-1])) for ticker in tickers}, axis=1)
+
+    monkeypatch.setattr(yf, 'download', download)
+    monkeypatch.setitem(concurrency.RATE_LIMITERS, 'yfinance', concurrency.TokenBucket(1000, 1000))
+    monkeypatch.setattr(app_module, 'price_store', None)
+    monkeypatch.setattr(app_module, 'history_cache', TTLCache(ttl=60))
+    monkeypatch.setattr(app_module, 'stock_data_cache', TTLCache(ttl=60))
+    monkeypatch.setattr(app_module, 'search_responses', TTLCache(ttl=60))
+    monkeypatch.setattr(app_module, 'metadata_store', MetadataStore(
+        fetch=lambda symbol: {'name': f'{symbol} Corp', 'sector': 'Tech', 'industry': 'Software',
+                              'market_cap': 10 ** 9, 'pe_ratio': 20.0},
+        path=None
+    ))
+    monkeypatch.setattr(app_module.news_client, 'get_articles', lambda symbol: None)
+    monkeypatch.setattr(app_module, 'start_background_jobs', lambda: None)
+    return app_module
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+
+import app as flask_app
+import asgi
+from live import QuoteBroadcaster
+from snapshot import PredictionSnapshot
+
+
+async def call(method, path, query=b'', body=b'', request_headers=()):
+    """Run one request through the ASGI app; returns (status, headers, json)"""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query, 'root_path': '', 'server': ('testserver', 80),
+        'client': ('127.0.0.1', 1234),
+        'headers': [(b'host', b'testserver'), (b'content-type', b'application/json'), *request_headers]
+    }
+    await asgi.app(scope, receive, send)
+    start = sent[0]
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    headers = {key.decode().lower(): value.decode() for key, value in start['headers']}
+    if headers.get('content-type') == 'application/x-ndjson':
+        return start['status'], headers, [json.loads(line) for line in body.splitlines()]
+    return start['status'], headers, json.loads(body) if body else None
+
+
+def test_search_stocks_matches_flask(offline_app):
+    body = json.dumps({'symbols': ['AAA', 'BBB', 'bad symbol!']}).encode()
+    status, headers, payload = asyncio.run(call('POST', '/search_stocks', body=body))
+    assert status == 200
+    assert headers['access-control-allow-origin'] == '*'
+
+    expected = offline_app.app.test_client().post('/search_stocks', json={'symbols': ['AAA', 'BBB', 'bad symbol!']}).get_json()
+    assert payload == expected
+    assert [row['symbol'] for row in payload['results']] == ['AAA', 'BBB']
+    assert payload['results'][0]['name'] == 'AAA Corp'
+    assert 'BAD SYMBOL!' in payload['errors']
+
+
+def test_search_stocks_rejects_malformed_bodies(offline_app):
+    client = offline_app.app.test_client()
+    for body, error in (([{'symbols': ['AAA']}], 'Request body must be a JSON object'),
+                        ({'symbols': 5}, "'symbols' must be a comma separated string or a list")):
+        response = client.post('/search_stocks', json=body)
+        assert (response.status_code, response.get_json()) == (400, {'error': error})
+        status, _, payload = asyncio.run(call('POST', '/search_stocks', body=json.dumps(body).encode()))
+        assert (status, payload) == (400, {'error': error})
+
+
+def test_search_stock_and_errors(offline_app):
+    status, _, payload = asyncio.run(call('GET', '/search_stock/msft'))
+    assert payload['symbol'] == 'MSFT'
+    assert payload['signal'] in ('Strong Buy', 'Buy', 'Sell', 'Hold')
+
+    status, _, payload = asyncio.run(call('GET', '/search_stock/WAYTOOLONGSYMBOL'))
+    assert (status, payload) == (400, {'error': 'Invalid stock symbol'})
+    status, _, payload = asyncio.run(call('GET', '/search_stocks', query=b'symbols='))
+    assert (status, payload) == (400, {'error': 'No valid stock symbols'})
+
+
+def test_news_failure_keeps_symbol(offline_app, monkeypatch):
+    def fail(symbol):
+        raise ConnectionError('news down')
+    monkeypatch.setattr(flask_app.news_client, 'get_articles', fail)
+
+    _, _, payload = asyncio.run(call('GET', '/search_stock/AAA'))
+    assert (payload['symbol'], payload['sentiment']) == ('AAA', 0.5)
+
+
+def test_concurrent_requests_overlap(offline_app, monkeypatch):
+    def slow_articles(symbol):
+        time.sleep(0.3)
+        return None
+    monkeypatch.setattr(flask_app.news_client, 'get_articles', slow_articles)
+
+    async def many():
+        return await asyncio.gather(*(call('GET', f'/search_stock/S{i}') for i in range(8)))
+
+    started = time.perf_counter()
+    responses = asyncio.run(many())
+    elapsed = time.perf_counter() - started
+    assert sorted(payload['symbol'] for _, _, payload in responses) == [f'S{i}' for i in range(8)]
+    # One request at a time would take at least 8 x 0.3s
+    assert elapsed < 1.5
+
+
+def test_predictions_snapshot_headers(offline_app, monkeypatch):
+    monkeypatch.setattr(flask_app, 'predictions_snapshot', PredictionSnapshot(lambda: [{'symbol': 'AAA'}], path=None))
+    _, headers, payload = asyncio.run(call('GET', '/get_predictions'))
+    # Cold start answers with a warming-up state instead of placeholder predictions
+    assert (headers['x-snapshot-stale'], headers['retry-after']) == ('true', str(flask_app.PREDICTIONS_RETRY_AFTER))
+    assert payload == {'warming_up': True, 'retry_after': flask_app.PREDICTIONS_RETRY_AFTER}
+
+    deadline = time.monotonic() + 2
+    while flask_app.predictions_snapshot.get() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    _, headers, payload = asyncio.run(call('GET', '/get_predictions'))
+    assert payload == [{'symbol': 'AAA'}]
+    assert headers['x-snapshot-stale'] == 'false'
+
+    status, _, payload = asyncio.run(call('GET', '/get_predictions', request_headers=[(b'if-none-match', headers['etag'].encode())]))
+    assert (status, payload) == (304, None)
+
+
+def test_other_routes_fall_through_to_flask(offline_app):
+    status, _, payload = asyncio.run(call('GET', '/cache_stats'))
+    assert status == 200
+    assert 'history' in payload
+
+
+def test_open_stream_does_not_block_other_routes(offline_app, monkeypatch):
+    quotes = lambda symbols: {symbol: {'symbol': symbol, 'price': 1.0} for symbol in symbols}
+    monkeypatch.setattr(flask_app, 'live_quotes', QuoteBroadcaster(quotes, ['AAA'], interval=60, heartbeat=0.2))
+    get_stocks_data = flask_app.get_stocks_data
+    monkeypatch.setattr(flask_app, 'get_stocks_data', lambda *args, **kwargs: time.sleep(1) or get_stocks_data(*args, **kwargs))
+
+    async def scenario():
+        disconnect = asyncio.Event()
+        received = asyncio.Queue()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            await received.put(message)
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/stream', 'raw_path': b'/stream', 'query_string': b'',
+            'root_path': '', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234), 'headers': []
+        }
+        stream = asyncio.ensure_future(asgi.app(scope, receive, send))
+        assert (await asyncio.wait_for(received.get(), 2))['status'] == 200
+        assert (await asyncio.wait_for(received.get(), 2))['body'].startswith(b'event: snapshot')
+
+        # A slow Flask route and a quick one, both while the stream is open
+        screener = asyncio.ensure_future(call('GET', '/screener', query=b'symbols=AAA'))
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        status, _, payload = await asyncio.wait_for(call('GET', '/cache_stats'), 2)
+        assert (status, 'history' in payload) == (200, True)
+        assert time.perf_counter() - started < 0.5
+        assert not screener.done()
+        _, _, lines = await asyncio.wait_for(screener, 5)
+        assert lines[-1]['type'] == 'top'
+
+        assert (await asyncio.wait_for(received.get(), 2))['body'] == b': keepalive\n\n'
+        disconnect.set()
+        await asyncio.wait_for(stream, 2)
+
+    asyncio.run(scenario())
+    assert flask_app.live_quotes.stats()['subscribers'] == 0
+
+
+def test_server_timing_header(offline_app, monkeypatch):
+    monkeypatch.setattr(asgi.metrics, 'SERVER_TIMING', True)
+    _, headers, _ = asyncio.run(call('GET', '/search_stock/AAA'))
+    stages = [entry.split(';')[0] for entry in headers['server-timing'].split(', ')]
+    for stage in ('history', 'indicators', 'news', 'info', 'scoring', 'json', 'total'):
+        assert stage in stages
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from backtest import aggregate, compute_signals, run_backtest, summarize
+from price_store import PriceStore
+from scoring import SIGNALS
+
+
+def _closes(make_bars, symbols, length=300):
+    return pd.DataFrame({
+        symbol: make_bars(length, seed=seed)['Close'] for seed, symbol in enumerate(symbols)
+    })
+
+
+def test_signals_do_not_look_ahead(make_bars):
+    close = _closes(make_bars, ['AAA', 'BBB', 'CCC']).to_numpy()
+    full = compute_signals(close)
+    truncated = compute_signals(close[:200])
+    assert np.array_equal(full[:200], truncated)
+    # Warmup rows have no signal
+    assert (full[:20] == -1).all()
+    assert (full[40:] >= 0).all()
+
+
+def test_chunked_aggregates_add_up(make_bars):
+    closes = _closes(make_bars, ['AAA', 'BBB', 'CCC', 'DDD'])
+    horizons = [1, 5]
+    whole = aggregate(closes, horizons)
+    parts = aggregate(closes[['AAA', 'BBB']], horizons).add(
+        aggregate(closes[['CCC', 'DDD']], horizons), fill_value=0
+    )
+    assert summarize(whole, horizons) == summarize(parts, horizons)
+
+
+def test_summary_matches_direct_computation(make_bars):
+    closes = _closes(make_bars, ['AAA', 'BBB'])
+    close = closes.to_numpy()
+    signals = compute_signals(close)
+    returns = np.full(close.shape, np.nan)
+    returns[:-5] = close[5:] / close[:-5] - 1
+
+    rows = {(row['horizon'], row['signal']): row for row in summarize(aggregate(closes, [1, 5]), [1, 5])}
+    for index, signal in enumerate(SIGNALS):
+        mask = (signals == index) & ~np.isnan(returns)
+        row = rows[(5, signal)]
+        assert row['observations'] == mask.sum()
+        if mask.any():
+            assert np.isclose(row['mean_return'], returns[mask].mean())
+        if signal in ('Buy', 'Strong Buy') and mask.any():
+            assert np.isclose(row['hit_rate'], (returns[mask] > 0).mean())
+    assert rows[(5, 'Hold')]['hit_rate'] is None
+    assert all(row['max_drawdown'] <= 0 for (horizon, _), row in rows.items() if horizon == 1)
+
+
+def test_run_backtest_from_price_store(tmp_path, make_bars):
+    store = PriceStore(str(tmp_path))
+    for seed, symbol in enumerate(['AAA', 'BBB', 'CCC']):
+        store.append(symbol, make_bars(300, seed=seed))
+
+    rows, covered = run_backtest(['AAA', 'BBB', 'CCC', 'MISSING'], horizons=[5], years=50, root=str(tmp_path))
+    assert sorted(covered) == ['AAA', 'BBB', 'CCC']
+    # The 1-day horizon is always included for the equity curve
+    assert {row['horizon'] for row in rows} == {1, 5}
+
+    expected = summarize(aggregate(_closes(make_bars, ['AAA', 'BBB', 'CCC']), [1, 5]), [1, 5])
+    assert [row['observations'] for row in rows] == [row['observations'] for row in expected]
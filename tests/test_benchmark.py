@@ -0,0 +1,54 @@
+import json
+
+import app
+from benchmark import BENCHMARKS, COMMITTED_FIXTURES_DIR, compare, replay, run_suite, synthesize
+from providers import ReplayProvider
+
+
+def test_committed_fixtures_match_synthesize(tmp_path):
+    symbols = synthesize(str(tmp_path), 20)
+    generated = ReplayProvider(str(tmp_path))
+    committed = ReplayProvider(COMMITTED_FIXTURES_DIR)
+    assert committed.symbols == symbols
+    assert (committed.metadata, committed.news) == (generated.metadata, generated.news)
+    for symbol in symbols:
+        assert committed.histories[symbol].equals(generated.histories[symbol])
+
+
+def test_replay_serves_fixtures():
+    provider = ReplayProvider(COMMITTED_FIXTURES_DIR)
+    symbols = provider.symbols
+
+    market_data = app.market_data
+    news_client = app.news_client
+    with replay(provider, symbols[:2]):
+        assert app.news_client.get_articles(symbols[0]) == provider.news[symbols[0]]
+        data = app.get_stock_data(symbols[0])
+        assert data['name'] == provider.metadata[symbols[0]]['name']
+        assert data['price'] == provider.histories[symbols[0]]['Close'].iloc[-1]
+        assert [stock['symbol'] for stock in app.STOCKS] == symbols[:2]
+    assert app.market_data is market_data
+    assert app.news_client is news_client
+
+
+def test_suite_results():
+    results = run_suite(ReplayProvider(COMMITTED_FIXTURES_DIR), sizes=[5, 100])
+    # 100 symbols is more than the fixtures hold, so that size is skipped
+    assert [row['benchmark'] for row in results] == list(BENCHMARKS)
+    by_name = {row['benchmark']: row for row in results}
+    assert by_name['get_stock_data']['calls'] == 5
+    assert by_name['POST /search_stocks']['calls'] == 1
+    assert by_name['POST /search_stocks']['symbols_per_sec'] > 0
+    assert all(row['p95_ms'] >= row['p50_ms'] > 0 for row in results)
+    json.dumps(results)
+
+
+def test_compare_flags_slowdowns():
+    baseline = [{'benchmark': 'get_stock_data', 'symbols': 10, 'mean_ms': 10.0},
+                {'benchmark': 'analyze_stocks', 'symbols': 10, 'mean_ms': 50.0}]
+    results = [{'benchmark': 'get_stock_data', 'symbols': 10, 'mean_ms': 11.0},
+               {'benchmark': 'analyze_stocks', 'symbols': 10, 'mean_ms': 80.0},
+               {'benchmark': 'analyze_stocks', 'symbols': 100, 'mean_ms': 500.0}]
+    regressions = compare(baseline, results, tolerance=0.2)
+    assert [(row['benchmark'], row['symbols']) for row in regressions] == [('analyze_stocks', 10)]
+    assert round(regressions[0]['change'], 2) == 0.6
@@ -0,0 +1,209 @@
+import threading
+import time
+from datetime import datetime
+
+import cache as cache_module
+from cache import (
+    TTLCache, RedisCache, SQLiteCache, is_market_open, make_cache, market_ttl, next_market_open,
+    MARKET_TZ, CACHE_TTL_MARKET, CACHE_TTL_CLOSED
+)
+
+
+def test_ttl_expiry_counts_miss():
+    cache = TTLCache(maxsize=4, ttl=0.05)
+    cache.set('AAPL', 1)
+    assert cache.get('AAPL') == 1
+    time.sleep(0.06)
+    assert cache.get('AAPL') is None
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_closed_ttl_counts_real_seconds_across_dst(monkeypatch):
+    monkeypatch.setattr(cache_module, 'CACHE_TTL_CLOSED', 10 ** 6)
+    # Clocks spring forward on Sunday 2024-03-10, so the weekend is an hour short
+    assert market_ttl(datetime(2024, 3, 9, 9, 30, tzinfo=MARKET_TZ)) == 47 * 3600
+
+
+def test_market_hours_ttl():
+    open_time = datetime(2024, 3, 5, 11, 0, tzinfo=MARKET_TZ)   # Tuesday
+    closed_time = datetime(2024, 3, 5, 18, 0, tzinfo=MARKET_TZ)
+    weekend = datetime(2024, 3, 9, 11, 0, tzinfo=MARKET_TZ)     # Saturday
+    assert is_market_open(open_time)
+    assert not is_market_open(closed_time)
+    assert not is_market_open(weekend)
+    assert market_ttl(open_time) == CACHE_TTL_MARKET
+    assert market_ttl(closed_time) == CACHE_TTL_CLOSED
+    # Shortly before the open, entries expire at the bell
+    assert market_ttl(datetime(2024, 3, 5, 9, 0, tzinfo=MARKET_TZ)) == min(CACHE_TTL_CLOSED, 1800)
+    assert market_ttl(datetime(2024, 3, 5, 9, 29, 50, tzinfo=MARKET_TZ)) == 10
+    # Friday after the close waits for Monday's open, capped as usual
+    assert market_ttl(datetime(2024, 3, 8, 16, 30, tzinfo=MARKET_TZ)) == CACHE_TTL_CLOSED
+    assert next_market_open(datetime(2024, 3, 8, 16, 30, tzinfo=MARKET_TZ)) == datetime(2024, 3, 11, 9, 30, tzinfo=MARKET_TZ)
+
+
+def _count_calls(cache, key, workers=8):
+    """Call get_or_set from several threads at once; returns how often compute ran"""
+    calls = []
+    barrier = threading.Barrier(workers)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'value'
+
+    def worker():
+        barrier.wait()
+        assert cache.get_or_set(key, compute) == 'value'
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(calls)
+
+
+def test_memory_single_flight():
+    cache = TTLCache(ttl=60)
+    assert _count_calls(cache, ('AAPL', '1d')) == 1
+    assert cache.get(('AAPL', '1d')) == 'value'
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    # Two instances stand in for two gunicorn workers
+    first = SQLiteCache('history', path, ttl=60)
+    second = SQLiteCache('history', path, ttl=60)
+    other = SQLiteCache('news', path, ttl=60)
+
+    first.set(('AAPL', '1d'), {'close': [1.0, 2.0]})
+    assert second.get(('AAPL', '1d')) == {'close': [1.0, 2.0]}
+    assert other.get(('AAPL', '1d')) is None
+
+    first.set('short', 1, ttl=0.05)
+    time.sleep(0.06)
+    assert second.get('short') is None
+
+    assert first.acquire('AAPL')
+    assert not second.acquire('AAPL')
+    first.release('AAPL')
+    assert second.acquire('AAPL')
+    second.release('AAPL')
+
+    second.clear()
+    assert len(first) == 0
+    assert first.stats()['backend'] == 'SQLiteCache'
+
+
+def test_sqlite_single_flight_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'value'
+
+    def worker():
+        cache = SQLiteCache('metadata', path, ttl=60)
+        assert cache.get_or_set('MSFT', compute) == 'value'
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+
+
+def test_sqlite_expired_lock_can_be_taken_over(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    crashed = SQLiteCache('history', path)
+    survivor = SQLiteCache('history', path)
+    assert crashed.acquire('AAPL', timeout=0.05)
+    time.sleep(0.06)
+    assert survivor.acquire('AAPL')
+
+
+def test_sqlite_cache_degrades_when_database_fails(tmp_path):
+    cache = SQLiteCache('history', str(tmp_path / 'cache.sqlite'), ttl=60)
+    cache.set('AAPL', 1)
+    cache._connection().close()
+    cache.set('MSFT', 2)
+    cache.delete('AAPL')
+    cache.clear()
+    assert cache.get('AAPL') is None
+    assert len(cache) == 0
+    assert cache.get_or_set('AAPL', lambda: 3) == 3
+    assert cache.stats()['errors'] >= 5
+    # Without the database, locks fall back to this process only
+    assert cache.acquire('MSFT')
+    assert not cache.acquire('MSFT')
+    cache.release('MSFT')
+    assert cache.acquire('MSFT')
+
+
+def test_redis_cache(redis_stub):
+    first = RedisCache('history', redis_stub.url, ttl=60)
+    second = RedisCache('history', redis_stub.url, ttl=60)
+
+    first.set(('AAPL', '1d'), [1, 2, 3])
+    assert second.get(('AAPL', '1d')) == [1, 2, 3]
+    assert b'history:AAPL|1d' in redis_stub.data
+
+    first.set('short', 1, ttl=0.05)
+    time.sleep(0.06)
+    assert second.get('short') is None
+
+    assert first.acquire('AAPL')
+    assert not second.acquire('AAPL')
+    second.release('AAPL')          # Not the owner, so the lock stays
+    assert not second.acquire('AAPL')
+    first.release('AAPL')
+    assert second.acquire('AAPL')
+    second.release('AAPL')
+    assert redis_stub.commands.count('EVAL') == 2
+
+    # A lock that expired and was taken over is left to its new owner
+    assert first.acquire('AAPL', timeout=0.05)
+    time.sleep(0.06)
+    assert second.acquire('AAPL')
+    first.release('AAPL')
+    assert not first.acquire('AAPL')
+    second.release('AAPL')
+
+    assert len(first) == 1
+    first.clear()
+    assert second.get(('AAPL', '1d')) is None
+    assert _count_calls(first, 'NVDA') == 1
+
+
+def test_redis_cache_degrades_when_server_is_down():
+    cache = RedisCache('history', 'redis://127.0.0.1:1/0', ttl=60, timeout=0.2)
+    cache.set('AAPL', 1)
+    assert cache.get('AAPL') is None
+    # Locks are granted so callers still compute
+    assert cache.acquire('AAPL')
+    assert cache.get_or_set('AAPL', lambda: 2) == 2
+    assert cache.stats()['errors'] > 0
+
+
+def test_make_cache_backends(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, 'CACHE_PATH', str(tmp_path / 'cache.sqlite'))
+    assert isinstance(make_cache('history'), TTLCache)
+    assert isinstance(make_cache('history', backend='sqlite'), SQLiteCache)
+    assert isinstance(make_cache('history', backend='redis'), RedisCache)
@@ -0,0 +1,53 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from concurrency import TokenBucket, fan_out
+
+
+def test_token_bucket_allows_burst_then_limits():
+    bucket = TokenBucket(rate=10, capacity=3)
+    assert all(bucket.try_acquire() for _ in range(3))
+    assert not bucket.try_acquire()
+    time.sleep(0.15)
+    assert bucket.try_acquire()
+
+
+def test_token_bucket_acquire_timeout():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.05)
+
+
+def test_fan_out_runs_concurrently():
+    start = time.monotonic()
+    results = fan_out(lambda x: (time.sleep(0.2), x * 2)[1], [1, 2, 3, 4])
+    assert results == {1: 2, 2: 4, 3: 6, 4: 8}
+    assert time.monotonic() - start < 0.6
+
+
+def test_fan_out_drops_slow_and_failing_items():
+    def work(x):
+        if x == 'slow':
+            time.sleep(1)
+        if x == 'bad':
+            raise ValueError('boom')
+        return x
+
+    start = time.monotonic()
+    results = fan_out(work, ['a', 'slow', 'bad', 'b'], timeout=0.2)
+    assert results == {'a': 'a', 'b': 'b'}
+    assert time.monotonic() - start < 0.8
+
+
+def test_fan_out_deadline_covers_queued_items():
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(release.wait, 2)
+
+    # Nothing ever starts, so only the overall deadline can end the call
+    start = time.monotonic()
+    assert fan_out(lambda x: x, ['a', 'b'], timeout=5, executor=executor, deadline=0.2) == {}
+    assert time.monotonic() - start < 0.6
+    release.set()
+    executor.shutdown()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import compute_indicators, panel_from_frames
+
+ta = pytest.importorskip('ta')
+
+
+def reference(data):
+    """Indicators computed one symbol at a time with the ta library"""
+    close = data['Close']
+    bollinger = ta.volatility.BollingerBands(close)
+    adx_series = ta.trend.ADXIndicator(data['High'], data['Low'], close).adx().dropna() \
+        if len(data) >= 28 else pd.Series(dtype=float)
+    adx = adx_series.iloc[-1] if not adx_series.empty else 50
+    macd = ta.trend.MACD(close).macd().iloc[-1]
+    return {
+        'rsi': ta.momentum.RSIIndicator(close).rsi().iloc[-1],
+        'macd': 0 if pd.isna(macd) else macd,
+        'upper_band': bollinger.bollinger_hband().iloc[-1],
+        'lower_band': bollinger.bollinger_lband().iloc[-1],
+        'adx': adx,
+        'obv': ta.volume.OnBalanceVolumeIndicator(close, data['Volume']).on_balance_volume().iloc[-1]
+    }
+
+
+@pytest.mark.parametrize('length', [20, 25, 28, 29, 42, 60])
+def test_matches_ta_for_single_symbol(length, make_bars):
+    data = make_bars(length, seed=length)
+    table = compute_indicators(panel_from_frames({'AAPL': data}))
+    expected = reference(data)
+    for name, value in expected.items():
+        assert table.loc['AAPL', name] == pytest.approx(value, rel=1e-9, abs=1e-9), name
+
+
+def test_panel_with_ragged_histories(make_bars):
+    frames = {'AAPL': make_bars(60, 1), 'MSFT': make_bars(60, 2), 'NEW': make_bars(35, 3), 'TINY': make_bars(10, 4)}
+    # Gaps inside a symbol's history are dropped like DataFrame.dropna()
+    frames['MSFT'].iloc[10, frames['MSFT'].columns.get_loc('Close')] = np.nan
+    table = compute_indicators(panel_from_frames(frames))
+
+    assert list(table.index) == ['AAPL', 'MSFT', 'NEW']
+    for symbol in table.index:
+        expected = reference(frames[symbol].dropna())
+        for name, value in expected.items():
+            assert table.loc[symbol, name] == pytest.approx(value, rel=1e-9, abs=1e-9), (symbol, name)
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import FIELDS
+from intraday import BarBuffer, IntradayStore, resample_arrays, to_frame
+from providers import DataProvider
+
+
+def minute_bars(count, seed=0, start='2024-03-01 09:30'):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.1, count))
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.05, count),
+        'High': close + 0.2,
+        'Low': close - 0.2,
+        'Close': close,
+        'Volume': rng.integers(100, 1000, count).astype(float)
+    }, index=pd.date_range(start, periods=count, freq='1min', tz='America/New_York', unit='ns'))
+
+
+class MinuteProvider(DataProvider):
+    """Serves the first `available` minute bars of each symbol, like a live feed"""
+
+    def __init__(self, count=400, delay=0):
+        self.bars = {}
+        self.count = count
+        self.available = count
+        self.delay = delay
+        self.calls = []
+
+    def get_history(self, symbols, start, end, interval='1d'):
+        self.calls.append((list(symbols), start, interval))
+        time.sleep(self.delay)
+        frames = {}
+        for symbol in symbols:
+            if symbol == 'NONE':
+                continue
+            bars = self.bars.setdefault(symbol, minute_bars(self.count, seed=len(self.bars)))
+            frames[symbol] = bars.iloc[:self.available]
+        return frames, {symbol: 'No price data found' for symbol in symbols if symbol not in frames}
+
+
+def test_ring_buffer_keeps_newest_bars():
+    bars = minute_bars(12)
+    buffer = BarBuffer(capacity=5)
+    nbytes = buffer.nbytes
+    assert buffer.append(bars.iloc[:3]) == 3
+    assert buffer.append(bars.iloc[:9]) == 6   # last bar replaced, 5 of 6 new ones fit
+    assert len(buffer) == 5
+    times, values = buffer.arrays()
+    pd.testing.assert_frame_equal(to_frame(times, values, buffer.tz), bars.iloc[4:9], check_freq=False)
+    assert buffer.last_time() == bars.index[8]
+    assert buffer.nbytes == nbytes
+
+    # The still-forming bar is updated in place
+    update = bars.iloc[8:9].copy()
+    update['Close'] = 1.0
+    assert buffer.append(update) == 1
+    assert buffer.arrays()[1][-1, FIELDS.index('Close')] == 1.0
+
+
+def test_resample_matches_pandas():
+    bars = minute_bars(200, seed=3)
+    bars = bars.drop(bars.index[[5, 6, 50, 51, 52, 120]])   # gaps in the feed
+    index = bars.index.tz_convert('UTC')
+    times, values = resample_arrays(index.asi8, bars[FIELDS].to_numpy(), 15)
+    expected = bars.resample('15min').agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    ).dropna()
+    pd.testing.assert_frame_equal(to_frame(times, values, bars.index.tz), expected, check_freq=False)
+
+
+def test_timeframes_come_from_one_download():
+    provider = MinuteProvider()
+    store = IntradayStore(provider, refresh_interval=60)
+    frames, errors = store.histories(['AAA', 'NONE'], '5m')
+    assert errors == {'NONE': 'No price data found'}
+    assert len(frames['AAA']) == 80
+    frames, _ = store.histories(['AAA'], '15m')
+    assert len(frames['AAA']) == 27
+    assert len(store.histories(['AAA'], '1m')[0]['AAA']) == 400
+    assert len(provider.calls) == 1
+    assert provider.calls[0][2] == '1m'
+
+
+def test_refresh_downloads_only_the_tail():
+    provider = MinuteProvider(count=600)
+    provider.available = 400
+    store = IntradayStore(provider, capacity=450, refresh_interval=0)
+    store.histories(['AAA'], '1m')
+    provider.available = 600
+    frames, _ = store.histories(['AAA'], '1m')
+    # The second download starts from the day of the newest buffered bar
+    assert provider.calls[1][1] == provider.bars['AAA'].index[399].date()
+    pd.testing.assert_frame_equal(frames['AAA'], provider.bars['AAA'].iloc[150:], check_freq=False)
+    assert store.stats()['bars'] == 450
+
+
+def test_concurrent_refreshes_share_one_download():
+    provider = MinuteProvider(delay=0.2)
+    store = IntradayStore(provider)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.histories(['AAA'], '5m'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(provider.calls) == 1
+    assert all(len(frames['AAA']) == 80 for frames, _ in results)
+
+
+def test_symbols_are_evicted_beyond_max_symbols():
+    store = IntradayStore(MinuteProvider(count=30), max_symbols=2)
+    store.histories(['A', 'B', 'C'], '1m')
+    assert store.stats()['symbols'] == 2
+    assert store.bars('A') is None
+    assert len(store.bars('C')) == 30
+
+
+def test_search_stock_intervals(offline_app, monkeypatch):
+    provider = MinuteProvider(count=800)
+    monkeypatch.setattr(offline_app, 'intraday_bars', IntradayStore(provider))
+    client = offline_app.app.test_client()
+
+    data = client.get('/search_stock/AAA?interval=15m').get_json()
+    assert data['symbol'] == 'AAA'
+    assert data['price'] == provider.bars['AAA']['Close'].iloc[-1]
+    results = client.post('/search_stocks', json={'symbols': ['AAA', 'BBB'], 'interval': '5m'}).get_json()
+    assert [row['symbol'] for row in results['results']] == ['AAA', 'BBB']
+    assert len(provider.calls) == 2
+
+    error = client.get('/search_stock/AAA?interval=3m').get_json()['error']
+    assert error.startswith('Interval must be one of 1d, 1m')
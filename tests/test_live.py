@@ -0,0 +1,95 @@
+import threading
+import time
+
+from live import QuoteBroadcaster, diff_quotes
+
+
+class FakeQuotes:
+    """fetch() stand-in that counts upstream polls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prices = {'AAPL': 100.0, 'MSFT': 200.0}
+        self.signals = {'AAPL': 'Buy', 'MSFT': 'Hold'}
+        self.lock = threading.Lock()
+
+    def __call__(self, symbols):
+        with self.lock:
+            self.calls += 1
+        return {
+            symbol: {'symbol': symbol, 'price': self.prices[symbol], 'signal': self.signals[symbol], 'rsi': 50.0}
+            for symbol in symbols
+        }
+
+
+def test_diff_quotes_only_changed_fields():
+    previous = {'AAPL': {'price': 1.0, 'rsi': 50.0, 'name': 'Apple'}}
+    current = {
+        'AAPL': {'price': 2.0, 'rsi': 50.0, 'name': 'Apple Inc.'},
+        'MSFT': {'price': 3.0, 'rsi': 40.0}
+    }
+    assert diff_quotes(previous, current) == {
+        'AAPL': {'price': 2.0},
+        'MSFT': {'price': 3.0, 'rsi': 40.0}
+    }
+    assert diff_quotes(current, current) == {}
+
+
+def test_subscribers_share_one_poll_and_get_increments():
+    fetch = FakeQuotes()
+    live = QuoteBroadcaster(fetch, ['AAPL', 'MSFT'], interval=60, heartbeat=0.05)
+    subscribers = [live.subscribe() for _ in range(5)]
+    for subscriber in subscribers:
+        event, payload = subscriber.get(timeout=2)
+        assert event == 'snapshot'
+        assert {quote['symbol'] for quote in payload['quotes']} == {'AAPL', 'MSFT'}
+    assert fetch.calls == 1
+
+    # A client that connects later gets the current quotes without a new poll
+    late = live.subscribe()
+    assert late.get(timeout=1)[0] == 'snapshot'
+    assert fetch.calls == 1
+
+    fetch.prices['AAPL'] = 101.0
+    fetch.signals['AAPL'] = 'Strong Buy'
+    live.poll()
+    for subscriber in subscribers + [late]:
+        event, payload = subscriber.get(timeout=1)
+        assert event == 'update'
+        assert payload['quotes'] == {'AAPL': {'price': 101.0, 'signal': 'Strong Buy'}}
+        assert payload['signal_changes'] == [{'symbol': 'AAPL', 'from': 'Buy', 'to': 'Strong Buy'}]
+
+    # Nothing changed, nothing sent
+    live.poll()
+    assert all(subscriber.empty() for subscriber in subscribers)
+
+
+def test_slow_subscriber_is_resynced():
+    fetch = FakeQuotes()
+    live = QuoteBroadcaster(fetch, ['AAPL'], interval=60, queue_size=2)
+    subscriber = live.subscribe()
+    for price in (101.0, 102.0, 103.0, 104.0):
+        fetch.prices['AAPL'] = price
+        live.poll()
+
+    event, payload = subscriber.get(timeout=1)
+    assert event == 'snapshot'
+    assert payload['quotes'][0]['price'] >= 103.0
+    assert live.stats()['resyncs'] >= 1
+
+
+def test_loop_stops_when_last_client_leaves():
+    fetch = FakeQuotes()
+    live = QuoteBroadcaster(fetch, ['AAPL'], interval=0.02, heartbeat=0.02)
+    stream = live.stream(live.subscribe())
+    assert next(stream)[0] == 'snapshot'
+    stream.close()
+    assert live.stats()['subscribers'] == 0
+
+    deadline = time.monotonic() + 2
+    while live._loop is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert live._loop is None
+    calls = fetch.calls
+    time.sleep(0.1)
+    assert fetch.calls == calls
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import metadata
+from metadata import MetadataStore, default_metadata
+
+
+def fields_for(symbol):
+    return {'name': f'{symbol} Inc.', 'sector': 'Technology', 'industry': 'Software',
+            'market_cap': 10**9, 'pe_ratio': 25.0}
+
+
+def test_lookup_does_not_block_and_fetches_in_background():
+    release = threading.Event()
+
+    def slow_fetch(symbol):
+        release.wait(2)
+        return fields_for(symbol)
+
+    store = MetadataStore(fetch=slow_fetch, path='')
+    start = time.monotonic()
+    assert store.lookup('AAPL') == default_metadata('AAPL')
+    assert time.monotonic() - start < 0.1
+
+    release.set()
+    assert store.lookup('AAPL', wait=2) == fields_for('AAPL')
+    assert store.get('AAPL') == fields_for('AAPL')
+
+
+def test_concurrent_lookups_share_one_fetch():
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        time.sleep(0.1)
+        return fields_for(symbol)
+
+    store = MetadataStore(fetch=fetch, path='')
+    store.prefetch(['MSFT', 'MSFT'])
+    assert store.lookup('MSFT', wait=2)['name'] == 'MSFT Inc.'
+    assert calls == ['MSFT']
+
+
+def test_persisted_across_restarts(tmp_path):
+    path = str(tmp_path / 'metadata.json')
+    store = MetadataStore(fetch=fields_for, path=path)
+    store.lookup('NVDA', wait=2)
+
+    def fail(symbol):
+        raise AssertionError('should be served from disk')
+
+    restored = MetadataStore(fetch=fail, path=path)
+    assert restored.get('NVDA') == fields_for('NVDA')
+
+
+def test_workers_merge_their_saves(tmp_path):
+    path = str(tmp_path / 'metadata.json')
+    # Two stores on one file stand in for two gunicorn workers
+    first = MetadataStore(fetch=fields_for, path=path)
+    second = MetadataStore(fetch=fields_for, path=path)
+    first.lookup('NVDA', wait=2)
+    second.lookup('AMD', wait=2)
+    first.lookup('MSFT', wait=2)
+    assert sorted(MetadataStore(fetch=fields_for, path=path)._entries) == ['AMD', 'MSFT', 'NVDA']
+
+
+def test_failed_fetch_falls_back_to_placeholders():
+    def fail(symbol):
+        raise ValueError('not found')
+
+    store = MetadataStore(fetch=fail, path='')
+    assert store.lookup('ZZZZ', wait=1) == default_metadata('ZZZZ')
+
+
+def test_prefetch_is_capped():
+    release = threading.Event()
+
+    def slow_fetch(symbol):
+        release.wait(2)
+        return fields_for(symbol)
+
+    store = MetadataStore(fetch=slow_fetch, path='', workers=1, max_pending=2)
+    store.prefetch(['A', 'B', 'C', 'D'])
+    assert sorted(store._inflight) == ['A', 'B']
+    # Past the cap, lookups return placeholders without queueing or waiting
+    start = time.monotonic()
+    assert store.lookup('C', wait=1) == default_metadata('C')
+    assert time.monotonic() - start < 0.1
+    release.set()
+    assert store.lookup('A', wait=2) == fields_for('A')
+
+
+def test_prefetch_is_saved_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata, 'METADATA_SAVE_INTERVAL', 3600)
+    release = threading.Event()
+
+    def fetch(symbol):
+        release.wait(2)
+        return fields_for(symbol)
+
+    store = MetadataStore(fetch=fetch, path=str(tmp_path / 'metadata.json'), workers=2)
+    saves = []
+    save = store._save
+    monkeypatch.setattr(store, '_save', lambda: saves.append(1) or save())
+    store.prefetch(['A', 'B', 'C', 'D'])
+    release.set()
+    store._executor.shutdown(wait=True)
+    assert saves == [1]
+    assert sorted(MetadataStore(fetch=fetch, path=store.path)._entries) == ['A', 'B', 'C', 'D']
+
+
+def test_known_only_for_fetched_fields():
+    def fetch(symbol):
+        if symbol == 'BAD':
+            raise ValueError('not found')
+        return fields_for(symbol)
+
+    store = MetadataStore(fetch=fetch, path='')
+    assert not store.known('AAPL')
+    store.lookup('AAPL', wait=2)
+    store.lookup('BAD', wait=2)
+    assert store.known('AAPL')
+    # A failed fetch caches placeholders, which filters cannot use
+    assert not store.known('BAD')
@@ -0,0 +1,72 @@
+import time
+
+import yfinance as yf
+
+import metrics
+from concurrency import fan_out
+from metrics import Histogram, span
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('demo_seconds', 'Demo', 'stage', buckets=(0.1, 1))
+    histogram.observe(0.05, 'fetch')
+    histogram.observe(0.5, 'fetch')
+    histogram.observe(5, 'fetch')
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="fetch"} 3' in lines
+    assert 'demo_seconds_sum{stage="fetch"} 5.55' in lines
+
+
+def test_spans_follow_the_request_into_worker_threads():
+    token = metrics.start_trace()
+    try:
+        def work(symbol):
+            with span('news', symbol):
+                time.sleep(0.01)
+        fan_out(work, ['AAA', 'BBB'])
+        trace = metrics.current_trace()
+    finally:
+        metrics.end_trace(token)
+
+    assert sorted(symbol for _, symbol, _ in trace.spans) == ['AAA', 'BBB']
+    assert trace.totals()['news'] >= 0.02
+    assert trace.server_timing().startswith('news;dur=')
+    assert metrics.current_trace() is None
+
+
+def test_server_timing_header(offline_app, monkeypatch):
+    client = offline_app.app.test_client()
+    assert 'Server-Timing' not in client.get('/search_stock/AAA').headers
+
+    monkeypatch.setattr(metrics, 'SERVER_TIMING', True)
+    response = client.get('/search_stock/BBB')
+    stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+    assert stages[-1] == 'total'
+    for stage in ('history', 'indicators', 'news', 'sentiment', 'info', 'scoring', 'json'):
+        assert stage in stages
+
+
+def test_metrics_endpoint(offline_app, monkeypatch):
+    client = offline_app.app.test_client()
+    client.post('/search_stocks', json={'symbols': ['AAA', 'BBB']})
+    client.post('/search_stocks', json={'symbols': ['AAA', 'BBB']})
+
+    def failing_download(tickers, **kwargs):
+        raise ConnectionError('unreachable')
+    monkeypatch.setattr(yf, 'download', failing_download)
+    errors_before = metrics.upstream_errors.snapshot().get('yfinance_history', 0)
+    client.get('/search_stock/CCC')
+
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE stock_stage_seconds histogram' in text
+    assert 'stock_stage_seconds_count{stage="history"}' in text
+    assert 'http_request_seconds_count{endpoint="search_stocks"}' in text
+    assert f'upstream_errors_total{{upstream="yfinance_history"}} {errors_before + 1}' in text
+    # The second search was served from the stock data cache; CCC missed
+    assert 'cache_hits_total{cache="stock_data"} 2' in text
+    assert 'cache_hit_ratio{cache="stock_data"} 0.4' in text
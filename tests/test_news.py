@@ -0,0 +1,83 @@
+import threading
+
+import cache
+from news import NewsClient, make_session
+
+
+def make_client(news_stub, **kwargs):
+    kwargs.setdefault('session', make_session(backoff_factor=0))
+    return NewsClient(url=news_stub.url, api_key='test-key', **kwargs)
+
+
+def test_fetches_and_caches_articles(news_stub):
+    client = make_client(news_stub)
+    assert len(client.get_articles('AAPL')) == 2
+    assert len(client.get_articles('AAPL')) == 2
+    assert len(news_stub.requests) == 1
+    assert news_stub.requests[0]['q'] == ['AAPL stock']
+
+
+def test_concurrent_requests_are_coalesced(news_stub):
+    news_stub.delay = 0.2
+    client = make_client(news_stub)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get_articles('MSFT'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8
+    assert all(len(articles) == 2 for articles in results)
+    assert len(news_stub.requests) == 1
+
+
+def test_retries_server_errors(news_stub):
+    news_stub.statuses = [503, 500]
+    client = make_client(news_stub)
+    assert len(client.get_articles('NVDA')) == 2
+    assert len(news_stub.requests) == 3
+
+
+def test_timeout_returns_none(news_stub):
+    news_stub.delay = 0.5
+    client = make_client(news_stub, session=make_session(retries=0), timeout=(1, 0.1))
+    assert client.get_articles('TSLA') is None
+    assert client.stats()['upstream_errors'] == 1
+
+
+def test_daily_quota_serves_stale_articles(news_stub):
+    client = make_client(news_stub, cache_ttl=0, daily_quota=1)
+    assert len(client.get_articles('AAPL')) == 2
+    assert len(client.get_articles('AAPL')) == 2
+    assert client.get_articles('MSFT') is None
+    assert len(news_stub.requests) == 1
+
+
+def test_daily_quota_is_shared_between_workers(news_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_BACKEND', 'sqlite')
+    monkeypatch.setattr(cache, 'CACHE_PATH', str(tmp_path / 'cache.sqlite'))
+    first = make_client(news_stub, cache_ttl=0, daily_quota=2)
+    second = make_client(news_stub, cache_ttl=0, daily_quota=2)
+    assert first.get_articles('AAPL') is not None
+    assert second.get_articles('MSFT') is not None
+    assert first.get_articles('NVDA') is None
+    assert second.get_articles('TSLA') is None
+    assert len(news_stub.requests) == 2
+    assert second.stats()['quota_used'] == 2
+
+
+def test_no_api_key(news_stub, monkeypatch):
+    monkeypatch.delenv('NEWS_API_KEY', raising=False)
+    client = NewsClient(url=news_stub.url)
+    assert client.get_articles('AAPL') is None
+    assert not news_stub.requests
+
+
+def test_news_failure_scores_symbol_neutral(offline_app, monkeypatch):
+    def fail(symbol):
+        raise ConnectionError('news down')
+    monkeypatch.setattr(offline_app.news_client, 'get_articles', fail)
+
+    results, errors = offline_app.get_stocks_data(['AAA', 'BBB'])
+    assert errors == {}
+    assert [results[symbol]['sentiment'] for symbol in ('AAA', 'BBB')] == [0.5, 0.5]
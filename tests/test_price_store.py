@@ -0,0 +1,66 @@
+import os
+
+import pandas as pd
+
+from price_store import PriceStore, BAR_DTYPE
+
+
+def test_append_and_range_read(tmp_path, make_bars):
+    store = PriceStore(str(tmp_path))
+    bars = make_bars(30, seed=1)
+    assert store.append('AAPL', bars.iloc[:20]) == 20
+    # Overlapping tail: only bars from the newest stored one onwards are written
+    assert store.append('AAPL', bars.iloc[15:]) == 11
+
+    stored = store.read('AAPL')
+    assert len(stored) == 30
+    assert stored['Close'].tolist() == bars['Close'].tolist()
+
+    window = store.read('AAPL', start=bars.index[10], end=bars.index[20])
+    assert window.index[0] == pd.Timestamp(bars.index[10], tz='UTC')
+    assert len(window) == 10
+
+
+def test_latest_copy_of_a_bar_wins(tmp_path, make_bars):
+    store = PriceStore(str(tmp_path))
+    bars = make_bars(25, seed=2)
+    store.append('MSFT', bars)
+    size = os.path.getsize(store.path('MSFT'))
+    updated = bars.iloc[-1:].copy()
+    for close in (998.0, 999.0):
+        updated['Close'] = close
+        assert store.append('MSFT', updated) == 1
+
+    # Refreshing the forming bar rewrites the last record instead of growing the file
+    assert os.path.getsize(store.path('MSFT')) == size
+    assert store.read('MSFT')['Close'].iloc[-1] == 999.0
+    assert store.compact('MSFT') == 0
+    assert len(store.read('MSFT')) == 25
+
+
+def test_backfill_out_of_order(tmp_path, make_bars):
+    store = PriceStore(str(tmp_path))
+    bars = make_bars(40, seed=3)
+    store.append('NVDA', bars.iloc[30:])
+    store.append('NVDA', bars.iloc[:35], only_new=False)
+    # Before compaction the file is out of order and holds duplicates
+    window = store.read('NVDA', start=bars.index[28], end=bars.index[36])
+    assert window['Close'].tolist() == bars['Close'].iloc[28:36].tolist()
+    assert store.compact('NVDA') == 5
+
+    stored = store.read('NVDA')
+    assert stored['Close'].tolist() == bars['Close'].tolist()
+    assert store.symbols() == ['NVDA']
+
+
+def test_partial_trailing_record_is_ignored(tmp_path, make_bars):
+    store = PriceStore(str(tmp_path))
+    bars = make_bars(20, seed=4)
+    store.append('TSLA', bars)
+    with open(store.path('TSLA'), 'ab') as f:
+        f.write(b'\0' * (BAR_DTYPE.itemsize // 2))
+    assert len(store.read('TSLA')) == 20
+    # The next append drops the partial record instead of writing misaligned
+    store.append('TSLA', bars.iloc[-1:].set_axis(bars.index[-1:] + pd.Timedelta(days=1)))
+    assert store.read('TSLA')['Close'].tolist() == bars['Close'].tolist() + [bars['Close'].iloc[-1]]
+    assert store.read('MISSING').empty
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from metadata import MetadataStore
+from news import NewsClient
+from providers import (
+    NewsAPIProvider, ReplayProvider, YFinanceProvider, make_provider, make_session, save_fixtures
+)
+
+
+def test_yfinance_history_is_batched(monkeypatch, make_bars):
+    calls = []
+
+    def download(tickers, **kwargs):
+        calls.append(list(tickers))
+        frames = {ticker: make_bars(40, seed=i) for i, ticker in enumerate(tickers) if ticker != 'LOST'}
+        if 'GONE' in frames:
+            # Failed tickers come back as all-NaN columns
+            frames['GONE'] = frames['GONE'] * np.nan
+        return pd.concat(frames, axis=1)
+
+    monkeypatch.setattr(yf, 'download', download)
+    frames, errors = YFinanceProvider(batch_size=2).get_history(['A', 'B', 'C', 'GONE', 'E', 'LOST'], None, None)
+    assert calls == [['A', 'B'], ['C', 'GONE'], ['E', 'LOST']]
+    assert sorted(frames) == ['A', 'B', 'C', 'E']
+    assert errors == {'GONE': 'No price data found', 'LOST': 'Missing from download'}
+
+
+def test_yfinance_metadata(monkeypatch):
+    def ticker(symbol):
+        if symbol == 'BAD':
+            raise ValueError('no such ticker')
+        return SimpleNamespace(info={'longName': f'{symbol} Inc.', 'sector': 'Technology', 'marketCap': 10 ** 9})
+
+    monkeypatch.setattr(yf, 'Ticker', ticker)
+    fields, errors = YFinanceProvider().get_metadata(['AAPL', 'BAD'])
+    assert fields == {'AAPL': {'name': 'AAPL Inc.', 'sector': 'Technology', 'industry': 'Unknown',
+                               'market_cap': 10 ** 9, 'pe_ratio': 0.0}}
+    assert errors == {'BAD': 'no such ticker'}
+
+
+def test_newsapi_provider(news_stub):
+    provider = NewsAPIProvider(url=news_stub.url, api_key='test-key', session=make_session(retries=0))
+    news_stub.statuses = [200, 401]
+    articles, errors = provider.get_news(['AAPL', 'MSFT'])
+    assert articles == {'AAPL': news_stub.articles}
+    assert errors == {'MSFT': 'NewsAPI returned 401'}
+    assert [request['q'] for request in news_stub.requests] == [['AAPL stock'], ['MSFT stock']]
+
+
+def test_replay_provider_round_trip(tmp_path, make_bars):
+    bars = make_bars(30, seed=1)
+    fields = {'name': 'Acme', 'sector': 'Industrials', 'industry': 'Tools', 'market_cap': 5, 'pe_ratio': 9.5}
+    articles = [{'title': 'Acme', 'description': 'Acme beat estimates.'}]
+    save_fixtures(str(tmp_path), {'ACME': bars}, {'ACME': fields}, {'ACME': articles})
+
+    provider = ReplayProvider(str(tmp_path))
+    frames, errors = provider.get_history(['ACME', 'NONE'], None, None)
+    # The recording is moved forward by whole weeks to end within the last week
+    shift = frames['ACME'].index - bars.index
+    assert shift.nunique() == 1 and shift[0] % pd.Timedelta(weeks=1) == pd.Timedelta(0)
+    assert pd.Timestamp.now() - pd.Timedelta(weeks=1) < frames['ACME'].index[-1] <= pd.Timestamp.now()
+    pd.testing.assert_frame_equal(frames['ACME'].set_axis(bars.index), bars, check_freq=False, check_names=False)
+    assert errors == {'NONE': 'No recorded history'}
+    assert provider.get_metadata(['ACME']) == ({'ACME': fields}, {})
+    assert provider.get_news(['ACME', 'NONE']) == ({'ACME': articles, 'NONE': []}, {})
+
+    # The app's stores take any provider in place of the live upstreams
+    assert MetadataStore(provider=provider, path=None).lookup('ACME', wait=2) == fields
+    assert NewsClient(provider=provider).get_articles('ACME') == articles
+
+
+def test_replay_provider_intervals_and_ranges(tmp_path, make_bars):
+    daily = make_bars(30, seed=1)
+    minutes = make_bars(30, seed=2).set_axis(pd.date_range('2024-03-01 14:30', periods=30, freq='5min', tz='UTC'))
+    save_fixtures(str(tmp_path), {'ACME': minutes}, {}, {}, interval='5m')
+    save_fixtures(str(tmp_path), {'ACME': daily}, {}, {})
+    provider = ReplayProvider(str(tmp_path))
+
+    assert provider.get_history(['ACME'], None, None, '1m') == ({}, {'ACME': 'No recorded history for 1m'})
+    recorded = provider.get_history(['ACME'], None, None, '5m')[0]['ACME']
+    assert np.allclose(recorded['Close'], minutes['Close'])
+    assert str(recorded.index.tz) == 'UTC'
+
+    index = provider.histories['ACME'].index
+    frames, errors = provider.get_history(['ACME'], index[5].to_pydatetime(), index[10].date())
+    assert list(frames['ACME'].index) == list(index[5:10])
+    frames, errors = provider.get_history(['ACME'], index[-1] + pd.Timedelta(days=1), None)
+    assert errors == {'ACME': 'No recorded history in the requested range'}
+
+    tail = recorded.index[-3]
+    frames, _ = provider.get_history(['ACME'], tail.tz_localize(None), None, '5m')
+    assert len(frames['ACME']) == 3
+
+
+def test_unknown_provider_falls_back(capsys):
+    assert isinstance(make_provider('nope', 'yfinance'), YFinanceProvider)
+    assert 'Unknown data provider nope' in capsys.readouterr().out
@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import pytest
+
+import quotes
+from quotes import QuoteTable, dumps
+from scoring import SIGNALS, score_features
+
+
+def stock_rows(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {'symbol': f'S{i}', 'name': f'Company "{i}" Société', 'price': float(price), 'change': float(change),
+         'volume': int(volume), 'sector': 'Technology', 'industry': 'Software', 'market_cap': 10 ** 12 + i,
+         'pe_ratio': float(pe), 'rsi': float(rsi), 'macd': float(macd), 'adx': float(adx), 'sentiment': 0.5}
+        for i, (price, change, volume, pe, rsi, macd, adx) in enumerate(zip(
+            rng.uniform(1, 500, count), rng.normal(0, 2, count), rng.integers(0, 10 ** 8, count),
+            rng.uniform(0, 60, count), rng.uniform(10, 90, count), rng.normal(0, 2, count),
+            rng.uniform(5, 60, count)))
+    ]
+
+
+def test_scores_match_score_features():
+    rows = stock_rows(200)
+    table = QuoteTable.from_records(rows).score()
+    scores, signals = score_features(*([row[name] for row in rows] for name in ('rsi', 'macd', 'sentiment', 'change')))
+    records = table.records()
+    assert [(row['score'], row['signal']) for row in records] == list(zip(scores.tolist(), SIGNALS[signals].tolist()))
+    assert records[0]['explanations'] == quotes.get_indicator_explanations(rows[0]['rsi'], rows[0]['macd'], rows[0]['adx'])
+
+
+def test_json_is_encoded_from_columns():
+    rows = stock_rows(50)
+    rows[3]['adx'] = float('nan')
+    table = QuoteTable.from_records(rows).score()
+    # Missing numbers (here adx and as_of) are null
+    expected = json.loads(json.dumps(table.records()).replace('NaN', 'null'))
+    assert expected[3]['adx'] is None
+    assert json.loads(table.to_json()) == expected
+    assert json.loads(QuoteTable.from_records([]).to_json()) == []
+
+    payload = json.loads(dumps({'results': table.top(3), 'errors': {'BAD': 'Invalid stock symbol'}}))
+    assert [row['symbol'] for row in payload['results']] == [row['symbol'] for row in table.top(3).records()]
+    assert payload['errors'] == {'BAD': 'Invalid stock symbol'}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_dumps_writes_nan_as_null(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(quotes, 'orjson', None)
+    rows = stock_rows(5)
+    rows[1]['rsi'] = float('nan')
+    table = QuoteTable.from_records(rows).score()
+
+    # Strict parsing fails on the NaN token json.dumps() would write
+    strict = {'parse_constant': lambda token: pytest.fail(f'invalid JSON token {token}')}
+    assert json.loads(dumps(table), **strict)[1]['rsi'] is None
+    assert json.loads(dumps({'results': table, 'count': 5}), **strict)['results'][1]['rsi'] is None
+    assert json.loads(dumps([{'rsi': float('nan'), 'macd': float('inf')}]), **strict) == [{'rsi': None, 'macd': None}]
+
+
+def test_table_encoding_does_not_depend_on_orjson(monkeypatch):
+    table = QuoteTable.from_records(stock_rows(20)).score()
+    payload = {'results': table.top(5), 'errors': {}}
+    with_orjson = dumps(payload)
+    monkeypatch.setattr(quotes, 'orjson', None)
+    assert dumps(payload) == with_orjson
+
+
+def test_explanations_only_for_rendered_rows(monkeypatch):
+    calls = []
+    explain = quotes.get_indicator_explanations
+    monkeypatch.setattr(quotes, 'get_indicator_explanations', lambda *args: calls.append(args) or explain(*args))
+
+    table = QuoteTable.from_records(stock_rows(1000)).score()
+    top = table.top(5)
+    assert not calls
+    top.to_json()
+    assert len(calls) == 5
+    scores = table.columns['score']
+    assert top.columns['score'].tolist() == sorted(scores.tolist(), reverse=True)[:5]
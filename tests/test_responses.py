@@ -0,0 +1,108 @@
+import gzip
+import json
+import zlib
+from email.utils import parsedate_to_datetime
+
+import pandas as pd
+import pytest
+
+import app as flask_app
+import quotes
+from cache import market_ttl
+from responses import choose_encoding, etag, negotiate, not_modified_since
+from snapshot import PredictionSnapshot
+
+
+def test_negotiate_etag_and_compression():
+    body = json.dumps([{'symbol': f'S{i}', 'score': 0.5} for i in range(100)]).encode()
+    tag = etag(body)
+
+    status, sent, headers = negotiate(body, {})
+    assert (status, sent, headers['ETag']) == (200, body, tag)
+
+    status, sent, headers = negotiate(body, {'accept-encoding': 'gzip, deflate'})
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['ETag'] == tag[:-1] + '-gzip"'
+    assert gzip.decompress(sent) == body
+
+    # A tag for either representation means the client is up to date
+    for if_none_match in (tag, headers['ETag'], 'W/' + tag, '"other", ' + tag):
+        status, sent, _ = negotiate(body, {'if-none-match': if_none_match})
+        assert (status, sent) == (304, b'')
+    assert negotiate(body, {'if-none-match': '"other"'})[0] == 200
+
+    # Small bodies are not worth compressing
+    assert 'Content-Encoding' not in negotiate(b'[]', {'accept-encoding': 'gzip'})[2]
+
+
+def test_choose_encoding():
+    assert choose_encoding('gzip;q=0, identity') is None
+    assert choose_encoding('deflate, gzip;q=0.5') == 'gzip'
+    assert choose_encoding('*') == 'gzip'
+    assert choose_encoding(None) is None
+
+
+def test_predictions_are_encoded_once_per_snapshot(offline_app, monkeypatch):
+    rows = [{'symbol': f'S{i}', 'name': 'Company ' * 20} for i in range(20)]
+    monkeypatch.setattr(flask_app, 'predictions_snapshot', PredictionSnapshot(lambda: rows, path=None))
+    flask_app.predictions_snapshot.refresh()
+    encodes = []
+    dumps = quotes.dumps
+    monkeypatch.setattr(flask_app, 'dumps', lambda payload: encodes.append(1) or dumps(payload))
+    client = flask_app.app.test_client()
+
+    first = client.get('/get_predictions', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(first.data)) == rows
+
+    again = client.get('/get_predictions', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert client.get('/get_predictions').get_json() == rows
+    assert len(encodes) == 1
+
+
+def test_search_stock_caching_headers(offline_app, monkeypatch):
+    client = offline_app.app.test_client()
+    first = client.get('/search_stock/AAA')
+    assert 0 < int(first.headers['Cache-Control'].split('max-age=')[1]) <= market_ttl()
+    assert parsedate_to_datetime(first.headers['Last-Modified']).timestamp() == int(first.get_json()['as_of'])
+
+    # Conditional and repeat requests are answered without touching the pipeline
+    monkeypatch.setattr(flask_app, 'get_stock_data', lambda *args: pytest.fail('recomputed'))
+    assert client.get('/search_stock/AAA', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert client.get('/search_stock/aaa', headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+    assert client.get('/search_stock/AAA').data == first.data
+
+
+def test_predictions_caching_headers(offline_app, monkeypatch):
+    rows = [{'symbol': 'AAA', 'as_of': 1709251200.0}, {'symbol': 'BBB', 'as_of': 1709337600.0}]
+    monkeypatch.setattr(flask_app, 'predictions_snapshot', PredictionSnapshot(lambda: rows, interval=300, path=None))
+    flask_app.predictions_snapshot.refresh()
+    response = flask_app.app.test_client().get('/get_predictions')
+    assert response.headers['Cache-Control'] == 'public, max-age=300'
+    assert response.headers['Last-Modified'] == 'Sat, 02 Mar 2024 00:00:00 GMT'
+
+
+def test_bar_time(make_bars):
+    bars = make_bars(30, seed=0)
+    end = (bars.index[-1] + pd.Timedelta(days=1)).timestamp()
+    assert flask_app.bar_time(bars, end + 3600) == end
+    # A bar still forming covers up to now
+    assert flask_app.bar_time(bars, end - 3600) == end - 3600
+
+
+def test_not_modified_since():
+    assert not_modified_since('Sat, 02 Mar 2024 00:00:00 GMT', 'Sat, 02 Mar 2024 00:00:00 GMT')
+    assert not not_modified_since('Sat, 02 Mar 2024 00:00:01 GMT', 'Sat, 02 Mar 2024 00:00:00 GMT')
+    assert not not_modified_since('Sat, 02 Mar 2024 00:00:00 GMT', 'yesterday')
+
+
+def test_screener_stream_is_compressed(offline_app):
+    client = offline_app.app.test_client()
+    response = client.get('/screener?symbols=AAA,BBB,CCC', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    lines = [json.loads(line) for line in decompressor.decompress(response.data).decode().splitlines()]
+    assert [line['type'] for line in lines] == ['row', 'row', 'row', 'top']
+
@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+import pytest
+
+from scoring import DEFAULT_SCORING, load_scoring_config, SIGNALS, score_features, top_k
+
+
+def reference_score(data):
+    """The per-dict scoring previously inlined in analyze_stocks()"""
+    technical_score = 0
+    if data['rsi'] < 30:
+        technical_score += 1
+    elif data['rsi'] > 70:
+        technical_score -= 1
+    technical_score += 1 if data['macd'] > 0 else -1
+    sentiment_score = (data['sentiment'] + 1) / 2
+    momentum_score = 1 if data['change'] > 0 else 0
+    final_score = technical_score * 0.4 + sentiment_score * 0.3 + momentum_score * 0.3
+    if final_score > 0.6:
+        signal = 'Strong Buy'
+    elif final_score > 0.4:
+        signal = 'Buy'
+    elif final_score < 0.4:
+        signal = 'Sell'
+    else:
+        signal = 'Hold'
+    return final_score, signal
+
+
+def test_matches_reference_scoring():
+    rng = np.random.default_rng(0)
+    records = [
+        {'rsi': rsi, 'macd': macd, 'sentiment': sentiment, 'change': change}
+        for rsi, macd, sentiment, change in zip(
+            rng.uniform(10, 90, 500), rng.normal(0, 2, 500),
+            rng.uniform(-1, 1, 500), rng.normal(0, 2, 500))
+    ]
+    # Boundary cases, including a score of exactly 0.4 ("Hold")
+    records += [
+        {'rsi': 30, 'macd': 0, 'sentiment': 0.5, 'change': 0},
+        {'rsi': 70, 'macd': 1, 'sentiment': -1 / 3, 'change': 0},
+        {'rsi': 50, 'macd': 1, 'sentiment': 0.5, 'change': 1},
+        {'rsi': 50, 'macd': 1, 'sentiment': -1, 'change': 0},
+    ]
+    scores, signals = score_features(*([record[name] for record in records] for name in ('rsi', 'macd', 'sentiment', 'change')))
+    assert list(zip(scores.tolist(), SIGNALS[signals].tolist())) == [reference_score(record) for record in records]
+    assert SIGNALS[signals[-1]] == 'Hold'
+
+
+def test_configurable_weights():
+    scores, signals = score_features([20], [1], [0], [1], dict(DEFAULT_SCORING, technical_weight=0.1))
+    assert scores[0] == pytest.approx(0.2 + 0.15 + 0.3)
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(1)
+    scores = rng.permutation(1000) / 10
+    expected = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    assert list(top_k(scores, 5)) == expected[:5]
+    assert list(top_k([], 5)) == []
+
+
+def test_top_k_with_ties_at_the_boundary():
+    scores = [0.1, 0.5, 0.5, 0.2, 0.5, 0.5, 0.5, 0.5, 0.9, 0.5]
+    assert list(top_k(scores, 5)) == [8, 1, 2, 4, 5]
+    assert list(top_k(scores, 2)) == [8, 1]
+    assert list(top_k([0.3, np.nan, 0.7, np.nan], 3)) == [2, 0, 1]
+
+
+def test_top_k_with_ties_is_stable_when_k_covers_all():
+    scores = [0.5, 0.9, 0.5, 0.9, 0.1]
+    assert list(top_k(scores, 10)) == [1, 3, 0, 2, 4]
+    assert sorted(scores[i] for i in top_k(scores, 3)) == [0.5, 0.9, 0.9]
+
+
+def test_load_config_from_sweep_output(tmp_path):
+    path = tmp_path / 'scoring.json'
+    path.write_text(json.dumps({'config': {'technical_weight': 0.5, 'buy': 0.3}, 'hit_rate': 0.6}))
+    config = load_scoring_config(str(path))
+    assert config['technical_weight'] == 0.5
+    assert config['buy'] == 0.3
+    assert config['sentiment_weight'] == DEFAULT_SCORING['sentiment_weight']
@@ -0,0 +1,147 @@
+import json
+import random
+import threading
+
+import pytest
+
+import quotes
+from screener import TopK, format_ndjson, format_sse, load_universe, matches, normalize_symbols, parse_filters, screen
+
+
+def fake_row(symbol, rsi=50.0, macd=1.0, sentiment=0.0, change=1.0, sector='Technology', market_cap=10**10):
+    return {'symbol': symbol, 'rsi': rsi, 'macd': macd, 'sentiment': sentiment, 'change': change,
+            'sector': sector, 'market_cap': market_cap}
+
+
+def test_top_k_keeps_best_rows():
+    top = TopK(3)
+    rows = [{'symbol': str(i), 'score': score} for i, score in enumerate(random.Random(0).sample(range(100), 50))]
+    for row in rows:
+        top.push(row)
+    assert [row['score'] for row in top.results()] == sorted((r['score'] for r in rows), reverse=True)[:3]
+
+
+def test_filters():
+    filters = parse_filters({'sector': 'technology', 'min_market_cap': '1e9', 'rsi_min': '40', 'rsi_max': '60'})
+    assert matches(fake_row('A'), filters)
+    assert not matches(fake_row('B', sector='Energy'), filters)
+    assert not matches(fake_row('C', market_cap=10**8), filters)
+    assert not matches(fake_row('D', rsi=65), filters)
+
+
+def test_normalize_and_universe():
+    assert normalize_symbols([' aapl', 'AAPL', 'brk-b', 'bad symbol', '']) == ['AAPL', 'BRK-B']
+    assert 'AAPL' in load_universe('dow30')
+    assert load_universe('../etc/passwd') is None
+
+
+def test_screen_streams_rows_errors_and_top():
+    def fetch(chunk):
+        results = {s: fake_row(s, rsi=20 if s == 'S3' else 50) for s in chunk if s != 'BAD'}
+        return results, ({'BAD': 'No price data found'} if 'BAD' in chunk else {})
+
+    symbols = [f'S{i}' for i in range(10)] + ['BAD']
+    events = list(screen(symbols, fetch, k=2, chunk_size=3))
+
+    rows = [payload for event, payload in events if event == 'row']
+    errors = [payload for event, payload in events if event == 'error']
+    event, summary = events[-1]
+    assert len(rows) == 10
+    assert errors == [{'symbol': 'BAD', 'error': 'No price data found'}]
+    assert event == 'top'
+    assert summary['scanned'] == 11
+    assert summary['results'][0]['symbol'] == 'S3'
+    assert len(summary['results']) == 2
+
+
+def test_closing_screen_stops_the_scan():
+    release = threading.Event()
+    started = []
+    finished = []
+
+    def fetch(chunk):
+        started.append(chunk)
+        # Every chunk but the first blocks until the test releases it
+        if chunk != ['S0', 'S1']:
+            release.wait(5)
+        finished.append(chunk)
+        return {s: fake_row(s) for s in chunk}, {}
+
+    symbols = [f'S{i}' for i in range(100)]
+    events = screen(symbols, fetch, chunk_size=2, concurrency=2)
+    assert next(events)[0] == 'row'
+    events.close()
+    # close() returned without waiting for the blocked chunk in flight
+    assert finished == [['S0', 'S1']]
+    release.set()
+    # Two chunks were submitted up front and one more when the first finished,
+    # not all 50
+    assert len(started) <= 3
+
+
+
+def test_screener_rejects_bad_k(offline_app):
+    client = offline_app.app.test_client()
+    for k in ('0', '-3', '2.5', 'ten'):
+        response = client.get(f'/screener?symbols=AAA&k={k}')
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'k must be a whole number of at least 1'}
+    assert client.post('/screener', json={'symbols': ['AAA'], 'k': 0}).status_code == 400
+    assert client.get('/screener?symbols=AAA&k=1').status_code == 200
+
+
+def test_screener_symbols_like_search_stocks(offline_app):
+    client = offline_app.app.test_client()
+    for body in ({'symbols': 'AAA,bbb'}, {'symbols': ['AAA', 'bbb', {'x': 1}, []]}):
+        lines = client.post('/screener', json=body).get_data(as_text=True).splitlines()
+        top = json.loads(lines[-1])
+        assert top['type'] == 'top'
+        assert sorted(row['symbol'] for row in top['results']) == ['AAA', 'BBB']
+
+
+def test_screener_input_errors_are_400s(offline_app):
+    client = offline_app.app.test_client()
+    for response in (client.post('/screener', json=['AAA']),
+                     client.post('/screener', json={'symbols': 5}),
+                     client.get('/screener?universe=nope'),
+                     client.get('/screener?symbols=AAA&rsi_min=low')):
+        assert response.status_code == 400
+        assert set(response.get_json()) == {'error'}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_events_are_valid_json_with_nan(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(quotes, 'orjson', None)
+    row = {'symbol': 'AAA', 'change': float('nan'), 'price': float('inf')}
+    strict = {'parse_constant': lambda token: pytest.fail(f'invalid JSON token {token}')}
+    assert json.loads(format_ndjson('row', row), **strict) == {'type': 'row', 'symbol': 'AAA', 'change': None, 'price': None}
+    event, data = format_sse('row', row).splitlines()[:2]
+    assert event == 'event: row'
+    assert json.loads(data[len('data: '):], **strict)['change'] is None
+
+
+def test_screen_skips_symbols_without_filter_data():
+    def fetch(chunk):
+        return {s: fake_row(s, sector='Unknown' if s == 'S1' else 'Technology') for s in chunk}, {}
+
+    events = list(screen(['S0', 'S1', 'S2'], fetch, filters={'sector': 'technology'},
+                         chunk_size=2, known=lambda symbol: symbol != 'S1'))
+    event, summary = events[-1]
+    assert [payload['symbol'] for event, payload in events if event == 'row'] == ['S0', 'S2']
+    assert (summary['matched'], summary['skipped']) == (2, ['S1'])
+
+
+def test_screener_reports_symbols_missing_metadata(offline_app, monkeypatch):
+    fetch = offline_app.metadata_store.fetch
+
+    def fail_bbb(symbol):
+        if symbol == 'BBB':
+            raise ValueError('not found')
+        return fetch(symbol)
+    monkeypatch.setattr(offline_app.metadata_store, 'fetch', fail_bbb)
+
+    lines = offline_app.app.test_client().get('/screener?symbols=AAA,BBB&sector=tech').get_data(as_text=True)
+    top = json.loads(lines.splitlines()[-1])
+    assert [row['symbol'] for row in top['results']] == ['AAA']
+    assert top['skipped'] == ['BBB']
@@ -0,0 +1,47 @@
+from sentiment import SentimentScorer
+
+
+def counting_scorer(calls):
+    def score(text):
+        calls.append(text)
+        return len(text) / 100
+    return score
+
+
+def test_duplicates_scored_once_and_memoized():
+    calls = []
+    scorer = SentimentScorer(path='', score=counting_scorer(calls))
+    texts = ['Shares rally on earnings', 'Shares rally on earnings', 'Guidance cut']
+    assert scorer.score_texts(texts) == [0.24, 0.24, 0.12]
+    assert scorer.score_texts(['Guidance cut']) == [0.12]
+    assert calls == ['Shares rally on earnings', 'Guidance cut']
+    stats = scorer.stats()
+    assert stats['texts_seen'] == 4
+    assert stats['texts_scored'] == 2
+    assert stats['articles_per_sec'] > 0
+
+
+def test_memo_is_bounded():
+    scorer = SentimentScorer(maxsize=2, path='', score=counting_scorer([]))
+    scorer.score_texts(['a', 'b', 'c'])
+    assert scorer.stats()['size'] == 2
+
+
+def test_memo_persists_and_compacts(tmp_path):
+    path = str(tmp_path / 'sentiment.log')
+    scorer = SentimentScorer(maxsize=2, path=path, score=counting_scorer([]))
+    for text in ['one', 'two', 'three', 'four', 'five']:
+        scorer.score_texts([text])
+    with open(path) as f:
+        assert len(f.readlines()) <= 4
+
+    calls = []
+    restored = SentimentScorer(maxsize=2, path=path, score=counting_scorer(calls))
+    assert restored.score_texts(['four', 'five']) == [0.04, 0.04]
+    assert calls == []
+
+
+def test_textblob_polarity():
+    scorer = SentimentScorer(path='')
+    positive, negative = scorer.score_texts(['Great, excellent results', 'Terrible, awful quarter'])
+    assert positive > 0 > negative
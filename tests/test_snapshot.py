@@ -0,0 +1,59 @@
+import time
+
+from snapshot import PredictionSnapshot
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_cold_get_triggers_refresh_without_blocking():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return [{'symbol': 'AAPL'}]
+
+    snapshot = PredictionSnapshot(compute, interval=60, max_age=60)
+    start = time.monotonic()
+    assert snapshot.get() is None
+    assert time.monotonic() - start < 0.05
+    assert wait_for(lambda: snapshot.get() is not None)
+    result = snapshot.get()
+    assert result['predictions'] == [{'symbol': 'AAPL'}]
+    assert not result['stale']
+    assert len(calls) == 1
+
+
+def test_stale_snapshot_is_served_while_revalidating():
+    values = iter([[{'symbol': 'OLD'}], [{'symbol': 'NEW'}]])
+    snapshot = PredictionSnapshot(lambda: next(values), interval=60, max_age=0.05)
+    assert snapshot.refresh()
+    time.sleep(0.06)
+
+    result = snapshot.get()
+    assert result['stale']
+    assert result['predictions'] == [{'symbol': 'OLD'}]
+    assert wait_for(lambda: snapshot.get()['predictions'] == [{'symbol': 'NEW'}])
+
+
+def test_empty_refresh_keeps_previous_snapshot():
+    values = iter([[{'symbol': 'AAPL'}], []])
+    snapshot = PredictionSnapshot(lambda: next(values), interval=60, max_age=60)
+    assert snapshot.refresh()
+    assert not snapshot.refresh()
+    assert snapshot.get()['predictions'] == [{'symbol': 'AAPL'}]
+
+
+def test_snapshot_shared_through_disk(tmp_path):
+    path = str(tmp_path / 'predictions.json')
+    writer = PredictionSnapshot(lambda: [{'symbol': 'MSFT'}], path=path)
+    reader = PredictionSnapshot(lambda: [], path=path)
+    assert writer.refresh()
+    assert reader.get()['predictions'] == [{'symbol': 'MSFT'}]
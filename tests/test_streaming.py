@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from indicators import INDICATOR_COLUMNS, compute_indicators, panel_from_frames
+from streaming import IndicatorStates, StreamingIndicators
+
+
+def batch_values(data):
+    table = compute_indicators(panel_from_frames({'X': data}))
+    return table.loc['X'].to_dict()
+
+
+@pytest.mark.parametrize('length', [20, 27, 28, 29, 60, 120])
+def test_streaming_matches_batch(length, make_bars):
+    data = make_bars(length, seed=length)
+    values = StreamingIndicators.from_history(data).values()
+    expected = batch_values(data)
+    for name in INDICATOR_COLUMNS:
+        assert values[name] == pytest.approx(expected[name], rel=1e-7), name
+
+
+def test_not_enough_bars(make_bars):
+    assert StreamingIndicators.from_history(make_bars(19, 1)).values() is None
+
+
+def test_state_round_trips_through_json(make_bars):
+    data = make_bars(80, seed=7)
+    stream = StreamingIndicators.from_history(data.iloc[:50])
+    restored = StreamingIndicators.from_dict(json.loads(json.dumps(stream.to_dict())))
+
+    for row in data.iloc[50:].itertuples(index=False):
+        restored.update(*row[:5])
+
+    expected = batch_values(data)
+    for name in INDICATOR_COLUMNS:
+        assert restored.values()[name] == pytest.approx(expected[name], rel=1e-7), name
+
+
+def test_indicator_states_only_feed_new_bars(make_bars):
+    data = make_bars(80, seed=3)
+    states = IndicatorStates()
+    states.values('X', data.iloc[:60])
+
+    # The forming bar changes between polls; the state only takes completed bars
+    forming = data.iloc[:61].copy()
+    forming.iloc[-1, forming.columns.get_loc('Close')] += 5
+    states.values('X', forming)
+    values = states.values('X', data)
+    stream, last_time = states._states['X']
+    assert stream.count == 79 and last_time == data.index[-2]
+
+    expected = batch_values(data)
+    for name in INDICATOR_COLUMNS:
+        assert values[name] == pytest.approx(expected[name], rel=1e-7), name
+    assert list(states.table({'X': data, 'SHORT': make_bars(10, seed=1)}).index) == ['X']
+
+
+def test_live_quotes_use_indicator_states(offline_app, monkeypatch):
+    monkeypatch.setattr(offline_app, 'live_indicators', IndicatorStates())
+    quotes = offline_app.get_live_quotes(['AAA', 'BBB'])
+    assert sorted(quotes) == ['AAA', 'BBB']
+    assert sorted(offline_app.live_indicators._states) == ['AAA', 'BBB']
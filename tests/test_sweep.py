@@ -0,0 +1,112 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import load_scoring_config, score_features
+import sweep as sweep_module
+from price_store import PriceStore
+from sweep import build_features, evaluate_config, expand_grid, save_features, sweep
+
+SMALL_GRID = {
+    'technical_weight': [0.3, 0.5],
+    'sentiment_weight': [0.2],
+    'momentum_weight': [0.2, 0.4],
+    'rsi_oversold': [30],
+    'rsi_overbought': [60, 70],
+    'strong_buy': [0.6],
+    'buy': [0.2, 0.4],
+    'sell': [0.4]
+}
+
+
+def _features(make_bars, count=6):
+    closes = pd.DataFrame({f"S{seed}": make_bars(400, seed=seed)['Close'] for seed in range(count)})
+    features = build_features(closes, horizon=5)
+    # Vary sentiment so cells are not collapsed onto a single value
+    features['sentiment'] = np.round(np.random.default_rng(0).uniform(-1, 1, len(features['rsi'])), 1)
+    return features
+
+
+def _direct(features, config):
+    _, signals = score_features(features['rsi'], features['macd'], features['sentiment'], features['change'], config)
+    returns = features['returns']
+    buy, sell = signals <= 1, signals == 2
+    return {
+        'buy_observations': buy.sum(),
+        'buy_mean': returns[buy].mean(),
+        'buy_hit_rate': (returns[buy] > 0).mean(),
+        'sell_observations': sell.sum(),
+        'sell_mean': returns[sell].mean(),
+        'sell_hit_rate': (returns[sell] < 0).mean()
+    }
+
+
+def test_batched_metrics_match_per_observation_scoring(make_bars):
+    features = _features(make_bars)
+    ranked = sweep(features, SMALL_GRID, min_observations=1)
+    assert ranked
+    for entry in ranked:
+        expected = _direct(features, entry['config'])
+        for name, value in expected.items():
+            assert np.isclose(entry[name], value), (name, entry['config'])
+        assert np.isclose(entry['spread'], expected['buy_mean'] - expected['sell_mean'])
+
+
+def test_ranking_and_defaults_in_grid(make_bars):
+    features = _features(make_bars)
+    ranked = sweep(features, SMALL_GRID, metric='hit_rate', min_observations=1)
+    rates = [entry['hit_rate'] for entry in ranked]
+    assert rates == sorted(rates, reverse=True)
+
+    weights, thresholds, rsi_levels = expand_grid(SMALL_GRID)
+    # Default values are added to every list, and strong_buy must exceed buy
+    assert (30, 70) in rsi_levels
+    assert all(row[0] > row[1] for row in thresholds)
+    assert len(ranked) <= len(weights) * len(thresholds) * len(rsi_levels)
+
+
+def test_parallel_sweep_matches_serial(tmp_path, make_bars):
+    features = _features(make_bars)
+    path = str(tmp_path / 'features.npz')
+    save_features(path, features, horizon=5)
+    serial = sweep(features, SMALL_GRID, min_observations=1)
+    parallel = sweep(features, SMALL_GRID, min_observations=1, workers=2, features_path=path)
+    assert [entry['config'] for entry in parallel] == [entry['config'] for entry in serial]
+
+
+def test_output_loads_as_scoring_config(tmp_path, make_bars):
+    features = _features(make_bars)
+    ranked = sweep(features, SMALL_GRID, min_observations=1)
+    path = tmp_path / 'sweep.json'
+    path.write_text(json.dumps({'config': ranked[0]['config'], 'results': ranked}))
+    config = load_scoring_config(str(path))
+    assert config == ranked[0]['config']
+    assert evaluate_config(features, config)['spread'] == ranked[0]['spread']
+
+
+def test_cached_features_follow_the_arguments(tmp_path, make_bars, monkeypatch, capsys):
+    store = PriceStore(str(tmp_path / 'prices'))
+    for seed, symbol in enumerate(('AAA', 'BBB')):
+        bars = make_bars(400, seed=seed)
+        store.append(symbol, bars.set_axis(pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=400)))
+    features = str(tmp_path / 'features.npz')
+    run = lambda *args: sweep_module.main([*args, '--root', store.root, '--features', features,
+                                            '--min-observations', '1', '--workers', '1', '--top', '0'])
+
+    run('AAA', '--horizon', '5')
+    run('AAA', '--horizon', '5')
+    assert 'Using cached features' in capsys.readouterr().out
+    for args in (('AAA', '--horizon', '10'), ('AAA', 'BBB', '--horizon', '10'), ('AAA', 'BBB', '--horizon', '10', '--years', '1')):
+        run(*args)
+        assert 'Computed features for' in capsys.readouterr().out
+        assert int(np.load(features)['horizon']) == int(args[args.index('--horizon') + 1])
+
+
+def test_grid_with_unknown_keys_is_rejected(tmp_path, capsys):
+    path = tmp_path / 'grid.json'
+    path.write_text(json.dumps({'technical_weight': [0.3], 'tech_weight': [0.5]}))
+    with pytest.raises(SystemExit):
+        sweep_module.main(['AAA', '--grid', str(path)])
+    assert 'unknown grid parameters: tech_weight' in capsys.readouterr().err